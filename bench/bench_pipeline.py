@@ -0,0 +1,270 @@
+"""Acquisition pipeline benchmarks for every thrust bench dashboard.
+
+Measures, from synthetic telemetry produced by tbcore.simulator:
+
+    parsers     lines (or frames) per second through the text and binary
+                decoders
+    dashboards  per-tick GUI blocking time of update_data(), the time from
+                bytes arriving to the repaint finishing, and process memory
+                growth over a simulated multi-hour run
+
+Simulated time is decoupled from wall time, so an hour of telemetry takes
+seconds. Results are written as JSON, e.g.
+
+    python bench/bench_pipeline.py --hours 2 --rate 10 --out bench.json
+
+Runs offscreen (QT_QPA_PLATFORM=offscreen) unless a display is set.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np  # noqa: E402
+
+from tbcore.acquisition import SerialReader  # noqa: E402
+from tbcore.derived import Derive  # noqa: E402
+from tbcore.protocol import make_decoder  # noqa: E402
+from tbcore.simulator import BenchSimulator  # noqa: E402
+
+DASHBOARDS = {
+    'tbh': os.path.join(ROOT, 'tbh', 'thrust.py'),
+    'thrustbench_dashboard': os.path.join(ROOT, 'thrustbench_dashboard', 'thrust.py'),
+    'thrust_bench': os.path.join(ROOT, 'thrust_bench.py'),
+    'qtApp': os.path.join(ROOT, 'qtApp.py'),
+}
+TICK_S = 1.0  # simulated seconds of telemetry handed to the GUI per tick
+LOOP_CHUNK = 4096  # pyserial's loop:// queue holds this many bytes; a fuller write blocks
+
+
+class SimClock:
+    """Clock the benchmark advances by hand."""
+
+    def __init__(self, start):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+def rss_bytes():
+    """ Resident set size of this process, or None where unsupported """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        try:
+            import resource
+            scale = 1 if sys.platform == 'darwin' else 1024
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+        except ImportError:
+            return None
+
+
+def percentiles(values):
+    values = np.asarray(values) * 1e3
+    if not len(values):
+        return {}
+    return {
+        'mean_ms': float(values.mean()),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'max_ms': float(values.max()),
+    }
+
+
+def synthetic_stream(protocol, seconds, rate):
+    clock = SimClock(0.0)
+    sim = BenchSimulator(rate, noise=0.02, seed=1, clock=clock)
+    sim.process_command("60%")
+    if protocol == 'binary':
+        sim.process_command("B")
+    sim.read_available()
+    clock.now = seconds
+    return sim.read_available()
+
+
+def bench_parsers(lines):
+    results = {}
+    for protocol in ('text', 'binary'):
+        data = synthetic_stream(protocol, lines / 1000.0, 1000.0)
+        decoder = make_decoder(protocol)
+        chunk = 4096
+        start = time.perf_counter()
+        for i in range(0, len(data), chunk):
+            decoder.feed(data[i:i + chunk])
+        elapsed = time.perf_counter() - start
+        results[protocol] = {
+            'samples': decoder.frames,
+            'bytes': len(data),
+            'samples_per_s': decoder.frames / elapsed,
+            'mb_per_s': len(data) / elapsed / 1e6,
+        }
+    return results
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(f"bench_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def bench_dashboard(app, name, hours, rate):
+    """ Drive one dashboard's ingest and plot path through a simulated run """
+    cwd = os.getcwd()
+    # thrust_bench.py loads its font from the working directory
+    os.chdir(os.path.join(ROOT, 'tbh'))
+    try:
+        module = load_module(name, DASHBOARDS[name])
+        started = time.perf_counter()
+        gui = module.ThrustbenchGUI()
+        gui.show()
+        app.processEvents()
+        startup_s = time.perf_counter() - started
+    finally:
+        os.chdir(cwd)
+
+    epoch = time.time()
+    clock = SimClock(epoch)
+    sim = BenchSimulator(rate, noise=0.02, seed=1, clock=clock)
+    sim.process_command("60%")
+    if hasattr(gui, 'render_scheduler'):
+        gui.render_scheduler.clock = clock
+    for attr in ('session_start', 'start_time'):
+        if hasattr(gui, attr):
+            setattr(gui, attr, epoch)
+
+    # tbh plots the derived channels, the other dashboards ignore them
+    reader = SerialReader(None, decoder=make_decoder('text', clock=clock), derive=Derive())
+    gui.reader = reader
+
+    ticks = int(hours * 3600 / TICK_S)
+    tick_times, latencies = [], []
+    rss_start = rss_bytes()
+    for _ in range(ticks):
+        clock.now += TICK_S
+        data = sim.read_available()
+        arrived = time.perf_counter()
+        reader.feed(data)
+        start = time.perf_counter()
+        gui.update_data()
+        tick_times.append(time.perf_counter() - start)
+        app.processEvents()
+        latencies.append(time.perf_counter() - arrived)
+    rss_end = rss_bytes()
+    gui.close()
+    app.processEvents()
+    return {
+        'startup_s': startup_s,
+        'ticks': ticks,
+        'samples': sim.samples,
+        'gui_tick': percentiles(tick_times),
+        'arrival_to_paint': percentiles(latencies),
+        'rss_start_bytes': rss_start,
+        'rss_end_bytes': rss_end,
+        'rss_growth_bytes': rss_end - rss_start if rss_start is not None else None,
+    }
+
+
+def bench_qtapp(app, hours, rate):
+    """ qtApp.py reads lines through tbcore.transport on an asyncio loop """
+    import asyncio
+
+    module = load_module('qtApp', DASHBOARDS['qtApp'])
+    module.ARDUINO_RESET_S = 0
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    gui = module.ThrustbenchGUI('loop://')
+    gui.show()
+    while gui.transport.state != 'open':
+        loop.run_until_complete(asyncio.sleep(0.01))
+
+    parsed = [0]
+    parse_data = gui.parse_data
+
+    def counting_parse(line):
+        parsed[0] += 1
+        parse_data(line)
+
+    gui.parse_data = counting_parse
+    lines = (b"Thrust: 812.4g\r\nRPM: 5400\r\nVoltage: 12.10V\r\n"
+             b"Current: 11.52A\r\nPower: 139.39W\r\n")
+    per_tick = max(1, int(rate * TICK_S))
+    ticks = int(hours * 3600 / TICK_S)
+    latencies = []
+    rss_start = rss_bytes()
+    for _ in range(ticks):
+        target = parsed[0] + 5 * per_tick
+        arrived = time.perf_counter()
+        payload = lines * per_tick
+        for i in range(0, len(payload), LOOP_CHUNK):
+            # The transport only reads while the loop runs, so let it drain
+            # the loopback before the next chunk
+            port = gui.transport.serial
+            port.write(payload[i:i + LOOP_CHUNK])
+            while port.in_waiting:
+                loop.run_until_complete(asyncio.sleep(0.001))
+        while parsed[0] < target:
+            loop.run_until_complete(asyncio.sleep(0.001))
+        app.processEvents()
+        latencies.append(time.perf_counter() - arrived)
+    rss_end = rss_bytes()
+    gui.close()
+    loop.run_until_complete(asyncio.sleep(0.6))  # let the transport close
+    loop.close()
+    return {
+        'ticks': ticks,
+        'arrival_to_paint': percentiles(latencies),
+        'rss_start_bytes': rss_start,
+        'rss_end_bytes': rss_end,
+        'rss_growth_bytes': rss_end - rss_start if rss_start is not None else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the thrust bench acquisition path.")
+    parser.add_argument('--hours', type=float, default=1.0, help="simulated run length")
+    parser.add_argument('--rate', type=float, default=10.0, help="telemetry samples per second")
+    parser.add_argument('--parser-lines', type=int, default=200000)
+    parser.add_argument('--dashboards', default=",".join(DASHBOARDS),
+                        help="comma separated subset of " + ", ".join(DASHBOARDS))
+    parser.add_argument('--out', help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    report = {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'hours': args.hours,
+        'rate_hz': args.rate,
+        'parsers': bench_parsers(args.parser_lines),
+        'dashboards': {},
+    }
+    for name in args.dashboards.split(","):
+        if name == 'qtApp':
+            report['dashboards'][name] = bench_qtapp(app, args.hours, args.rate)
+        else:
+            report['dashboards'][name] = bench_dashboard(app, name, args.hours, args.rate)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Startup benchmark: how long until a dashboard window is on screen.
+
+Each run launches a fresh interpreter (so nothing is already imported or
+cached) that imports the dashboard, constructs its ThrustbenchGUI and
+reports, in seconds since the launch:
+
+    interpreter   Python is up and running this script
+    imported      the dashboard module and its imports are loaded
+    constructed   ThrustbenchGUI() returned
+    first_frame   the window's first paint event arrived
+    ready         plots built and ports listed (the deferred work), if the
+                  dashboard defers any
+
+The median over --runs launches is reported, e.g.
+
+    python bench/bench_startup.py --runs 7 --out startup.json
+
+Runs offscreen (QT_QPA_PLATFORM=offscreen) unless a display is set.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+DASHBOARDS = {
+    'tbh': os.path.join(ROOT, 'tbh', 'thrust.py'),
+    'thrustbench_dashboard': os.path.join(ROOT, 'thrustbench_dashboard', 'thrust.py'),
+}
+PHASES = ('interpreter', 'imported', 'constructed', 'first_frame', 'ready')
+READY_TIMEOUT_S = 10.0
+
+
+def child(path, launched):
+    """ Runs in the launched interpreter; prints one JSON line of timings """
+    times = {'interpreter': time.time() - launched}
+    import importlib.util
+
+    sys.path.insert(0, os.path.dirname(path))
+    spec = importlib.util.spec_from_file_location('dashboard', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    times['imported'] = time.time() - launched
+
+    from PyQt5.QtCore import QEvent, QObject
+    from PyQt5.QtWidgets import QApplication
+
+    class FirstPaint(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint and 'first_frame' not in times:
+                times['first_frame'] = time.time() - launched
+            return False
+
+    app = QApplication(sys.argv[:1])
+    first_paint = FirstPaint()
+    app.installEventFilter(first_paint)
+    gui = module.ThrustbenchGUI()
+    times['constructed'] = time.time() - launched
+    gui.show()
+    deadline = time.monotonic() + READY_TIMEOUT_S
+    while time.monotonic() < deadline:
+        app.processEvents()
+        if 'first_frame' in times and getattr(gui, 'startup_done', True):
+            break
+        time.sleep(0.001)
+    times['ready'] = time.time() - launched
+    app.removeEventFilter(first_paint)
+    gui.close()
+    print(json.dumps(times))
+
+
+def launch(path):
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    launched = time.time()
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', path, str(launched)],
+                            env=env, capture_output=True, text=True, timeout=60)
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith('{'):
+            return json.loads(line)
+    raise RuntimeError(f"{path} did not report its startup:\n{result.stderr}")
+
+
+def main(argv=None):
+    if argv is None and len(sys.argv) == 4 and sys.argv[1] == '--child':
+        child(sys.argv[2], float(sys.argv[3]))
+        return 0
+    parser = argparse.ArgumentParser(description="Benchmark dashboard time to first frame.")
+    parser.add_argument('--runs', type=int, default=5, help="launches per dashboard")
+    parser.add_argument('--dashboards', default=",".join(DASHBOARDS),
+                        help="comma separated subset of " + ", ".join(DASHBOARDS))
+    parser.add_argument('--out', help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'runs': args.runs,
+        'dashboards': {},
+    }
+    for name in args.dashboards.split(","):
+        runs = [launch(DASHBOARDS[name]) for _ in range(args.runs)]
+        report['dashboards'][name] = {
+            phase: statistics.median(run[phase] for run in runs) for phase in PHASES
+        }
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,230 @@
+import re
 import sys
 import serial
+import statistics
 import threading
 import time
+from collections import deque
 import serial.tools.list_ports
-from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QVBoxLayout, QPushButton, QComboBox, QMessageBox
+from PyQt5.QtCore import QObject, QSettings, QThread, QTimer, pyqtSignal
+from PyQt5.QtWidgets import (QApplication, QWidget, QLabel, QVBoxLayout, QHBoxLayout, QPushButton,
+                             QComboBox, QMessageBox, QSpinBox, QLineEdit)
+
+BAUDRATE = 9600
+DISPLAY_FPS = 20  # Upper bound on label refreshes per second
+HISTORY_SIZE = 3600  # Readings kept for the summary line (1 h at 1 Hz)
+# Firmware output formats: load.ino and weighingScale.ino with HIGH_RATE 0
+# send grams once a second; weighingScale.ino with HIGH_RATE 1 streams raw
+# HX711 counts, which are tared and calibrated here
+MODES = {
+    "Standard (9600 baud, g)": {'baudrate': 9600, 'raw': False, 'resolution': 0.01},
+    "High rate (115200 baud, raw)": {'baudrate': 115200, 'raw': True, 'resolution': 1.0},
+}
+DEFAULT_MODE = "High rate (115200 baud, raw)"  # weighingScale.ino's HIGH_RATE default
+CALIBRATION_FACTOR = 112.03  # HX711 counts per gram, as in weighingScale.ino
+FILTERS = ("None", "Moving average", "Median", "EMA")
+OUTLIER_MADS = 5.0  # Reject readings this many scaled MADs from the window median
+STEP_READINGS = 3  # This many "outliers" in a row are a real load change, not spikes
+# A bare number, or "Weight: 12.34 g"; other lines ("Raw reading: ...") are skipped
+_READING = re.compile(r'(?:Weight:\s*)?([-+]?(?:\d+(?:\.\d*)?|\.\d+))\s*(?:g)?')
+
+
+class ScaleFilter:
+    """Smooths readings and rejects outliers, one value at a time.
+
+    kind is one of FILTERS. Outliers are judged against the median and
+    median absolute deviation of the last `window` accepted readings, so
+    a single spike from a knock on the bench never reaches the display;
+    STEP_READINGS outliers in a row mean the load really changed, and the
+    filter starts over from there. The MAD never counts as smaller than
+    `resolution`, the reading's quantisation step: a steady reading has a
+    MAD of zero, and a spike must still stand out from it.
+    """
+
+    def __init__(self, kind="None", window=10, alpha=None, outlier_mads=OUTLIER_MADS,
+                 resolution=1.0):
+        self.kind = kind
+        self.window = deque(maxlen=max(1, window))
+        self.alpha = alpha if alpha is not None else 2.0 / (max(1, window) + 1)
+        self.outlier_mads = outlier_mads
+        self.resolution = resolution
+        self.ema = None
+        self.rejected = 0
+        self._streak = 0
+
+    def add(self, value):
+        """ Filtered value, or None when `value` is rejected as an outlier """
+        if self.outlier_mads and len(self.window) >= 5:
+            median = statistics.median(self.window)
+            mad = statistics.median(abs(v - median) for v in self.window) * 1.4826
+            if abs(value - median) > self.outlier_mads * max(mad, self.resolution):
+                self._streak += 1
+                if self._streak < STEP_READINGS:
+                    self.rejected += 1
+                    return None
+                self.window.clear()
+                self.ema = None
+        self._streak = 0
+        self.window.append(value)
+        if self.kind == "Moving average":
+            return sum(self.window) / len(self.window)
+        if self.kind == "Median":
+            return statistics.median(self.window)
+        if self.kind == "EMA":
+            self.ema = value if self.ema is None else self.ema + self.alpha * (value - self.ema)
+            return self.ema
+        return value
+
+
+class ReadingWindow:
+    """The last `size` readings' min, max and mean, kept up to date as they arrive.
+
+    Sliding min and max come from monotonic deques and the mean from a
+    running sum, so the display never rescans the history. Values are
+    what the reader posts (raw or grams); tare and calibration are linear
+    and get applied to the results instead.
+    """
+
+    def __init__(self, size=HISTORY_SIZE, rate_window_s=1.0):
+        self.size = size
+        self.rate_window_s = rate_window_s
+        self.clear()
+
+    def clear(self):
+        self.values = deque()
+        self.total = 0.0
+        self.last = None  # (time, value)
+        self._count = 0
+        self._min = deque()  # (index, value), values increasing
+        self._max = deque()  # (index, value), values decreasing
+        self._recent = deque()  # times within rate_window_s of the last reading
+
+    def __len__(self):
+        return len(self.values)
+
+    def extend(self, batch):
+        for t, value in batch:
+            self.add(t, value)
+
+    def add(self, t, value):
+        index = self._count
+        self._count += 1
+        self.values.append(value)
+        self.total += value
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((index, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((index, value))
+        if len(self.values) > self.size:
+            self.total -= self.values.popleft()
+            oldest = self._count - self.size
+            for extreme in (self._min, self._max):
+                if extreme[0][0] < oldest:
+                    extreme.popleft()
+        self._recent.append(t)
+        while self._recent[0] < t - self.rate_window_s:
+            self._recent.popleft()
+        self.last = (t, value)
+
+    @property
+    def min(self):
+        return self._min[0][1]
+
+    @property
+    def max(self):
+        return self._max[0][1]
+
+    @property
+    def mean(self):
+        return self.total / len(self.values)
+
+    @property
+    def rate(self):
+        """ Readings in the last rate_window_s seconds """
+        return len(self._recent)
+
+
+class ScaleReader(QObject):
+    """Reads weight lines on its own QThread and posts them in batches.
+
+    Nothing here touches a widget: readings go out through the
+    `readings` signal, which Qt queues to the GUI thread. stop() may be
+    called from any thread; the loop notices within the read timeout.
+    """
+
+    readings = pyqtSignal(list)  # [(time, grams), ...]
+    error = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self, port, baudrate=BAUDRATE, scale_filter=None):
+        super().__init__()
+        self.port = port
+        self.baudrate = baudrate
+        # Replaced (not modified) from the GUI thread when the settings change
+        self.filter = scale_filter or ScaleFilter()
+        self.malformed = 0
+        self._pending = b""
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            with serial.Serial(self.port, self.baudrate, timeout=0.2) as ser:
+                while not self._stop_event.is_set():
+                    # Everything that has arrived goes out as one batch
+                    chunk = ser.readline() + ser.read(ser.in_waiting)
+                    batch = self.parse(chunk)
+                    if batch:
+                        self.readings.emit(batch)
+        except (serial.SerialException, OSError) as e:
+            if not self._stop_event.is_set():
+                self.error.emit(str(e))
+        finally:
+            self.finished.emit()
+
+    def parse(self, chunk):
+        now = time.time()
+        batch = []
+        # A partial last line waits for the rest of it
+        *lines, self._pending = (self._pending + chunk).split(b"\n")
+        scale_filter = self.filter
+        for line in lines:
+            line = line.decode('utf-8', errors='replace').strip()
+            if not line:
+                continue
+            match = _READING.fullmatch(line)
+            if not match:
+                self.malformed += 1
+                continue
+            value = scale_filter.add(float(match.group(1)))
+            if value is not None:
+                batch.append((now, value))
+        return batch
+
+    def stop(self):
+        self._stop_event.set()
+
 
 class WeightDisplayApp(QWidget):
     def __init__(self):
         super().__init__()
-        
+
+        self.settings = QSettings("DA", "WeightDisplay")
+        self.offset = 0.0
+        self.factor = 1.0
         self.initUI()
+        self.load_calibration()
         self.serial_thread = None
+        self.reader = None
         self.serial_port = None
+        self.history = ReadingWindow(HISTORY_SIZE)
+        self.dirty = False
+
+        # Repaint at most DISPLAY_FPS times a second, however fast lines arrive
+        self.display_timer = QTimer(self)
+        self.display_timer.timeout.connect(self.refresh_display)
+        self.display_timer.start(1000 // DISPLAY_FPS)
 
     def initUI(self):
         self.setWindowTitle('Weight Display')
@@ -28,8 +241,46 @@ class WeightDisplayApp(QWidget):
         self.port_combobox.addItems(self.get_serial_ports())
         self.layout.addWidget(self.port_combobox)
 
+        # Firmware output format, see MODES
+        self.mode_combobox = QComboBox(self)
+        self.mode_combobox.addItems(MODES)
+        mode = self.settings.value("mode", DEFAULT_MODE)
+        self.mode_combobox.setCurrentText(mode if mode in MODES else DEFAULT_MODE)
+        self.mode_combobox.currentTextChanged.connect(self.load_calibration)
+        self.layout.addWidget(self.mode_combobox)
+
+        # Host-side filtering, changeable while reading
+        filter_layout = QHBoxLayout()
+        self.filter_combobox = QComboBox(self)
+        self.filter_combobox.addItems(FILTERS)
+        self.filter_combobox.currentTextChanged.connect(self.apply_filter)
+        self.window_spinbox = QSpinBox(self)
+        self.window_spinbox.setRange(1, 500)
+        self.window_spinbox.setValue(10)
+        self.window_spinbox.setSuffix(" readings")
+        self.window_spinbox.valueChanged.connect(self.apply_filter)
+        filter_layout.addWidget(QLabel("Filter:", self))
+        filter_layout.addWidget(self.filter_combobox)
+        filter_layout.addWidget(self.window_spinbox)
+        self.layout.addLayout(filter_layout)
+
+        # Host-side tare and calibration, remembered between runs
+        calibration_layout = QHBoxLayout()
+        self.tare_button = QPushButton("Tare", self)
+        self.tare_button.clicked.connect(self.tare)
+        self.known_weight_input = QLineEdit(self)
+        self.known_weight_input.setPlaceholderText("Known weight (g)")
+        self.calibrate_button = QPushButton("Calibrate", self)
+        self.calibrate_button.clicked.connect(self.calibrate)
+        calibration_layout.addWidget(self.tare_button)
+        calibration_layout.addWidget(self.known_weight_input)
+        calibration_layout.addWidget(self.calibrate_button)
+        self.layout.addLayout(calibration_layout)
+        self.calibration_label = QLabel("", self)
+        self.layout.addWidget(self.calibration_label)
+
         self.start_button = QPushButton("Start Reading Weight", self)
-        self.start_button.clicked.connect(self.start_reading)
+        self.start_button.clicked.connect(self.toggle_reading)
         self.layout.addWidget(self.start_button)
 
         self.weight_label = QLabel("Weight: ", self)
@@ -40,6 +291,9 @@ class WeightDisplayApp(QWidget):
         self.weight_value.setStyleSheet("font-size: 24px;")
         self.layout.addWidget(self.weight_value)
 
+        self.summary_label = QLabel("", self)
+        self.layout.addWidget(self.summary_label)
+
         self.setLayout(self.layout)
 
     def get_serial_ports(self):
@@ -47,26 +301,140 @@ class WeightDisplayApp(QWidget):
         ports = serial.tools.list_ports.comports()
         return [port.device for port in ports]
 
+    def toggle_reading(self):
+        if self.serial_thread is None:
+            self.start_reading()
+        else:
+            self.stop_reading()
+
     def start_reading(self):
+        if self.serial_thread is not None:
+            return
+        selected_port = self.port_combobox.currentText()
+        if not selected_port:
+            QMessageBox.warning(self, "Warning", "Please select a COM port.")
+            return
+        self.serial_port = selected_port
+        self.history.clear()
+        self.settings.setValue("mode", self.mode_combobox.currentText())
+        mode = MODES[self.mode_combobox.currentText()]
+        self.reader = ScaleReader(selected_port, mode['baudrate'], self.make_filter())
+        self.serial_thread = QThread(self)
+        self.reader.moveToThread(self.serial_thread)
+        self.serial_thread.started.connect(self.reader.run)
+        self.reader.readings.connect(self.add_readings)
+        self.reader.error.connect(self.show_error)
+        self.reader.finished.connect(self.serial_thread.quit)
+        self.serial_thread.finished.connect(self.reading_stopped)
+        self.serial_thread.start()
+        self.start_button.setText("Stop Reading")
+        self.port_combobox.setEnabled(False)
+        self.mode_combobox.setEnabled(False)
+
+    def stop_reading(self, timeout_ms=2000):
+        """ Ask the worker to stop and wait for its thread to finish """
         if self.serial_thread is None:
-            selected_port = self.port_combobox.currentText()
-            if selected_port:
-                self.serial_port = selected_port
-                self.serial_thread = threading.Thread(target=self.read_serial, daemon=True)
-                self.serial_thread.start()
-            else:
-                QMessageBox.warning(self, "Warning", "Please select a COM port.")
-
-    def read_serial(self):
-        """ Read weight data from the selected serial port """
-        with serial.Serial(self.serial_port, 9600, timeout=1) as ser:
-            while True:
-                try:
-                    line = ser.readline().decode('utf-8').rstrip()
-                    if line:  # Check if the line is not empty
-                        self.weight_value.setText(f"{line} g")  # Update weight display
-                except Exception as e:
-                    print(f"Error: {e}")
+            return
+        self.reader.stop()
+        self.serial_thread.quit()
+        self.serial_thread.wait(timeout_ms)
+        self.reading_stopped()
+
+    def reading_stopped(self):
+        if self.serial_thread is None or self.serial_thread.isRunning():
+            return
+        self.serial_thread.deleteLater()
+        self.reader.deleteLater()
+        self.serial_thread = None
+        self.reader = None
+        self.start_button.setText("Start Reading Weight")
+        self.port_combobox.setEnabled(True)
+        self.mode_combobox.setEnabled(True)
+
+    def make_filter(self):
+        mode = MODES[self.mode_combobox.currentText()]
+        return ScaleFilter(self.filter_combobox.currentText(), self.window_spinbox.value(),
+                           resolution=mode['resolution'])
+
+    def apply_filter(self):
+        if self.reader:
+            self.reader.filter = self.make_filter()
+
+    def calibration_key(self):
+        return 'raw' if MODES[self.mode_combobox.currentText()]['raw'] else 'grams'
+
+    def load_calibration(self):
+        key = self.calibration_key()
+        default_factor = CALIBRATION_FACTOR if key == 'raw' else 1.0
+        self.offset = float(self.settings.value(f"{key}/offset", 0.0))
+        self.factor = float(self.settings.value(f"{key}/factor", default_factor))
+        self.show_calibration()
+
+    def save_calibration(self):
+        key = self.calibration_key()
+        self.settings.setValue(f"{key}/offset", self.offset)
+        self.settings.setValue(f"{key}/factor", self.factor)
+        self.show_calibration()
+
+    def show_calibration(self):
+        self.calibration_label.setText(f"Tare offset {self.offset:.2f}, factor {self.factor:.4f} per g")
+
+    def to_grams(self, value):
+        return (value - self.offset) / self.factor
+
+    def tare(self):
+        if not self.history:
+            QMessageBox.warning(self, "Warning", "Start reading before taring.")
+            return
+        self.offset = self.history.last[1]
+        self.save_calibration()
+        self.dirty = True
+
+    def calibrate(self):
+        """ Set the factor from the current reading of a known weight """
+        try:
+            known = float(self.known_weight_input.text())
+        except ValueError:
+            known = 0.0
+        if not self.history or known == 0:
+            QMessageBox.warning(self, "Warning", "Tare, place a known weight, enter it and read first.")
+            return
+        factor = (self.history.last[1] - self.offset) / known
+        if factor == 0:
+            QMessageBox.warning(self, "Warning", "The reading hasn't changed since the tare.")
+            return
+        self.factor = factor
+        self.save_calibration()
+        self.dirty = True
+
+    def add_readings(self, batch):
+        # Runs on the GUI thread; only records, refresh_display() paints
+        self.history.extend(batch)
+        self.dirty = True
+
+    def refresh_display(self):
+        if not self.dirty:
+            return
+        self.dirty = False
+        history = self.history
+        self.weight_value.setText(f"{self.to_grams(history.last[1]):.2f} g")
+        # A negative calibration factor swaps which end is the minimum
+        low, high = sorted((self.to_grams(history.min), self.to_grams(history.max)))
+        rejected = self.reader.filter.rejected if self.reader else 0
+        self.summary_label.setText(
+            f"Last {len(history)} readings: min {low:.2f} g, "
+            f"max {high:.2f} g, mean {self.to_grams(history.mean):.2f} g\n"
+            f"{history.rate} readings/s, {rejected} outliers rejected"
+        )
+
+    def show_error(self, message):
+        print(f"Error: {message}")
+        QMessageBox.warning(self, "Error", f"Reading {self.serial_port} failed: {message}")
+
+    def closeEvent(self, event):
+        self.stop_reading()
+        event.accept()
+
 
 def main():
     app = QApplication(sys.argv)
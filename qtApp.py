@@ -1,22 +1,44 @@
+import asyncio
+import os
 import sys
 import serial
-import time
-from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QLabel, QSlider
-from PyQt5.QtCore import Qt, QTimer
+import serial.tools.list_ports
+from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QLabel, QSlider, QComboBox
+from PyQt5.QtCore import Qt
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from tbcore.transport import SerialTransport, install_event_loop, run_app
+
+BAUDRATE = 57600
+ARDUINO_RESET_S = 2  # The board resets when the port opens
 
 class ThrustbenchGUI(QMainWindow):
-    def __init__(self):
+    def __init__(self, port=None):
         super().__init__()
         self.setWindowTitle("Thrustbench Control")
         self.setGeometry(100, 100, 600, 400)
 
-        self.serial_port = serial.Serial('COM6', 57600, timeout=1)  # Adjust COM port as needed
-        time.sleep(2)  # Wait for Arduino to initialize
+        self.transport = None
 
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
         self.layout = QVBoxLayout(self.central_widget)
 
+        # Port selection; pyserial URLs such as sim:// can be typed in
+        port_layout = QHBoxLayout()
+        self.port_combo = QComboBox()
+        self.port_combo.setEditable(True)
+        self.port_combo.addItems([p.device for p in serial.tools.list_ports.comports()])
+        if port:
+            self.port_combo.setEditText(port)
+        self.connect_button = QPushButton("Connect")
+        self.connect_button.clicked.connect(self.toggle_connection)
+        self.status_label = QLabel("Disconnected")
+        port_layout.addWidget(self.port_combo)
+        port_layout.addWidget(self.connect_button)
+        port_layout.addWidget(self.status_label)
+        self.layout.addLayout(port_layout)
+
         # Measurements display
         self.thrust_label = QLabel("Thrust: 0 g")
         self.rpm_label = QLabel("RPM: 0")
@@ -49,20 +71,41 @@ class ThrustbenchGUI(QMainWindow):
             speed_button_layout.addWidget(button)
         self.layout.addLayout(speed_button_layout)
 
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_data)
-        self.timer.start(100)  # Update every 100ms
+        if port:
+            self.toggle_connection()
+
+    def toggle_connection(self):
+        if self.transport:
+            self.transport.close_now()
+            self.transport = None
+            self.connect_button.setText("Connect")
+            self.port_combo.setEnabled(True)
+        else:
+            self.transport = SerialTransport(self.port_combo.currentText(), BAUDRATE,
+                                             settle_s=ARDUINO_RESET_S,
+                                             on_state=self.status_label.setText)
+            self.connect_button.setText("Disconnect")
+            self.port_combo.setEnabled(False)
+            asyncio.ensure_future(self.read_lines(self.transport))
+
+    async def read_lines(self, transport):
+        """ Show each line the rig sends until the port is closed """
+        try:
+            await transport.open()
+        except serial.SerialException as e:
+            self.status_label.setText(f"Error: {e}")
+            if transport is self.transport:
+                self.toggle_connection()
+            return
+        async for line in transport.lines():
+            self.parse_data(line)
 
     def set_motor_speed(self, value):
         command = f"S{value}\n"
-        self.serial_port.write(command.encode())
+        if self.transport:
+            self.transport.send(command.encode())
         self.speed_label.setText(f"Motor Speed: {(value+1)*10}%")
 
-    def update_data(self):
-        if self.serial_port.in_waiting:
-            line = self.serial_port.readline().decode('utf-8').strip()
-            self.parse_data(line)
-
     def parse_data(self, data):
         if data.startswith("Thrust:"):
             thrust = float(data.split(":")[1].strip().rstrip("g"))
@@ -81,11 +124,14 @@ class ThrustbenchGUI(QMainWindow):
             self.power_label.setText(f"Power: {power:.2f} W")
 
     def closeEvent(self, event):
-        self.serial_port.close()
+        if self.transport:
+            self.transport.close_now()
         event.accept()
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    window = ThrustbenchGUI()
+    loop = install_event_loop(app)
+    # Optional port on the command line, e.g. python qtApp.py COM6
+    window = ThrustbenchGUI(sys.argv[1] if len(sys.argv) > 1 else None)
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    sys.exit(run_app(app, loop))
\ No newline at end of file
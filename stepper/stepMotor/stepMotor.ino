@@ -31,6 +31,43 @@ const int TOTAL_SLOTS = 12;
 const int windingSequence[] = {0,1,6,7,2,3,8,9,4,5,10,11};
 int currentSlot = 0;
 
+// Host protocol (tbcore/winder.py): every command line is answered with
+// "ACK,<c>" or "ERR,<c>,<reason>"; H, S and M also send "DONE,<c>" when
+// they finish. While winding, "PROGRESS,<index>,<slot>,<coil>,<coils>,<steps/s>"
+// follows every coil. "E" is honoured between any two steps and answered
+// with "ESTOP"; other commands sent while busy are rejected.
+String commandLine = "";
+bool stopRequested = false;
+int sequenceIndex = 0;
+
+// Planned jobs (tbcore/planner.py): the host streams timed motion blocks,
+// "J" starts a job, "Q,<n>" is followed by n blocks of raw bytes and "W"
+// answers DONE once the buffer has drained. Blocks run from loop() without
+// blocking, so serial input is read between steps.
+struct MotionBlock {
+  uint16_t durationUs;
+  int16_t steps[3];  // wind, feed, rotation; the sign is the direction
+};
+const int BLOCK_BUFFER = 64;
+const int FREE_REPORT_BLOCKS = 16;
+MotionBlock blockBuffer[BLOCK_BUFFER];
+int blockHead = 0;  // where the next received block goes
+int blockCount = 0;
+long blocksExecuted = 0;
+bool planRunning = false;
+bool waitingForDrain = false;
+MotionBlock activeBlock;
+bool blockActive = false;
+unsigned long blockStart = 0;
+long stepsDone[3];
+// "Q" payload being received
+int payloadBlocks = 0;
+int payloadByte = 0;
+bool payloadDiscard = false;
+uint8_t payloadStaging[sizeof(MotionBlock)];
+const int STEP_PINS[3] = {WIND_STEP_PIN, FEED_STEP_PIN, ROT_STEP_PIN};
+const int DIR_PINS[3] = {WIND_DIR_PIN, FEED_DIR_PIN, ROT_DIR_PIN};
+
 // Function declarations
 void setupMotors();
 void homeAll();
@@ -39,6 +76,9 @@ void moveFeed(bool forward);
 void rotateStator(int slots);
 void setMotorSpeed(int motor, float speed);
 void executeStep(int stepPin, bool dir);
+bool checkStop();
+void emergencyStop();
+void reply(const char *kind, char cmd);
 
 void setup() {
   Serial.begin(115200);
@@ -60,28 +100,213 @@ void setup() {
 }
 
 void loop() {
-  if (Serial.available()) {
-    // Process commands from GUI
-    char cmd = Serial.read();
-    switch(cmd) {
-      case 'S': // Start winding sequence
-        executeWindingSequence();
-        break;
-      case 'H': // Home all axes
-        homeAll();
-        break;
-      case 'P': // Update parameters
-        updateParams();
+  readHost();
+  runBlocks();
+}
+
+void readHost() {
+  // Collect a whole line without blocking, then act on it
+  while (Serial.available()) {
+    char c = Serial.read();
+    if (payloadBlocks > 0) {
+      receivePayloadByte(c);
+    } else if (c == '\n') {
+      commandLine.trim();
+      if (commandLine.length() > 0) {
+        handleCommand(commandLine);
+      }
+      commandLine = "";
+    } else {
+      commandLine += c;
+    }
+  }
+}
+
+void handleCommand(String data) {
+  char cmd = data.charAt(0);
+  if (planRunning && (cmd == 'S' || cmd == 'H' || cmd == 'M' || cmd == 'J')) {
+    Serial.print("ERR,");
+    Serial.print(cmd);
+    Serial.println(",Busy");
+    return;
+  }
+  switch(cmd) {
+    case 'S': // Start winding sequence
+      stopRequested = false;
+      enableMotors();
+      reply("ACK", cmd);
+      executeWindingSequence();
+      if (!stopRequested) reply("DONE", cmd);
+      break;
+    case 'H': // Home all axes
+      stopRequested = false;
+      enableMotors();
+      reply("ACK", cmd);
+      homeAll();
+      if (!stopRequested) reply("DONE", cmd);
+      break;
+    case 'P': // Update parameters
+      updateParams(data);
+      break;
+    case 'M': // Motor movement command
+      stopRequested = false;
+      enableMotors();
+      handleMotorCommand(data);
+      break;
+    case 'E': // Emergency stop
+      emergencyStop();
+      break;
+    case 'J': // Start a planned job
+      stopRequested = false;
+      blockHead = 0;
+      blockCount = 0;
+      blockActive = false;
+      blocksExecuted = 0;
+      planRunning = true;
+      enableMotors();
+      Serial.print("ACK,J,");
+      Serial.println(BLOCK_BUFFER);
+      break;
+    case 'Q': { // Queue motion blocks; the raw blocks follow the line
+      int count = data.substring(2).toInt();
+      if (count <= 0) {
+        Serial.println("ERR,Q,No blocks");
         break;
-      case 'M': // Motor movement command
-        handleMotorCommand();
+      }
+      payloadBlocks = count;
+      payloadByte = 0;
+      payloadDiscard = !planRunning || count > BLOCK_BUFFER - blockCount;
+      break;
+    }
+    case 'W': // Wait for the planned job to finish
+      if (!planRunning) {
+        Serial.println("ERR,W,No planned job");
         break;
-      case 'E': // Emergency stop
-      // Add more commands as needed
+      }
+      reply("ACK", cmd);
+      waitingForDrain = true;
+      break;
+    default:
+      Serial.print("ERR,");
+      Serial.print(cmd);
+      Serial.println(",Unknown command");
+  }
+}
+
+void reply(const char *kind, char cmd) {
+  Serial.print(kind);
+  Serial.print(',');
+  Serial.println(cmd);
+}
+
+// Called between steps of every move: reads whatever the host sent, and
+// stops on "E". Returns true once a stop was requested.
+bool checkStop() {
+  while (Serial.available()) {
+    char c = Serial.read();
+    if (c == '\n') {
+      commandLine.trim();
+      if (commandLine.length() > 0) {
+        if (commandLine.charAt(0) == 'E') {
+          emergencyStop();
+        } else {
+          Serial.print("ERR,");
+          Serial.print(commandLine.charAt(0));
+          Serial.println(",Busy");
+        }
+      }
+      commandLine = "";
+    } else {
+      commandLine += c;
+    }
+  }
+  return stopRequested;
+}
+
+void emergencyStop() {
+  stopRequested = true;
+  // Drop the planned job, whatever is left of it
+  blockCount = 0;
+  blockActive = false;
+  planRunning = false;
+  waitingForDrain = false;
+  // Disable all motors
+  digitalWrite(WIND_EN_PIN, HIGH);
+  digitalWrite(FEED_EN_PIN, HIGH);
+  digitalWrite(ROT_EN_PIN, HIGH);
+  Serial.println("ESTOP");
+}
+
+void receivePayloadByte(uint8_t b) {
+  payloadStaging[payloadByte++] = b;
+  if (payloadByte < (int)sizeof(MotionBlock)) return;
+  payloadByte = 0;
+  payloadBlocks--;
+  if (!payloadDiscard) {
+    memcpy(&blockBuffer[blockHead], payloadStaging, sizeof(MotionBlock));
+    blockHead = (blockHead + 1) % BLOCK_BUFFER;
+    blockCount++;
+  }
+  if (payloadBlocks == 0) {
+    if (payloadDiscard) {
+      Serial.println(planRunning ? "ERR,Q,Buffer full" : "ERR,Q,No planned job");
+    } else {
+      Serial.print("ACK,Q,");
+      Serial.println(BLOCK_BUFFER - blockCount);
+    }
+  }
+}
+
+// Steps of the current block are spread evenly over its duration; a call
+// makes whatever steps are due by now and returns.
+void runBlocks() {
+  if (!blockActive) {
+    if (blockCount == 0) {
+      if (waitingForDrain) {
+        waitingForDrain = false;
+        planRunning = false;
+        reply("DONE", 'W');
+      }
+      return;
+    }
+    int tail = (blockHead - blockCount + BLOCK_BUFFER) % BLOCK_BUFFER;
+    activeBlock = blockBuffer[tail];
+    blockCount--;
+    for (int a = 0; a < 3; a++) {
+      stepsDone[a] = 0;
+      digitalWrite(DIR_PINS[a], activeBlock.steps[a] > 0);
+    }
+    blockStart = micros();
+    blockActive = true;
+  }
+  unsigned long elapsed = micros() - blockStart;
+  bool finished = elapsed >= activeBlock.durationUs;
+  if (finished) elapsed = activeBlock.durationUs;
+  for (int a = 0; a < 3; a++) {
+    long due = (long)abs(activeBlock.steps[a]) * elapsed / activeBlock.durationUs;
+    while (stepsDone[a] < due) {
+      executeStep(STEP_PINS[a], activeBlock.steps[a] > 0);
+      stepsDone[a]++;
+    }
+  }
+  if (finished) {
+    blockActive = false;
+    blocksExecuted++;
+    if (blocksExecuted % FREE_REPORT_BLOCKS == 0) {
+      Serial.print("FREE,");
+      Serial.print(BLOCK_BUFFER - blockCount);
+      Serial.print(',');
+      Serial.println(blocksExecuted);
     }
   }
 }
 
+void enableMotors() {
+  digitalWrite(WIND_EN_PIN, LOW);
+  digitalWrite(FEED_EN_PIN, LOW);
+  digitalWrite(ROT_EN_PIN, LOW);
+}
+
 void setupMotors() {
   // Configure motor pins
   pinMode(WIND_STEP_PIN, OUTPUT);
@@ -97,9 +322,7 @@ void setupMotors() {
   pinMode(ROT_EN_PIN, OUTPUT);
   
   // Enable all motors
-  digitalWrite(WIND_EN_PIN, LOW);
-  digitalWrite(FEED_EN_PIN, LOW);
-  digitalWrite(ROT_EN_PIN, LOW);
+  enableMotors();
 }
 
 void homeAll() {
@@ -110,7 +333,7 @@ void homeAll() {
   digitalWrite(ROT_DIR_PIN, HIGH);
   
   // Execute some steps to reach home position
-  for(int i = 0; i < 100; i++) {
+  for(int i = 0; i < 100 && !checkStop(); i++) {
     digitalWrite(WIND_STEP_PIN, HIGH);
     digitalWrite(FEED_STEP_PIN, HIGH);
     digitalWrite(ROT_STEP_PIN, HIGH);
@@ -123,17 +346,32 @@ void homeAll() {
 }
 
 void executeWindingSequence() {
-  for(int i = 0; i < TOTAL_SLOTS; i++) {
+  for(int i = 0; i < TOTAL_SLOTS && !stopRequested; i++) {
+    sequenceIndex = i;
     int slotNum = windingSequence[i];
     windSlot(slotNum);
     
     // After every 4 slots, do 5 complete rotations
-    if((i+1) % 4 == 0 && i < TOTAL_SLOTS-1) {
-      rotateStator(5);
-    }
+    // if((i+1) % 4 == 0 && i < TOTAL_SLOTS-1) {
+    //   rotateStator(5);
+    // }
   }
 }
 
+void reportProgress(int slotNum, long coil, unsigned long coilMicros, long stepsPerCoil) {
+  float rate = coilMicros ? stepsPerCoil * 1000000.0 / coilMicros : 0;
+  Serial.print("PROGRESS,");
+  Serial.print(sequenceIndex);
+  Serial.print(',');
+  Serial.print(slotNum + 1);
+  Serial.print(',');
+  Serial.print(coil);
+  Serial.print(',');
+  Serial.print(params.coilsPerSlot);
+  Serial.print(',');
+  Serial.println(rate, 1);
+}
+
 // Replace the existing windSlot function with this updated version
 
 void windSlot(int slotNum) {
@@ -168,7 +406,13 @@ void windSlot(int slotNum) {
     Serial.println(windDir ? "CW" : "CCW");
     
     // Execute winding sequence
+    long stepsPerCoil = max(1L, (long)(params.windSteps * params.gearRatio));
+    unsigned long coilStart = micros();
+    reportProgress(slotNum, 0, 0, stepsPerCoil);
     for(long step = 0; step < totalSteps; step++) {
+        if (checkStop()) {
+            return;
+        }
         // Execute winding step
         executeStep(WIND_STEP_PIN, windDir);
         
@@ -184,6 +428,12 @@ void windSlot(int slotNum) {
         }
         
         delayMicroseconds(1000000/params.windSpeed);
+
+        if ((step + 1) % stepsPerCoil == 0) {
+            unsigned long now = micros();
+            reportProgress(slotNum, (step + 1) / stepsPerCoil, now - coilStart, stepsPerCoil);
+            coilStart = now;
+        }
     }
     
     // Generate clearance between winder and stator
@@ -203,7 +453,7 @@ void moveFeedToStart() {
     
     // Execute steps to reach center (half of slot length)
     long centeringSteps = (params.slotLength * params.feedSteps) / 2;
-    for(long i = 0; i < centeringSteps; i++) {
+    for(long i = 0; i < centeringSteps && !checkStop(); i++) {
         executeStep(FEED_STEP_PIN, true);
         delayMicroseconds(1000000/params.feedSpeed);
     }
@@ -228,7 +478,7 @@ void createClearance() {
     digitalWrite(FEED_DIR_PIN, false);
     long clearanceSteps = params.feedSteps * 2;  // Adjust clearance distance as needed
     
-    for(long i = 0; i < clearanceSteps; i++) {
+    for(long i = 0; i < clearanceSteps && !checkStop(); i++) {
         executeStep(FEED_STEP_PIN, false);
         delayMicroseconds(1000000/params.feedSpeed);
     }
@@ -260,7 +510,7 @@ void rotateToNextSlot(int currentSlot) {
     digitalWrite(ROT_DIR_PIN, rotDir);
     
     long stepsToMove = abs(slotDiff) * (params.rotSteps / TOTAL_SLOTS);
-    for(long i = 0; i < stepsToMove; i++) {
+    for(long i = 0; i < stepsToMove && !checkStop(); i++) {
         executeStep(ROT_STEP_PIN, rotDir);
         delayMicroseconds(1000000/params.rotSpeed);
     }
@@ -268,7 +518,7 @@ void rotateToNextSlot(int currentSlot) {
 
 void moveFeed(bool forward) {
   digitalWrite(FEED_DIR_PIN, forward);
-  for(int i = 0; i < params.feedSteps; i++) {
+  for(int i = 0; i < params.feedSteps && !checkStop(); i++) {
     executeStep(FEED_STEP_PIN, forward);
     delayMicroseconds(1000000/params.feedSpeed);
   }
@@ -281,8 +531,7 @@ void moveFeed(bool forward) {
 //     delayMicroseconds(1000000/params.rotSpeed);
 //   }
 // }
-void handleMotorCommand() {
-    String data = Serial.readStringUntil('\n');
+void handleMotorCommand(String data) {
     String parts[5];  // M,motor,direction,speed,steps
     int partCount = 0;
     
@@ -301,7 +550,7 @@ void handleMotorCommand() {
     }
     
     if(partCount != 5) {
-        Serial.println("Invalid motor command format");
+        Serial.println("ERR,M,Invalid motor command format");
         return;
     }
     
@@ -327,31 +576,27 @@ void handleMotorCommand() {
             dirPin = ROT_DIR_PIN;
             break;
         default:
-            Serial.println("Invalid motor specified");
+            Serial.println("ERR,M,Invalid motor specified");
             return;
     }
+    if(speed <= 0) {
+        Serial.println("ERR,M,Invalid speed");
+        return;
+    }
+    reply("ACK", 'M');
     
     // Set direction
     digitalWrite(dirPin, direction);
     
-    // Execute movement
-    for(long i = 0; i < steps; i++) {
+    // Execute movement; "E" stops it between steps
+    for(long i = 0; i < steps && !checkStop(); i++) {
         digitalWrite(stepPin, HIGH);
         delayMicroseconds(10);
         digitalWrite(stepPin, LOW);
         delayMicroseconds(1000000/speed - 10);
-        
-        // Check for stop command
-        if(Serial.available()) {
-            String cmd = Serial.readStringUntil('\n');
-            if(cmd.startsWith("S,") && cmd.charAt(2) == motor) {
-                break;
-            }
-        }
     }
     
-    Serial.print("Completed moving motor ");
-    Serial.println(motor);
+    if (!stopRequested) reply("DONE", 'M');
 }
 
 void executeStep(int stepPin, bool dir) {
@@ -363,52 +608,42 @@ void executeStep(int stepPin, bool dir) {
 
 // Add these to the existing Arduino code
 
-void updateParams() {
-  if (Serial.available()) {
-    String data = Serial.readStringUntil('\n');
-    
-    // Split the received string by commas
-    int paramCount = 0;
-    int lastCommaIndex = 0;
-    float values[10];  // Array to store the parsed values
-    
-    // Parse the comma-separated values
-    for (int i = 0; i < data.length(); i++) {
-      if (data.charAt(i) == ',') {
-        if (paramCount > 0) {  // Skip the first 'P' character
-          String valueStr = data.substring(lastCommaIndex + 1, i);
-          values[paramCount - 1] = valueStr.toFloat();
-        }
-        lastCommaIndex = i;
-        paramCount++;
+void updateParams(String data) {
+  data += ',';  // so the last value is parsed like the others
+  
+  // Split the received string by commas
+  int paramCount = 0;
+  int lastCommaIndex = 0;
+  float values[10];  // Array to store the parsed values
+  
+  // Parse the comma-separated values
+  for (int i = 0; i < data.length(); i++) {
+    if (data.charAt(i) == ',') {
+      if (paramCount > 0) {  // Skip the first 'P' character
+        String valueStr = data.substring(lastCommaIndex + 1, i);
+        values[paramCount - 1] = valueStr.toFloat();
       }
+      lastCommaIndex = i;
+      paramCount++;
     }
+  }
+  
+  // Update parameters if we received the correct number
+  if (paramCount == 11) {  // 10 parameters plus the initial 'P'
+    params.windSpeed = values[0];
+    params.feedSpeed = values[1];
+    params.rotSpeed = values[2];
+    params.windSteps = (long)values[3];
+    params.feedSteps = (long)values[4];
+    params.rotSteps = (long)values[5];
+    params.gearRatio = values[6];
+    params.windDirection = (bool)values[7];
+    params.coilsPerSlot = (int)values[8];
+    params.slotLength = values[9];
     
-    // Update parameters if we received the correct number
-    if (paramCount == 11) {  // 10 parameters plus the initial 'P'
-      params.windSpeed = values[0];
-      params.feedSpeed = values[1];
-      params.rotSpeed = values[2];
-      params.windSteps = (long)values[3];
-      params.feedSteps = (long)values[4];
-      params.rotSteps = (long)values[5];
-      params.gearRatio = values[6];
-      params.windDirection = (bool)values[7];
-      params.coilsPerSlot = (int)values[8];
-      params.slotLength = values[9];
-      
-      // Send confirmation
-      Serial.println("Parameters updated successfully");
-    } else {
-      Serial.println("Error: Invalid parameter count");
-    }
+    // Send confirmation
+    reply("ACK", 'P');
+  } else {
+    Serial.println("ERR,P,Invalid parameter count");
   }
-}
-
-// Add this to the existing loop() function case statement
-case 'E': // Emergency Stop
-  // Disable all motors
-  digitalWrite(WIND_EN_PIN, HIGH);
-  digitalWrite(FEED_EN_PIN, HIGH);
-  digitalWrite(ROT_EN_PIN, HIGH);
-  break;
\ No newline at end of file
+}
\ No newline at end of file
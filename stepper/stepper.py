@@ -1,33 +1,54 @@
+import asyncio
+import os
 import sys
 import serial
-import time
+import serial.tools.list_ports
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                            QHBoxLayout, QLabel, QLineEdit, QPushButton, 
-                           QComboBox, QGroupBox, QGridLayout, QMessageBox)
-from PyQt5.QtCore import Qt, QTimer
+                           QComboBox, QGroupBox, QGridLayout, QMessageBox,
+                           QProgressBar)
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from tbcore.transport import SerialTransport, install_event_loop, run_app
+from tbcore.planner import JobStream, WindingParams, plan_job
+from tbcore.winder import CommandFailed, JobRunner
+
+BAUDRATE = 115200
+ARDUINO_RESET_S = 2  # The board resets when the port opens
 
 class StatorWinderDashboard(QMainWindow):
-    def __init__(self):
+    def __init__(self, port=None):
         super().__init__()
         self.setWindowTitle("Stator Winding Machine Control")
         self.setGeometry(100, 100, 800, 600)
         
-        # Initialize serial connection
-        try:
-            self.serial = serial.Serial('COM3', 115200, timeout=1)
-            time.sleep(2)  # Wait for Arduino to reset
-        except:
-            self.serial = None
-            QMessageBox.warning(self, "Connection Error", 
-                              "Could not connect to Arduino. Check connection and port.")
+        self.serial = None  # tbcore.transport.SerialTransport once connected
+        self.runner = None  # tbcore.winder.JobRunner on top of it
+        self.plan = None  # tbcore.planner.Plan of the current parameters
+        self.job = None  # asyncio task streaming the plan
         
         self.initUI()
+        if port:
+            self.port_combo.setEditText(port)
+            self.toggleConnection()
         
     def initUI(self):
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
         main_layout = QVBoxLayout(central_widget)
         
+        # Connection
+        port_layout = QHBoxLayout()
+        self.port_combo = QComboBox()
+        self.port_combo.setEditable(True)
+        self.port_combo.addItems([p.device for p in serial.tools.list_ports.comports()])
+        self.connect_btn = QPushButton("Connect")
+        self.connect_btn.clicked.connect(self.toggleConnection)
+        port_layout.addWidget(QLabel("Port:"))
+        port_layout.addWidget(self.port_combo)
+        port_layout.addWidget(self.connect_btn)
+        main_layout.addLayout(port_layout)
+        
         # Parameters Group
         params_group = QGroupBox("Machine Parameters")
         params_layout = QGridLayout()
@@ -66,6 +87,9 @@ class StatorWinderDashboard(QMainWindow):
         
         self.update_btn = QPushButton("Update Parameters")
         self.update_btn.clicked.connect(self.updateParameters)
+
+        self.plan_btn = QPushButton("Plan Job")
+        self.plan_btn.clicked.connect(self.planJob)
         
         self.home_btn = QPushButton("Home All")
         self.home_btn.clicked.connect(self.homeAll)
@@ -78,15 +102,116 @@ class StatorWinderDashboard(QMainWindow):
         self.stop_btn.clicked.connect(self.emergencyStop)
         
         buttons_layout.addWidget(self.update_btn)
+        buttons_layout.addWidget(self.plan_btn)
         buttons_layout.addWidget(self.home_btn)
         buttons_layout.addWidget(self.start_btn)
         buttons_layout.addWidget(self.stop_btn)
         
         main_layout.addLayout(buttons_layout)
+
+        # Job progress, from the controller's PROGRESS reports
+        progress_group = QGroupBox("Job Progress")
+        progress_layout = QVBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.progress_label = QLabel("No job running")
+        self.queue_label = QLabel("Controller: not connected")
+        # Job time and limit warnings of the planned schedule
+        self.plan_label = QLabel("Job not planned")
+        self.plan_label.setWordWrap(True)
+        progress_layout.addWidget(self.plan_label)
+        progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.progress_label)
+        progress_layout.addWidget(self.queue_label)
+        progress_group.setLayout(progress_layout)
+        main_layout.addWidget(progress_group)
         
         # Status Bar
         self.statusBar().showMessage('Ready')
         
+    def toggleConnection(self):
+        if self.serial:
+            if self.job:
+                self.job.cancel()
+                self.job = None
+            if self.runner:
+                self.runner.close()
+                self.runner = None
+            self.serial.close_now()
+            self.serial = None
+            self.queue_label.setText("Controller: not connected")
+            self.connect_btn.setText("Connect")
+            self.port_combo.setEnabled(True)
+            self.statusBar().showMessage('Disconnected')
+        else:
+            self.serial = SerialTransport(self.port_combo.currentText(), BAUDRATE,
+                                          settle_s=ARDUINO_RESET_S,
+                                          on_state=lambda state: self.statusBar().showMessage(f'Port {state}'))
+            self.connect_btn.setText("Disconnect")
+            self.port_combo.setEnabled(False)
+            asyncio.ensure_future(self.readMessages(self.serial))
+
+    async def readMessages(self, transport):
+        """ Open the port and hand it to a job runner, which reads the controller """
+        try:
+            await transport.open()
+        except serial.SerialException as e:
+            if transport is self.serial:
+                self.toggleConnection()
+            QMessageBox.warning(self, "Connection Error",
+                              f"Could not connect to Arduino. Check connection and port.\n{e}")
+            return
+        if transport is not self.serial:
+            return
+        self.runner = JobRunner(transport, on_progress=self.showProgress,
+                                on_message=self.statusBar().showMessage,
+                                on_state=self.showRunnerState)
+        self.runner.start()
+        self.showRunnerState(self.runner.state)
+
+    def queueCommand(self, text, description, wait_done=False, retries=0):
+        """ Queue a controller command; the result lands in the status bar """
+        if not self.runner:
+            QMessageBox.warning(self, "Error", "No connection to Arduino")
+            return
+        future = self.runner.submit(text, wait_done=wait_done, retries=retries)
+        future.add_done_callback(lambda f: self.commandFinished(f, description))
+        self.showRunnerState(self.runner.state)
+
+    def commandFinished(self, future, description):
+        if future.cancelled():
+            return
+        try:
+            future.result()
+            self.statusBar().showMessage(f"{description}: done")
+        except CommandFailed as e:
+            self.commandFailed(future, description, str(e))
+        except Exception as e:
+            # e.g. a SerialException from a port lost mid-job; a done
+            # callback that raised would only be logged by the loop
+            self.commandFailed(future, description, f"{type(e).__name__}: {e}")
+        if self.runner:
+            self.showRunnerState(self.runner.state)
+
+    def commandFailed(self, future, description, reason):
+        self.statusBar().showMessage(f"{description}: {reason}")
+        if future is self.job:
+            self.job = None
+            self.progress_label.setText(f"Job stopped: {reason}")
+
+    def showProgress(self, progress):
+        self.progress_bar.setValue(int(progress.fraction * 1000))
+        self.progress_label.setText(
+            f"Slot {progress.slot} ({progress.index + 1} of 12), "
+            f"coil {progress.coil}/{progress.coils}, "
+            f"{progress.coils_done}/{progress.coils_total} coils, {progress.rate:.0f} steps/s"
+            + (f", {progress.remaining / 60:.1f} min left" if progress.remaining is not None else "")
+        )
+
+    def showRunnerState(self, state):
+        pending = self.runner.pending if self.runner else 0
+        self.queue_label.setText(f"Controller: {state}, {pending} command(s) queued")
+
     def addParameterField(self, layout, row, label_text, default_value):
         label = QLabel(label_text)
         field = QLineEdit(default_value)
@@ -94,49 +219,78 @@ class StatorWinderDashboard(QMainWindow):
         layout.addWidget(field, row, 1)
         return field
         
+    def windingParams(self):
+        """ The parameter fields as tbcore.planner.WindingParams; ValueError if one isn't a number """
+        return WindingParams(
+            float(self.wind_speed.text()), float(self.feed_speed.text()),
+            float(self.rot_speed.text()), int(self.wind_steps.text()),
+            int(self.feed_steps.text()), int(self.rot_steps.text()),
+            float(self.gear_ratio.text()),
+            self.wind_direction.currentText() == 'Clockwise',
+            int(self.coils_per_slot.text()), float(self.slot_length.text()),
+        )
+
     def updateParameters(self):
-        if not self.serial:
-            QMessageBox.warning(self, "Error", "No connection to Arduino")
-            return
-            
         try:
-            # Format: P,windSpeed,feedSpeed,rotSpeed,windSteps,feedSteps,rotSteps,
-            #          gearRatio,windDir,coilsPerSlot,slotLength\n
-            params = f"P,{self.wind_speed.text()},{self.feed_speed.text()},"
-            params += f"{self.rot_speed.text()},{self.wind_steps.text()},"
-            params += f"{self.feed_steps.text()},{self.rot_steps.text()},"
-            params += f"{self.gear_ratio.text()},"
-            params += f"{1 if self.wind_direction.currentText() == 'Clockwise' else 0},"
-            params += f"{self.coils_per_slot.text()},{self.slot_length.text()}\n"
-            
-            self.serial.write(params.encode())
-            self.statusBar().showMessage('Parameters updated successfully')
+            # Setting parameters is safe to repeat, so a lost ack is retried
+            self.queueCommand(self.windingParams().command(), 'Parameters update', retries=2)
             
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Failed to update parameters: {str(e)}")
+
+    def planJob(self):
+        """ Plan the job for the current parameters and show its time; None if they can't be """
+        try:
+            params = self.windingParams()
+            if not (self.plan and vars(self.plan.params) == vars(params)):
+                self.plan = plan_job(params)
+        except ValueError as e:
+            self.plan = None
+            self.plan_label.setText(f"Cannot plan this job: {e}")
+            return None
+        self.plan_label.setText("\n".join([self.plan.summary()] + self.plan.problems))
+        return self.plan
     
     def homeAll(self):
-        if self.serial:
-            self.serial.write(b'H\n')
-            self.statusBar().showMessage('Homing sequence initiated')
+        self.queueCommand('H', 'Homing', wait_done=True)
+        self.statusBar().showMessage('Homing sequence queued')
             
     def startWinding(self):
-        if self.serial:
-            self.serial.write(b'S\n')
-            self.statusBar().showMessage('Winding sequence started')
+        if not self.runner:
+            QMessageBox.warning(self, "Error", "No connection to Arduino")
+            return
+        if self.job and not self.job.done():
+            self.statusBar().showMessage('A job is already running')
+            return
+        plan = self.planJob()
+        if not plan:
+            return
+        self.progress_bar.setValue(0)
+        self.progress_label.setText("Waiting for the controller")
+        # The host-planned schedule streams while the UI stays live
+        self.job = asyncio.ensure_future(JobStream(self.runner, plan, self.showProgress).run())
+        self.job.add_done_callback(lambda job: self.commandFinished(job, 'Winding'))
+        self.statusBar().showMessage('Winding job started')
             
     def emergencyStop(self):
-        if self.serial:
-            self.serial.write(b'E\n')
-            self.statusBar().showMessage('EMERGENCY STOP ACTIVATED')
+        # Skips the queue: whatever was waiting is dropped
+        if self.runner:
+            self.runner.estop()
+        elif self.serial:
+            self.serial.send(b'E\n', urgent=True)
+        self.statusBar().showMessage('EMERGENCY STOP ACTIVATED')
             
     def closeEvent(self, event):
+        if self.runner:
+            self.runner.close()
         if self.serial:
-            self.serial.close()
+            self.serial.close_now()
         event.accept()
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
-    window = StatorWinderDashboard()
+    loop = install_event_loop(app)
+    # Optional port on the command line, e.g. python stepper.py COM3
+    window = StatorWinderDashboard(sys.argv[1] if len(sys.argv) > 1 else None)
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    sys.exit(run_app(app, loop))
\ No newline at end of file
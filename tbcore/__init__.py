@@ -0,0 +1 @@
+"""Shared acquisition code for the thrust bench dashboards."""
@@ -0,0 +1,251 @@
+"""Background serial acquisition shared by the thrust bench dashboards."""
+import queue
+import threading
+import time
+
+import numpy as np
+import serial
+
+from tbcore.hotplug import DeviceId
+from tbcore.protocol import ENABLE_BINARY, TextDecoder, make_decoder
+
+BAUDRATE = 57600
+RECONNECT_TIMEOUT_S = 60.0  # Give up on a vanished rig after this long
+RETRY_S = 0.5  # Time between reopen attempts while reconnecting
+
+# Lets every port box accept sim:// and replay:// URLs (see tbcore.simulator
+# and tbcore.replay)
+if 'tbcore.urlhandler' not in serial.protocol_handler_packages:
+    serial.protocol_handler_packages.append('tbcore.urlhandler')
+
+
+class WarmupGate:
+    """Timed warm-up phase for the ESC and load cell.
+
+    The phase starts with the first batch that arrives and lasts
+    `duration` seconds. Items seen meanwhile are discarded, or held back
+    and released together once the phase ends when `keep` is set. The
+    gate never sleeps: it only compares timestamps on each call.
+    """
+
+    WAITING = 'waiting'
+    WARMING_UP = 'warming up'
+    READY = 'ready'
+
+    def __init__(self, duration=4.0, keep=False, clock=time.monotonic):
+        self.duration = duration
+        self.keep = keep
+        self.clock = clock
+        self.state = self.WAITING
+        self.started = None
+        self.discarded = 0
+        self._held = []
+
+    def restart(self):
+        self.state = self.WAITING
+        self.started = None
+        self._held = []
+
+    def remaining(self):
+        if self.state == self.READY:
+            return 0.0
+        if self.state == self.WAITING:
+            return self.duration
+        return max(0.0, self.duration - (self.clock() - self.started))
+
+    def filter(self, items):
+        """ Pass items through once warmed up; call with [] to poll """
+        if self.state == self.READY:
+            return items
+        now = self.clock()
+        if self.state == self.WAITING:
+            if not items:
+                return items
+            self.state = self.WARMING_UP
+            self.started = now
+        if now - self.started >= self.duration:
+            self.state = self.READY
+            items, self._held = self._held + items, []
+            return items
+        if self.keep:
+            self._held.extend(items)
+        else:
+            self.discarded += len(items)
+        return []
+
+
+class SerialReader(threading.Thread):
+    """Drain a serial port on a background thread.
+
+    Raw bytes go through a telemetry decoder (ASCII lines by default, see
+    tbcore.protocol) and every decoded batch of columns is pushed onto a
+    queue. The GUI pulls them with drain() from its own frame timer, so
+    the port keeps being read while the UI is busy and plots never fall
+    behind real time.
+
+    With `reopen` (a callable returning a freshly opened port) a failed
+    port is replaced instead of ending the thread: reopen is retried every
+    RETRY_S seconds for up to `reconnect_timeout` seconds, the decoder
+    resynchronizes on the next valid line or frame, and the outage is
+    appended to `gaps` (and recorded, when recording) as (start, end)
+    host times.
+    """
+
+    READING = 'reading'
+    RECONNECTING = 'reconnecting'
+    FAILED = 'failed'
+
+    def __init__(self, serial_port, chunk_size=4096, warmup=None, decoder=None, recorder=None,
+                 derive=None, reopen=None, reconnect_timeout=RECONNECT_TIMEOUT_S,
+                 calibration=None):
+        super().__init__(daemon=True)
+        self.serial_port = serial_port
+        self.reopen = reopen
+        self.reconnect_timeout = reconnect_timeout
+        self.state = self.READING
+        self.gaps = []
+        self.warmup = warmup
+        self.decoder = decoder or TextDecoder()
+        # Optional callable adding channels to each batch, e.g. tbcore.derived.Derive
+        self.derive = derive
+        # Optional tbcore.calibration.Profile, applied before derive; may be swapped at any time
+        self.calibration = calibration
+        # Optional tbcore.recorder.SessionRecorder; may be swapped at any time
+        self.recorder = recorder
+        self.chunk_size = chunk_size
+        self.batches = queue.SimpleQueue()
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                # Ask for at least one byte so an idle port blocks in the
+                # driver (up to the port timeout) instead of spinning
+                waiting = self.serial_port.in_waiting
+                data = self.serial_port.read(max(1, min(waiting, self.chunk_size)))
+            except Exception as e:
+                if self._stop_event.is_set():
+                    break
+                if self.reopen and self._reconnect(e):
+                    continue
+                self.error = e
+                self.state = self.FAILED
+                print(f"Error reading data: {e}")
+                break
+            self.feed(data)
+
+    def _reconnect(self, error):
+        """ Replace the failed port; True once a new one is open """
+        print(f"Lost the rig ({error}), reconnecting")
+        self.state = self.RECONNECTING
+        gap_start = time.time()
+        try:
+            self.serial_port.close()
+        except Exception:
+            pass
+        deadline = time.monotonic() + self.reconnect_timeout
+        while not self._stop_event.is_set() and time.monotonic() < deadline:
+            try:
+                serial_port = self.reopen()
+            except (serial.SerialException, OSError):
+                self._stop_event.wait(RETRY_S)
+                continue
+            self.serial_port = serial_port
+            self.decoder.resync()
+            if self.warmup:
+                self.warmup.restart()  # the board reset, so the ESC re-arms
+            gap = (gap_start, time.time())
+            self.gaps.append(gap)
+            if self.recorder:
+                self.recorder.mark_gap(*gap)
+            self.state = self.READING
+            print(f"Reconnected after {gap[1] - gap[0]:.1f} s")
+            return True
+        return False
+
+    def write(self, data):
+        """ Send a command to whichever port is current; dropped while reconnecting """
+        try:
+            self.serial_port.write(data)
+        except (serial.SerialException, OSError) as e:
+            print(f"Error writing to the rig: {e}")
+
+    def feed(self, data):
+        """ Decode raw bytes and queue whatever complete batch they produce """
+        batch = self.decoder.feed(data) if data else None
+        batches = [batch] if batch else []
+        if self.warmup:
+            # Also polled on empty reads so held batches are released on time
+            batches = self.warmup.filter(batches)
+        recorder = self.recorder
+        calibration = self.calibration
+        for batch in batches:
+            if calibration:
+                calibration(batch)
+            if self.derive:
+                self.derive(batch)
+            if recorder:
+                recorder.write(batch)
+            self.batches.put(batch)
+
+    def drain(self):
+        """ Return every batch decoded since the last call, oldest first """
+        batches = []
+        while True:
+            try:
+                batches.append(self.batches.get_nowait())
+            except queue.Empty:
+                return batches
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def close(self):
+        """ Stop reading and release the port """
+        self.stop()
+        self.serial_port.close()
+
+
+def merge_batches(batches):
+    """ Concatenate drained batches into one, or None when there are none
+
+    A slow-talking port yields many one-line batches; handling them as
+    one keeps the per-frame cost independent of how the bytes arrived.
+    """
+    if len(batches) < 2:
+        return batches[0] if batches else None
+    return {name: np.concatenate([batch[name] for batch in batches]) for name in batches[0]}
+
+
+def open_reader(port, protocol='text', warmup_s=None, recorder=None, baudrate=BAUDRATE,
+                derive=None, reconnect_timeout=RECONNECT_TIMEOUT_S, calibration=None):
+    """ Open `port`, switch the firmware to `protocol` and start reading it
+
+    Unless reconnect_timeout is 0, a lost port is reopened: the same USB
+    device (by serial number, or VID:PID) wherever it reappears, or the
+    same name/URL for ports that carry no USB identity.
+    """
+    decoder = make_decoder(protocol)
+    device = DeviceId.of(port)
+
+    def reopen():
+        path = device.find() if device else port
+        if path is None:
+            raise serial.SerialException(f"{device} is not attached")
+        serial_port = serial.serial_for_url(path, baudrate, timeout=1)
+        if decoder.name == 'binary':
+            serial_port.write(ENABLE_BINARY)
+        return serial_port
+
+    serial_port = serial.serial_for_url(port, baudrate, timeout=1)
+    if decoder.name == 'binary':
+        serial_port.write(ENABLE_BINARY)
+    warmup = WarmupGate(warmup_s) if warmup_s else None
+    reader = SerialReader(serial_port, warmup=warmup, decoder=decoder, recorder=recorder,
+                          derive=derive, reopen=reopen if reconnect_timeout else None,
+                          reconnect_timeout=reconnect_timeout, calibration=calibration)
+    reader.start()
+    return reader
@@ -0,0 +1,281 @@
+"""Host-side calibration of the load cell and the Hall current sensor.
+
+A Profile maps what the firmware reports to calibrated units, one
+polynomial per channel (gain/offset is degree 1), and is applied to
+whole batches in place like tbcore.derived.Derive, so the reader thread
+calibrates each batch before it is derived, recorded or queued. The
+uncalibrated values are kept alongside as '<channel>_raw', which is what
+new calibration points are measured from.
+
+A calibration is a few captured points:
+
+    zero         nothing on the load cell / no current flowing -> 0
+    known load   a reference weight in g, or a clamp-meter reading in A
+
+Each point is the mean of the raw channel over `duration_s` seconds of
+incoming batches (Capture), so taking one costs a couple of seconds and
+neither a reflash nor the firmware's startup calibration. A zero alone
+only moves the offset; with more points the gain (or a polynomial of
+up to len(points) - 1 degrees) is fitted by least squares.
+
+Profiles are JSON files per rig, <root>/<rig>.json, with the points they
+were fitted from, so a refit or an audit never needs the rig again.
+"""
+import json
+import os
+import re
+import time
+
+import numpy as np
+from numpy.polynomial import polynomial
+
+CHANNELS = ('thrust', 'current')
+UNITS = {'thrust': "g", 'current': "A"}
+CALIBRATION_DIR = os.path.join(os.path.expanduser("~"), "thrustbench_calibration")
+CAPTURE_S = 2.0
+# Points whose spread, in calibrated units, is above this are flagged as taken
+# while the reading moved
+MAX_CAPTURE_STD = {'thrust': 2.0, 'current': 0.05}
+
+
+class Model:
+    """Polynomial in the raw reading; coefficients lowest order first."""
+
+    def __init__(self, coefficients=(0.0, 1.0)):
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)
+
+    @property
+    def degree(self):
+        return len(self.coefficients) - 1
+
+    @property
+    def offset(self):
+        return float(self.coefficients[0])
+
+    @property
+    def gain(self):
+        return float(self.coefficients[1]) if self.degree else 0.0
+
+    def __call__(self, raw):
+        if self.degree == 1:
+            # The common case, without polyval's Horner loop
+            return self.coefficients[0] + self.coefficients[1] * raw
+        return polynomial.polyval(raw, self.coefficients)
+
+    def slope(self, raw):
+        """ Calibrated units per raw unit at `raw` """
+        return polynomial.polyval(raw, polynomial.polyder(self.coefficients))
+
+    def __repr__(self):
+        return f"Model({[float(c) for c in self.coefficients]})"
+
+
+def fit(points, degree=1, base=None):
+    """ Least-squares Model through [(raw, reference), ...]
+
+    A single point can only fix the offset: the gain is kept from `base`
+    (the model in use), so a zero on its own re-tares without losing
+    the span.
+    """
+    if not points:
+        raise ValueError("No calibration points")
+    raw, reference = np.asarray(points, dtype=np.float64).T
+    if len(points) == 1:
+        base = base or Model()
+        coefficients = base.coefficients.copy()
+        coefficients[0] += reference[0] - base(raw[0])
+        return Model(coefficients)
+    degree = min(degree, len(points) - 1)
+    if np.ptp(raw) == 0:
+        raise ValueError("Calibration points all have the same raw reading")
+    return Model(polynomial.polyfit(raw, reference, degree))
+
+
+def residuals(model, points):
+    """ Reference minus calibrated value at each point """
+    raw, reference = np.asarray(points, dtype=np.float64).reshape(-1, 2).T
+    return reference - model(raw)
+
+
+class Profile:
+    """Per-rig calibration: a Model and its points for each channel.
+
+    Channels without a model pass through unchanged.
+    """
+
+    def __init__(self, rig, models=None, points=None, updated=None):
+        self.rig = rig
+        self.models = dict(models or {})
+        self.points = {name: list(p) for name, p in (points or {}).items()}
+        self.updated = updated
+
+    def __call__(self, columns):
+        # '_raw' is added for every channel, calibrated or not, so batches
+        # keep the same columns when a model is added or reset mid-run
+        for name in CHANNELS + tuple(set(self.models) - set(CHANNELS)):
+            raw = columns.get(name)
+            if raw is None:
+                continue
+            columns[name + '_raw'] = raw
+            model = self.models.get(name)
+            if model is not None:
+                columns[name] = model(raw)
+        return columns
+
+    def model(self, name):
+        return self.models.get(name, Model())
+
+    def copy(self):
+        """ Edit a copy and swap it in whole, so the reader never sees half an update """
+        return Profile.from_dict(self.to_dict())
+
+    def add_point(self, name, raw, reference, degree=1):
+        """ Record a point and refit the channel; a zero replaces earlier zeros """
+        points = [p for p in self.points.get(name, []) if reference != 0 or p[1] != 0]
+        points.append((float(raw), float(reference)))
+        self.set_points(name, points, degree)
+
+    def set_points(self, name, points, degree=1):
+        model = fit(points, degree, self.models.get(name))
+        self.points[name] = [tuple(p) for p in points]
+        self.models[name] = model
+        self.updated = time.strftime("%Y-%m-%dT%H:%M:%S")
+        return model
+
+    def reset(self, name=None):
+        """ Back to the firmware's own scaling for one channel, or all """
+        for channel in [name] if name else list(self.models):
+            self.models.pop(channel, None)
+            self.points.pop(channel, None)
+        self.updated = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+    def describe(self, name):
+        model = self.models.get(name)
+        if model is None:
+            return "firmware"
+        unit = UNITS.get(name, "")
+        if model.degree == 1:
+            text = f"{model.gain:.5g} x {model.offset:+.4g} {unit}"
+        else:
+            text = " ".join(f"{c:+.4g}x^{i}" for i, c in enumerate(model.coefficients))
+        points = self.points.get(name, [])
+        if len(points) > 1:
+            rms = float(np.sqrt(np.mean(residuals(model, points) ** 2)))
+            text += f" ({len(points)} pts, rms {rms:.3g} {unit})"
+        return text
+
+    def to_dict(self):
+        return {
+            'rig': self.rig,
+            'updated': self.updated,
+            'channels': {
+                name: {'coefficients': list(map(float, model.coefficients)),
+                       'points': [list(p) for p in self.points.get(name, [])]}
+                for name, model in self.models.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        channels = data.get('channels', {})
+        return cls(
+            data['rig'],
+            models={name: Model(c['coefficients']) for name, c in channels.items()},
+            points={name: [tuple(p) for p in c.get('points', [])] for name, c in channels.items()},
+            updated=data.get('updated'),
+        )
+
+
+def rig_key(port):
+    """ File-name-safe profile name for a port: its USB identity when it has one """
+    from tbcore.hotplug import DeviceId
+
+    device = DeviceId.of(port)
+    if device and device.serial_number:
+        name = device.serial_number
+    elif device and device.vid is not None:
+        name = f"{device.vid:04X}_{device.pid:04X}"
+    else:
+        name = port
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_") or "rig"
+
+
+def profile_path(rig, root=CALIBRATION_DIR):
+    return os.path.join(root, f"{rig}.json")
+
+
+def load_profile(rig, root=CALIBRATION_DIR):
+    """ The saved Profile for `rig`, or an empty one """
+    path = profile_path(rig, root)
+    if not os.path.exists(path):
+        return Profile(rig)
+    with open(path) as f:
+        return Profile.from_dict(json.load(f))
+
+
+def save_profile(profile, root=CALIBRATION_DIR):
+    os.makedirs(root, exist_ok=True)
+    path = profile_path(profile.rig, root)
+    # Write then rename, so a crash never leaves half a profile
+    with open(path + ".tmp", 'w') as f:
+        json.dump(profile.to_dict(), f, indent=2)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+class Capture:
+    """Mean of one raw channel over the next `duration_s` seconds of batches.
+
+    Like the sweep engine it has no thread or timer: feed it every batch
+    with add() until `done`. `model` converts the raw spread to calibrated
+    units for `steady`: with host calibration the raw readings are ADC
+    counts, so set it to the channel's model, ideally the one refitted
+    with this point.
+    """
+
+    def __init__(self, channel, reference=0.0, duration_s=CAPTURE_S, model=None):
+        self.channel = channel
+        self.reference = reference
+        self.duration_s = duration_s
+        self.model = model or Model()
+        self.t0 = None
+        self.done = False
+        self._values = []
+        self._elapsed = 0.0
+
+    def add(self, columns):
+        if self.done:
+            return
+        times = np.asarray(columns['time'], dtype=np.float64)
+        raw = columns.get(self.channel + '_raw', columns.get(self.channel))
+        if not len(times) or raw is None:
+            return
+        if self.t0 is None:
+            self.t0 = times[0]
+        keep = times < self.t0 + self.duration_s
+        self._values.append(np.asarray(raw, dtype=np.float64)[keep])
+        self._elapsed = times[-1] - self.t0
+        if not keep.all():
+            self.done = True
+
+    @property
+    def progress(self):
+        return min(1.0, self._elapsed / self.duration_s) if self.duration_s else 1.0
+
+    def result(self):
+        """ (mean, std, count) of the finite raw readings captured """
+        values = np.concatenate(self._values) if self._values else np.empty(0)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            raise ValueError(f"No {self.channel} readings captured")
+        return float(values.mean()), float(values.std()), len(values)
+
+    @property
+    def std(self):
+        """ Spread of the captured readings in calibrated units """
+        mean, std, _ = self.result()
+        return std * abs(float(self.model.slope(mean)))
+
+    @property
+    def steady(self):
+        return self.std <= MAX_CAPTURE_STD.get(self.channel, np.inf)
@@ -0,0 +1,114 @@
+"""Derived performance channels computed from each telemetry batch.
+
+    power             electrical power, W: supply voltage x current
+    g_per_w           efficiency, g of thrust per W
+    g_per_a           g of thrust per A
+    thrust_per_krpm2  thrust / (RPM / 1000)^2, g: roughly constant for a
+                      given prop, so drift shows prop or mount problems
+
+The thrustbench firmware doesn't measure the bus voltage, so a fixed
+supply voltage is used unless a batch carries a 'voltage' column. Ratios
+are NaN while current or RPM is too small to divide by meaningfully.
+
+Everything is plain NumPy over whole batches, so the cost per sample is
+a handful of vector operations. Derive() adds the channels to the batch
+in place, which lets the reader thread attach them before the batch is
+recorded or queued; ThrottleBins then keeps running per-throttle means
+without storing samples.
+"""
+import csv
+
+import numpy as np
+
+from tbcore.parser import FIELDS
+
+DERIVED = ('power', 'g_per_w', 'g_per_a', 'thrust_per_krpm2')
+LABELS = {
+    'thrust': "Thrust (g)",
+    'power': "Power (W)",
+    'g_per_w': "Efficiency (g/W)",
+    'g_per_a': "Thrust per amp (g/A)",
+    'thrust_per_krpm2': "Thrust / kRPM² (g)",
+}
+SUPPLY_VOLTAGE = 12.0  # 3S pack under load; pass the real value per rig
+MIN_CURRENT = 0.1  # A; below this the ratios are noise
+MIN_RPM = 100.0
+
+
+class Derive:
+    """Callable that adds the DERIVED channels to a batch of columns."""
+
+    def __init__(self, voltage=SUPPLY_VOLTAGE, min_current=MIN_CURRENT, min_rpm=MIN_RPM):
+        self.voltage = voltage
+        self.min_current = min_current
+        self.min_rpm = min_rpm
+
+    def __call__(self, columns):
+        current = columns['current']
+        thrust = columns['thrust']
+        voltage = columns.get('voltage', self.voltage)
+        power = voltage * current
+        with np.errstate(divide='ignore', invalid='ignore'):
+            live = current >= self.min_current
+            columns['power'] = power
+            columns['g_per_w'] = np.where(live, thrust / power, np.nan)
+            columns['g_per_a'] = np.where(live, thrust / current, np.nan)
+            krpm = columns['rpm'] / 1000.0
+            columns['thrust_per_krpm2'] = np.where(
+                columns['rpm'] >= self.min_rpm, thrust / (krpm * krpm), np.nan
+            )
+        return columns
+
+
+class ThrottleBins:
+    """Running per-throttle-bin means of a set of channels.
+
+    Samples are binned by their reported throttle, `width` percent per
+    bin; only sums and counts are kept.
+    """
+
+    def __init__(self, channels=FIELDS + DERIVED, width=5):
+        self.channels = tuple(channels)
+        self.width = width
+        nbins = 100 // width + 1
+        self.sums = np.zeros((len(self.channels), nbins))
+        self.counts = np.zeros((len(self.channels), nbins), dtype=np.int64)
+
+    def add(self, columns):
+        throttle = np.asarray(columns['throttle'], dtype=np.float64)
+        ok = ~np.isnan(throttle)
+        index = np.clip(np.rint(throttle[ok] / self.width), 0, self.sums.shape[1] - 1).astype(np.intp)
+        nbins = self.sums.shape[1]
+        for row, name in enumerate(self.channels):
+            if name not in columns:
+                continue
+            values = np.asarray(columns[name], dtype=np.float64)[ok]
+            finite = np.isfinite(values)
+            self.sums[row] += np.bincount(index[finite], values[finite], nbins)
+            self.counts[row] += np.bincount(index[finite], minlength=nbins)
+
+    def reset(self):
+        self.sums[:] = 0
+        self.counts[:] = 0
+
+    def table(self):
+        """ {'throttle': bin centres, channel: mean per bin} for bins with data """
+        used = self.counts.any(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = self.sums[:, used] / self.counts[:, used]
+        table = {'throttle': np.flatnonzero(used) * float(self.width)}
+        for row, name in enumerate(self.channels):
+            if name != 'throttle':
+                table[name] = means[row]
+        return table
+
+    def curve(self, name):
+        table = self.table()
+        return table['throttle'], table[name]
+
+    def write_csv(self, path):
+        table = self.table()
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(table)
+            writer.writerows(zip(*table.values()))
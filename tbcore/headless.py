@@ -0,0 +1,233 @@
+"""Headless thrust bench acquisition: no Qt, no display.
+
+Runs a throttle program against a rig, records every sample to a session
+directory and prints a per-step summary, e.g.
+
+    python -m tbcore.headless COM6 --program 20:30,40:30,60:30 --record ~/runs
+    python -m tbcore.headless COM6 --sweep 10:100:10 --sweep-csv sweep.csv
+    python -m tbcore.headless COM6 --program 10:20,50:20,90:20 --bins-csv bins.csv
+    python -m tbcore.headless "replay://~/runs/20240101-120000?speed=0" --warmup 0
+
+Each program step is "<throttle %>:<seconds>". A --sweep profile instead
+moves to the next throttle as soon as the readings settle (see
+tbcore.sweep). Without either the rig is only monitored, for --duration
+seconds or until Ctrl+C; a replay:// source also ends the run when the
+recording runs out (unless it loops).
+
+--bins-csv writes the per-throttle-bin means of every channel (see
+tbcore.derived.ThrottleBins) at the end of any run.
+
+The rig's calibration profile (saved by the dashboard's CAL dialog, see
+tbcore.calibration) is applied when there is one.
+"""
+import argparse
+import os
+import sys
+import time
+
+from tbcore.acquisition import RECONNECT_TIMEOUT_S, open_reader
+from tbcore.calibration import CALIBRATION_DIR, CHANNELS as CALIBRATED, load_profile, rig_key
+from tbcore.derived import DERIVED, SUPPLY_VOLTAGE, Derive, ThrottleBins
+from tbcore.parser import FIELDS
+from tbcore.protocol import DECODERS
+from tbcore.recorder import CHANNELS, SessionRecorder, new_session_path
+from tbcore.stats import StatsEngine
+from tbcore.sweep import SweepEngine, parse_profile
+
+POLL_S = 0.1
+END_POLLS = 2  # quiet polls after a replay's last row before the run ends
+
+
+def parse_program(text):
+    """ "20:30,40:30" -> [(20, 30.0), (40, 30.0)] """
+    steps = []
+    for step in text.split(","):
+        throttle, seconds = step.split(":")
+        throttle = int(throttle)
+        if not 0 <= throttle <= 100:
+            raise ValueError(f"Throttle out of range: {throttle}")
+        steps.append((throttle, float(seconds)))
+    return steps
+
+
+def replay_done(reader):
+    """ True once a replay:// source has played its last row """
+    replay = getattr(reader.serial_port, 'replay', None)
+    return replay is not None and replay.done
+
+
+def print_summary(stats, extra):
+    print(f"{'Throttle %':>10} {'Samples':>8} {'Thrust g':>9} {'+/-':>6} {'p95':>7} "
+          f"{'Current A':>9} {'Power W':>8} {'g/W':>5} {'RPM':>7} {'Max temp C':>10}")
+    rows = [(step, stats.steps[step]) for step in stats.steps] + [('all', stats.session)]
+    for label, scope in rows:
+        thrust = scope.summary('thrust')
+        print(f"{label:>10} {scope.samples:>8} {thrust['mean']:>9.1f} {thrust['std']:>6.1f} "
+              f"{thrust['p95']:>7.1f} {scope.summary('current')['mean']:>9.2f} "
+              f"{scope.summary('power')['mean']:>8.1f} {scope.summary('g_per_w')['mean']:>5.2f} "
+              f"{scope.summary('rpm')['mean']:>7.0f} {scope.summary('object_temp')['max']:>10.1f}")
+    for line in extra:
+        print(line)
+
+
+def print_status(stats):
+    """ One line of live sliding-window statistics """
+    thrust, current, rpm = (stats.query(name, 'window') for name in ('thrust', 'current', 'rpm'))
+    print(f"  last {stats.window_s:g} s: thrust {thrust['mean']:.1f} +/- {thrust['std']:.1f} g, "
+          f"current {current['mean']:.2f} A, rpm {rpm['mean']:.0f}")
+
+
+def print_sweep(points):
+    print(f"{'Throttle %':>10} {'Settled':>7} {'Dwell s':>7} {'Thrust g':>9} "
+          f"{'+/-':>6} {'Current A':>9} {'RPM':>7}")
+    for p in points:
+        print(f"{p['target']:>10} {'yes' if p['settled'] else 'NO':>7} {p['dwell_s']:>7.1f} "
+              f"{p['thrust']:>9.1f} {p['thrust_std']:>6.1f} {p['current']:>9.2f} {p['rpm']:>7.0f}")
+
+
+def run_sweep(reader, engine, stats, bins):
+    """ Drive the sweep until its last step is recorded """
+    engine.start()
+    stats.set_step(engine.throttle)
+    print(f"Sweep: {engine.throttle}%")
+    while engine.running:
+        time.sleep(POLL_S)
+        batches = reader.drain() or [None]
+        for batch in batches:
+            if batch is not None:
+                stats.add(batch)
+                bins.add(batch)
+            point = engine.update(batch)
+            if point:
+                state = "settled" if point['settled'] else "timed out"
+                print(f"  {point['target']}% {state} after {point['dwell_s']:.1f} s: "
+                      f"{point['thrust']:.1f} g")
+                if engine.running:
+                    stats.set_step(engine.throttle)
+                    print(f"Sweep: {engine.throttle}%")
+        if reader.error:
+            raise reader.error
+
+
+def run(args):
+    program = parse_program(args.program) if args.program else [(None, args.duration)]
+    calibration = None
+    if not args.no_calibration:
+        calibration = load_profile(rig_key(args.port), args.calibration_dir)
+        for name in CALIBRATED:
+            print(f"Calibration {name}: {calibration.describe(name)}")
+    recorder = None
+    if args.record:
+        recorder = SessionRecorder(
+            new_session_path(args.record), CHANNELS + DERIVED,
+            metadata={'port': args.port, 'protocol': args.protocol,
+                      'program': args.program, 'sweep': args.sweep, 'voltage': args.voltage,
+                      'calibration': calibration.to_dict() if calibration else None},
+        )
+    reader = open_reader(args.port, args.protocol, args.warmup, recorder,
+                         derive=Derive(args.voltage), reconnect_timeout=args.reconnect_timeout,
+                         calibration=calibration)
+    print(f"Connected to {args.port}")
+
+    stats = StatsEngine(FIELDS + DERIVED)
+    bins = ThrottleBins()
+    engine = None
+    try:
+        if args.sweep:
+            engine = SweepEngine(parse_profile(args.sweep), reader.write,
+                                 window_s=args.settle_window, max_dwell_s=args.max_dwell)
+            run_sweep(reader, engine, stats, bins)
+            program = []
+        for throttle, seconds in program:
+            stats.set_step(throttle if throttle is not None else '-')
+            if throttle is not None:
+                reader.write(f"{throttle}%\n".encode())
+                print(f"Throttle {throttle}% for {seconds:g} s")
+            end = time.monotonic() + seconds if seconds else None
+            next_status = time.monotonic() + args.status
+            quiet = 0
+            while end is None or time.monotonic() < end:
+                time.sleep(POLL_S)
+                batches = reader.drain()
+                for batch in batches:
+                    stats.add(batch)
+                    bins.add(batch)
+                if args.status and time.monotonic() >= next_status:
+                    print_status(stats)
+                    next_status += args.status
+                if reader.error:
+                    raise reader.error
+                # The reader may still hold the last rows when the replay ends
+                quiet = quiet + 1 if replay_done(reader) and not batches else 0
+                if quiet >= END_POLLS:
+                    break
+            if quiet >= END_POLLS:
+                print("End of replay")
+                break
+    except KeyboardInterrupt:
+        print("Interrupted")
+    finally:
+        reader.write(b"S\n")
+        reader.close()
+        if recorder:
+            recorder.close()
+
+    extra = [f"Malformed lines: {getattr(reader.decoder, 'malformed', 0)}"]
+    if reader.gaps:
+        extra.append(f"Reconnects: {len(reader.gaps)}, "
+                     f"{sum(t1 - t0 for t0, t1 in reader.gaps):.1f} s without data")
+    if hasattr(reader.decoder, 'lost_frames'):
+        extra.append(f"Lost frames: {reader.decoder.lost_frames}")
+    if recorder:
+        extra.append(f"Recorded {recorder.rows} samples to {recorder.path}")
+    print_summary(stats, extra)
+    if engine and engine.points:
+        print_sweep(engine.points)
+        if args.sweep_csv:
+            engine.write_csv(args.sweep_csv)
+            print(f"Operating points written to {args.sweep_csv}")
+    if args.bins_csv:
+        bins.write_csv(args.bins_csv)
+        print(f"Throttle bins written to {args.bins_csv}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the thrust bench without the GUI.")
+    parser.add_argument('port', help="serial port, e.g. COM6 or /dev/ttyACM0")
+    parser.add_argument('--protocol', choices=sorted(DECODERS), default='text')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--program', help="throttle steps as <percent>:<seconds>,...")
+    mode.add_argument('--sweep', metavar='PROFILE',
+                      help="settle-and-advance sweep, <start>:<stop>:<step> or <percent>,...")
+    parser.add_argument('--settle-window', type=float, default=1.0,
+                        help="seconds of steady readings that end a sweep step")
+    parser.add_argument('--max-dwell', type=float, default=30.0,
+                        help="longest a sweep step may wait to settle")
+    parser.add_argument('--sweep-csv', metavar='FILE', help="write the sweep operating points here")
+    parser.add_argument('--bins-csv', metavar='FILE',
+                        help="write per-throttle-bin means of every channel here")
+    parser.add_argument('--duration', type=float, default=0,
+                        help="seconds to monitor without a program (0 = until Ctrl+C)")
+    parser.add_argument('--warmup', type=float, default=4.0,
+                        help="seconds of data discarded after the first line")
+    parser.add_argument('--reconnect-timeout', type=float, default=RECONNECT_TIMEOUT_S,
+                        help="seconds to keep reopening a lost port (0 disables)")
+    parser.add_argument('--voltage', type=float, default=SUPPLY_VOLTAGE,
+                        help="supply voltage used for power and efficiency")
+    parser.add_argument('--calibration-dir', default=CALIBRATION_DIR,
+                        help="where per-rig calibration profiles are kept")
+    parser.add_argument('--no-calibration', action='store_true',
+                        help="use the firmware's scaling even if the rig has a profile")
+    parser.add_argument('--status', type=float, default=0,
+                        help="print sliding-window statistics every N seconds (0 = off)")
+    parser.add_argument('--record', metavar='DIR',
+                        help="record the run to a new session under DIR")
+    args = parser.parse_args(argv)
+    if args.record:
+        args.record = os.path.expanduser(args.record)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
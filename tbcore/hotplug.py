@@ -0,0 +1,121 @@
+"""USB serial hot-plug detection and device identity.
+
+A USB serial adapter may come back under a different name after a cable
+blip (COM6 -> COM7, /dev/ttyACM0 -> /dev/ttyACM1), so rigs are
+identified by what the device reports instead: its USB serial number
+when it has one, otherwise VID:PID (only trusted when exactly one
+attached device matches).
+
+PortWatcher enumerates ports on a background thread and reports
+arrivals and removals through a queue; enumeration is cheap, but it
+never runs on the GUI thread.
+
+pyserial is only imported by the first enumeration, so a dashboard can
+start its watcher before its window is up without paying for it.
+"""
+import queue
+import threading
+
+SCAN_S = 1.0
+
+
+def comports():
+    import serial.tools.list_ports
+
+    return serial.tools.list_ports.comports()
+
+
+class DeviceId:
+    """What identifies one physical rig across reconnects."""
+
+    def __init__(self, serial_number=None, vid=None, pid=None, device=None):
+        self.serial_number = serial_number
+        self.vid = vid
+        self.pid = pid
+        self.device = device  # last known port name
+
+    @classmethod
+    def of(cls, port, ports=None):
+        """ Identity of the device currently at `port`; None for URLs and unknown ports """
+        for info in ports if ports is not None else comports():
+            if info.device == port:
+                return cls(info.serial_number, info.vid, info.pid, info.device)
+        return None
+
+    def matches(self, info):
+        if self.serial_number:
+            return info.serial_number == self.serial_number
+        if self.vid is not None:
+            return (info.vid, info.pid) == (self.vid, self.pid)
+        return info.device == self.device  # e.g. a built-in UART
+
+    def find(self, ports=None):
+        """ Port name the device is attached at now, or None """
+        candidates = [info for info in (ports if ports is not None else comports())
+                      if self.matches(info)]
+        # Prefer the old name when several adapters share a VID:PID
+        for info in candidates:
+            if info.device == self.device:
+                return info.device
+        if len(candidates) == 1:
+            return candidates[0].device
+        return None
+
+    def __repr__(self):
+        if self.serial_number:
+            return f"DeviceId(serial={self.serial_number!r})"
+        if self.vid is not None:
+            return f"DeviceId({self.vid:04X}:{self.pid:04X})"
+        return f"DeviceId(device={self.device!r})"
+
+
+class PortWatcher(threading.Thread):
+    """Report serial ports appearing and disappearing.
+
+    events holds ('added' | 'removed', ListPortInfo) tuples; drain() them
+    from the GUI timer. ports always holds the latest enumeration, and
+    `scanned` is set once the first one is done.
+    """
+
+    ADDED = 'added'
+    REMOVED = 'removed'
+
+    def __init__(self, interval=SCAN_S, comports=comports):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.comports = comports
+        self.events = queue.SimpleQueue()
+        self.ports = []
+        self.scanned = threading.Event()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        known = None  # the first scan is the baseline, not arrivals
+        while True:
+            try:
+                ports = list(self.comports())
+            except Exception as e:
+                print(f"Error listing ports: {e}")
+                ports = self.ports
+            current = {info.device: info for info in ports}
+            if known is not None:
+                for device in current.keys() - known.keys():
+                    self.events.put((self.ADDED, current[device]))
+                for device in known.keys() - current.keys():
+                    self.events.put((self.REMOVED, known[device]))
+            known = current
+            self.ports = ports
+            self.scanned.set()
+            if self._stop_event.wait(self.interval):
+                return
+
+    def drain(self):
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def stop(self):
+        self._stop_event.set()
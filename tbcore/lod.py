@@ -0,0 +1,269 @@
+"""Min/max/mean level-of-detail pyramids for plotting long sessions.
+
+Level k summarizes blocks of FACTOR**k consecutive samples of every
+channel by their minimum, maximum and mean ('time' included, so the
+block's time span and centre come for free). Blocks are built as samples
+arrive: only complete blocks are emitted, the partial one at each level
+waits in a short tail, and each level is fed by the blocks of the level
+below, so adding a batch costs a few vector operations per level.
+
+LodPyramid keeps the levels in memory, or appends them to <dir>/lod/
+(SessionRecorder does that on its writer thread while recording, the
+dashboard in its spill directory so a long session doesn't grow in RAM).
+A file-backed pyramid is read through memory maps of the blocks written
+so far. open_lod() memory-maps a recorded Session's pyramid, and
+build_lod() creates one for sessions recorded without.
+
+curve() picks the level whose blocks are about one screen pixel wide, so
+drawing any span of a session touches a few thousand values, and fills
+in the newest samples not yet in a complete block from the raw data.
+Blocks may straddle a connection outage, so curve() breaks the line
+(a NaN point) at every time in `gaps`.
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+
+from tbcore.render import minmax_decimate
+
+FACTOR = 8  # Samples per block at level 1, and level k blocks per level k+1 block
+LEVELS = 6  # Level 6 blocks hold 8**6, about a quarter million samples
+STATS = ('min', 'max', 'mean')
+LOD_DIR = 'lod'
+DTYPE = np.dtype('<f8')
+
+
+class _Growable:
+    """Append-only float64 array with amortized doubling."""
+
+    def __init__(self):
+        self._data = np.empty(1024)
+        self._count = 0
+
+    def extend(self, values):
+        n = self._count + len(values)
+        if n > len(self._data):
+            data = np.empty(max(n, 2 * len(self._data)))
+            data[:self._count] = self._data[:self._count]
+            self._data = data
+        self._data[self._count:n] = values
+        self._count = n
+
+    def view(self):
+        return self._data[:self._count]
+
+
+class _LodReader:
+    """curve() over whatever level(k) returns; shared by live and recorded pyramids."""
+
+    gaps = ()  # start times of connection outages
+
+    def blocks(self, k):
+        """ Complete blocks at level k so far """
+        return len(self.level(k)['time']['min'])
+
+    def curve(self, channel, t0, t1, max_points, raw):
+        """ x, y of `channel` between t0 and t1, about max_points long
+
+        raw is (times, values) of the samples themselves, e.g. ring
+        buffer views or Session memmaps; it has to hold at least the
+        newest samples, which no complete block covers yet.
+        """
+        raw_times, raw_values = raw
+        k = self.level_for(t0, t1, max_points)
+        if not k:
+            lo = int(np.searchsorted(raw_times, t0))
+            hi = int(np.searchsorted(raw_times, t1, side='right'))
+            return self._break_gaps(*minmax_decimate(raw_times[lo:hi], raw_values[lo:hi], max_points))
+        times = self.level(k)['time']
+        b0 = int(np.searchsorted(times['max'], t0))
+        b1 = int(np.searchsorted(times['min'], t1, side='right'))
+        stats = self.level(k)[channel]
+        x = np.repeat(times['mean'][b0:b1], 2)
+        y = np.column_stack((stats['min'][b0:b1], stats['max'][b0:b1])).ravel()
+        # Samples after the last complete block come from the raw data
+        covered = times['max'][b1 - 1] if b1 > b0 else t0
+        lo = int(np.searchsorted(raw_times, covered, side='right'))
+        hi = int(np.searchsorted(raw_times, t1, side='right'))
+        if hi > lo:
+            tail_x, tail_y = minmax_decimate(raw_times[lo:hi], raw_values[lo:hi], max_points)
+            x = np.concatenate((x, tail_x))
+            y = np.concatenate((y, tail_y))
+        return self._break_gaps(x, y)
+
+    def _break_gaps(self, x, y):
+        gaps = [t for t in self.gaps if len(x) and x[0] < t < x[-1]]
+        if not gaps:
+            return x, y
+        at = np.searchsorted(x, gaps)
+        return (np.insert(np.asarray(x, dtype=np.float64), at, gaps),
+                np.insert(np.asarray(y, dtype=np.float64), at, np.nan))
+
+    def level_for(self, t0, t1, max_points):
+        """ Finest level with at most max_points blocks between t0 and t1; 0 = raw samples """
+        for k in range(1, self.levels + 1):
+            times = self.level(k)['time']
+            count = (np.searchsorted(times['min'], t1, side='right')
+                     - np.searchsorted(times['max'], t0))
+            if k == 1 and count * self.factor <= max_points:
+                return 0
+            if count <= max_points:
+                return k
+        return self.levels
+
+
+class LodPyramid(_LodReader):
+    """Pyramid built incrementally from batches of columns.
+
+    In memory by default; with `path` (a session or spill directory)
+    completed blocks are appended to <path>/lod/ instead and not kept.
+    """
+
+    def __init__(self, channels, factor=FACTOR, levels=LEVELS, path=None):
+        self.channels = tuple(channels)
+        if 'time' not in self.channels:
+            self.channels = ('time',) + self.channels
+        self.factor = factor
+        self.levels = levels
+        self.path = os.path.join(path, LOD_DIR) if path else None
+        # Per level: (min, max, sum, count) arrays of the inputs not yet in a block
+        empty = np.empty((4, len(self.channels), 0))
+        self._tails = [empty] * levels
+        self.gaps = []
+        self._written = [0] * levels  # blocks on disk per level
+        self._maps = {}  # level -> (blocks mapped, maps)
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+            with open(os.path.join(self.path, 'lod.json'), 'w') as f:
+                json.dump({'channels': list(self.channels), 'factor': factor,
+                           'levels': levels, 'dtype': DTYPE.str}, f, indent=2)
+            self._files = {
+                (k, name, stat): open(os.path.join(self.path, f"{name}.{k}.{stat}.f8"), 'ab')
+                for k in range(1, levels + 1) for name in self.channels for stat in STATS
+            }
+        else:
+            self._levels = [{name: {stat: _Growable() for stat in STATS} for name in self.channels}
+                            for _ in range(levels)]
+
+    def add(self, columns):
+        """ Add a batch (dict of equal-length arrays); channels it lacks count as NaN """
+        n = len(columns['time'])
+        if not n:
+            return
+        values = np.array([np.asarray(columns[name], dtype=np.float64) if name in columns
+                           else np.full(n, np.nan) for name in self.channels])
+        valid = ~np.isnan(values)
+        items = np.stack((values, values, np.where(valid, values, 0.0), valid.astype(np.float64)))
+        for k in range(1, self.levels + 1):
+            items = self._reduce(k, items)
+            if items is None:
+                return
+
+    def _reduce(self, k, items):
+        # items: (4, channels, n) inputs to level k; returns its completed blocks
+        pending = np.concatenate((self._tails[k - 1], items), axis=2)
+        full = pending.shape[2] // self.factor * self.factor
+        self._tails[k - 1] = pending[:, :, full:]
+        if not full:
+            return None
+        shape = (len(self.channels), full // self.factor, self.factor)
+        lo = np.fmin.reduce(pending[0, :, :full].reshape(shape), axis=2)
+        hi = np.fmax.reduce(pending[1, :, :full].reshape(shape), axis=2)
+        total = pending[2, :, :full].reshape(shape).sum(axis=2)
+        count = pending[3, :, :full].reshape(shape).sum(axis=2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+        for row, name in enumerate(self.channels):
+            for stat, data in zip(STATS, (lo[row], hi[row], mean[row])):
+                if self.path:
+                    self._files[k, name, stat].write(data.astype(DTYPE).tobytes())
+                else:
+                    self._levels[k - 1][name][stat].extend(data)
+        self._written[k - 1] += full // self.factor
+        return np.stack((lo, hi, total, count))
+
+    def add_gap(self, t):
+        """ Mark a connection outage starting at time t; curves break there """
+        self.gaps.append(t)
+
+    def level(self, k):
+        if not self.path:
+            return {name: {stat: g.view() for stat, g in stats.items()}
+                    for name, stats in self._levels[k - 1].items()}
+        count = self._written[k - 1]
+        mapped, maps = self._maps.get(k, (None, None))
+        if mapped != count:
+            # Remapped only when the level has grown; coarse levels rarely do
+            self.flush()
+            maps = {name: {stat: self._map(k, name, stat, count) for stat in STATS}
+                    for name in self.channels}
+            self._maps[k] = (count, maps)
+        return maps
+
+    def _map(self, k, name, stat, count):
+        if not count:
+            return np.empty(0, dtype=DTYPE)
+        return np.memmap(self._files[k, name, stat].name, dtype=DTYPE, mode='r', shape=(count,))
+
+    def flush(self):
+        if self.path:
+            for f in self._files.values():
+                f.flush()
+
+    def close(self):
+        self._maps.clear()
+        if self.path:
+            for f in self._files.values():
+                f.close()
+
+
+class LodFiles(_LodReader):
+    """A recording's pyramid, memory-mapped level by level."""
+
+    def __init__(self, path, rows=None):
+        self.path = os.path.join(path, LOD_DIR)
+        with open(os.path.join(self.path, 'lod.json')) as f:
+            info = json.load(f)
+        self.channels = tuple(info['channels'])
+        self.factor = info['factor']
+        self.levels = info['levels']
+        self.dtype = np.dtype(info.get('dtype', DTYPE.str))
+        self._rows = rows
+        self._maps = {}
+
+    def level(self, k):
+        if k not in self._maps:
+            self._maps[k] = {name: {stat: self._map(k, name, stat) for stat in STATS}
+                             for name in self.channels}
+        return self._maps[k]
+
+    def _map(self, k, name, stat):
+        path = os.path.join(self.path, f"{name}.{k}.{stat}.f8")
+        count = os.path.getsize(path) // self.dtype.itemsize
+        if self._rows is not None:
+            # Blocks written after the last committed chunk (e.g. before a crash) don't count
+            count = min(count, self._rows // self.factor ** k)
+        if not count:
+            return np.empty(0, dtype=self.dtype)
+        return np.memmap(path, dtype=self.dtype, mode='r', shape=(count,))
+
+
+def open_lod(session):
+    """ The pyramid recorded with a tbcore.recorder.Session, or None if it has none """
+    if not os.path.exists(os.path.join(session.path, LOD_DIR, 'lod.json')):
+        return None
+    lod = LodFiles(session.path, rows=len(session))
+    lod.gaps = [gap['t0'] for gap in session.gaps]
+    return lod
+
+
+def build_lod(session, factor=FACTOR, levels=LEVELS, chunk_rows=1 << 20):
+    """ (Re)build the pyramid of a recorded Session from its channel files """
+    shutil.rmtree(os.path.join(session.path, LOD_DIR), ignore_errors=True)
+    pyramid = LodPyramid(session.channels, factor, levels, path=session.path)
+    for lo in range(0, len(session), chunk_rows):
+        pyramid.add(session.slice(lo, lo + chunk_rows))
+    pyramid.close()
+    return LodFiles(session.path, rows=len(session))
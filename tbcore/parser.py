@@ -0,0 +1,105 @@
+"""Batch parser for the ASCII telemetry lines.
+
+The firmware variants in this repo print the same fields in different
+orders and with or without a colon after "Throttle", e.g.
+
+    Throttle50.00,RPM:5400,PulseCount:90,Thrust:812.4,Current:11.52,AmbientTemp:24.1,ObjectTemp:38.7
+    Throttle:50.00,Thrust:812.4,RPM:5400,Current:11.52,AmbientTemp:24.1,ObjectTemp:38.7
+
+parse_lines() takes a chunk holding many complete lines and returns one
+float64 array per field. The layout of the first telemetry line is
+compiled into a regex that matches every line of the chunk in one pass;
+lines that don't fit it fall back to a per-line parse. Fields a firmware
+doesn't send come back as NaN.
+"""
+import re
+
+import numpy as np
+
+FIELDS = ('throttle', 'rpm', 'pulse_count', 'thrust', 'current',
+          'ambient_temp', 'object_temp')
+KEYS = {
+    b'Throttle': 'throttle',
+    b'RPM': 'rpm',
+    b'PulseCount': 'pulse_count',
+    b'Thrust': 'thrust',
+    b'Current': 'current',
+    b'AmbientTemp': 'ambient_temp',
+    b'ObjectTemp': 'object_temp',
+}
+
+_NUMBER = rb'[-+]?(?:\d+(?:\.\d*)?|\.\d+)|nan|inf'
+_PAIR = re.compile(rb'([A-Za-z]+)\s*:?\s*(' + _NUMBER + rb')')
+_TELEMETRY_LINE = re.compile(rb'^[ \t]*(Throttle[^\r\n]*)', re.M)
+_layouts = {}
+
+
+class TelemetryBatch:
+    """Columns parsed from one chunk plus the count of rejected lines."""
+
+    def __init__(self, columns, malformed=0):
+        self.columns = columns
+        self.malformed = malformed
+
+    def __len__(self):
+        return len(self.columns[FIELDS[0]])
+
+
+def _layout_pattern(keys):
+    """ Regex matching a whole telemetry line with the given key order """
+    pattern = _layouts.get(keys)
+    if pattern is None:
+        fields = [re.escape(key) + rb'\s*:?\s*(' + _NUMBER + rb')' for key in keys]
+        pattern = re.compile(rb'^[ \t]*' + rb'\s*,\s*'.join(fields) + rb'\s*$', re.M)
+        _layouts[keys] = pattern
+    return pattern
+
+
+def _split_pairs(line):
+    """ [(key, value), ...] for a line, or None if any segment is garbage """
+    pairs = []
+    for part in line.split(b','):
+        match = _PAIR.fullmatch(part.strip())
+        if not match:
+            return None
+        pairs.append((match.group(1), match.group(2)))
+    return pairs
+
+
+def _empty_columns(n):
+    return {name: np.full(n, np.nan) for name in FIELDS}
+
+
+def parse_lines(chunk):
+    """ Parse every telemetry line in `chunk` (bytes) into a TelemetryBatch """
+    lines = _TELEMETRY_LINE.findall(chunk)
+    if not lines:
+        return TelemetryBatch(_empty_columns(0))
+
+    # Fast path: every line shares the layout of the first one
+    first = _split_pairs(lines[0].rstrip())
+    if first:
+        keys = tuple(key for key, _ in first)
+        rows = _layout_pattern(keys).findall(chunk)
+        if len(rows) == len(lines):
+            values = np.array(rows, dtype=np.float64).reshape(len(rows), len(keys))
+            columns = _empty_columns(len(rows))
+            for i, key in enumerate(keys):
+                if key in KEYS:
+                    columns[KEYS[key]] = values[:, i]
+            return TelemetryBatch(columns)
+
+    # Slow path: mixed layouts or damaged lines, one line at a time
+    columns = _empty_columns(len(lines))
+    good = np.zeros(len(lines), dtype=bool)
+    for row, line in enumerate(lines):
+        pairs = _split_pairs(line.rstrip())
+        if not pairs:
+            continue
+        for key, value in pairs:
+            if key in KEYS:
+                columns[KEYS[key]][row] = float(value)
+        good[row] = True
+    for name in FIELDS:
+        columns[name] = columns[name][good]
+    return TelemetryBatch(columns, malformed=int(len(lines) - good.sum()))
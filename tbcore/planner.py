@@ -0,0 +1,309 @@
+"""Winding job planner: the whole job as a stream of timed motion blocks.
+
+The controller used to derive every move from the raw parameters and
+step at a fixed rate with no ramps. plan_job() instead lays the job out
+on the host, with the controller's own winding sequence:
+
+    per slot    centre the feed, wind coils_per_slot turns while the feed
+                traverses the slot back and forth, back the feed off for
+                clearance, rotate the stator to the next slot
+
+Each move is a segment: signed steps for the wind, feed and rotation
+axes, the largest ("lead") axis setting the pace and the others
+following in proportion. Segments get trapezoidal velocity profiles
+within the machine limits (MAX_SPEED, MAX_ACCEL). Feed reversals inside
+a slot don't stop the winding: those segments join at cruise speed.
+
+The profiles are then sampled into BLOCK_S blocks, all segments at once
+with NumPy: each block is a duration and the steps every axis makes in
+it (BLOCK_DTYPE, 8 bytes). Speeds are what the blocks imply, so the job
+time is known exactly before anything moves. JobStream sends the blocks
+to the controller CHUNK_BLOCKS at a time through a tbcore.winder
+JobRunner, never more than the controller's buffer has room for:
+
+    J                ACK,J,<free blocks>          start a planned job
+    Q,<n> + n blocks ACK,Q,<free blocks>          queue blocks
+                     FREE,<free>,<executed>       sent as blocks complete
+    W                ACK,W ... DONE,W             wait for the buffer to drain
+"""
+import numpy as np
+
+from tbcore.winder import TOTAL_SLOTS, Progress
+
+AXES = ('wind', 'feed', 'rot')
+# Machine limits in steps/s and steps/s², as tuned with AccelStepper in stepper/steptest
+MAX_SPEED = {'wind': 3200.0, 'feed': 1000.0, 'rot': 1000.0}
+MAX_ACCEL = {'wind': 400.0, 'feed': 200.0, 'rot': 200.0}
+MAX_PULSE_RATE = 20000.0  # all axes together; each pulse takes the controller ~20 us
+SEQUENCE = (0, 1, 6, 7, 2, 3, 8, 9, 4, 5, 10, 11)  # Must match windingSequence in stepMotor.ino
+CLEARANCE_REVS = 2  # feed revolutions backed off after each slot
+BLOCK_S = 0.02
+CHUNK_BLOCKS = 16
+BLOCK_DTYPE = np.dtype([('duration_us', '<u2'), ('steps', '<i2', (3,))])
+
+
+class WindingParams:
+    """The winder console's machine parameters."""
+
+    def __init__(self, wind_speed=1000.0, feed_speed=500.0, rot_speed=200.0, wind_steps=200,
+                 feed_steps=200, rot_steps=200, gear_ratio=2.5, clockwise=True,
+                 coils_per_slot=100, slot_length=50.0):
+        self.wind_speed = float(wind_speed)
+        self.feed_speed = float(feed_speed)
+        self.rot_speed = float(rot_speed)
+        self.wind_steps = int(wind_steps)
+        self.feed_steps = int(feed_steps)
+        self.rot_steps = int(rot_steps)
+        self.gear_ratio = float(gear_ratio)
+        self.clockwise = bool(clockwise)
+        self.coils_per_slot = int(coils_per_slot)
+        self.slot_length = float(slot_length)
+
+    def command(self):
+        """ The controller's "P" line """
+        # Format: P,windSpeed,feedSpeed,rotSpeed,windSteps,feedSteps,rotSteps,
+        #          gearRatio,windDir,coilsPerSlot,slotLength
+        return (f"P,{self.wind_speed:g},{self.feed_speed:g},{self.rot_speed:g},"
+                f"{self.wind_steps},{self.feed_steps},{self.rot_steps},{self.gear_ratio:g},"
+                f"{1 if self.clockwise else 0},{self.coils_per_slot},{self.slot_length:g}")
+
+    @property
+    def steps_per_coil(self):
+        return self.wind_steps * self.gear_ratio
+
+    @property
+    def wind_per_feed(self):
+        """ Winding steps per feed step while winding, as the controller computes it """
+        return int(self.slot_length / self.feed_steps * self.wind_steps)
+
+
+def _segments(params):
+    # (steps per axis, requested lead speed, sequence index, joins the next segment)
+    segments = []
+    traverse = int(params.slot_length * params.feed_steps)
+    centre = traverse // 2
+    rot_per_slot = params.rot_steps // TOTAL_SLOTS
+    for index, slot in enumerate(SEQUENCE):
+        segments.append(((0, centre, 0), params.feed_speed, index, False))
+        # Even slots wind clockwise, odd ones counter-clockwise (flipped for CCW)
+        wind_sign = 1 if (slot % 2 == 0) == params.clockwise else -1
+        wind_left = int(params.coils_per_slot * params.steps_per_coil)
+        # From the centre out to the end of the slot, then end to end
+        feed_pass, feed_sign = traverse - centre, 1
+        while wind_left > 0:
+            wind = min(wind_left, max(feed_pass, 1) * params.wind_per_feed)
+            feed = -(-wind // params.wind_per_feed)  # one feed step per wind_per_feed, rounded up
+            wind_left -= wind
+            segments.append(((wind_sign * wind, feed_sign * feed, 0), params.wind_speed, index,
+                             wind_left > 0))
+            feed_pass, feed_sign = traverse, -feed_sign
+        segments.append(((0, -CLEARANCE_REVS * params.feed_steps, 0), params.feed_speed, index, False))
+        if index < len(SEQUENCE) - 1:
+            diff = SEQUENCE[index + 1] - slot
+            if abs(diff) > TOTAL_SLOTS // 2:
+                # Shorter way round the stator
+                diff = diff - TOTAL_SLOTS if diff > 0 else diff + TOTAL_SLOTS
+            segments.append(((0, 0, diff * rot_per_slot), params.rot_speed, index, False))
+    return [s for s in segments if any(s[0])]
+
+
+def _profiles(distance, v_max, accel, v_in, v_out):
+    """ Trapezoid (or triangle) per segment: peak speed and accel/cruise/decel times """
+    v_peak = np.minimum(v_max, np.sqrt((2 * accel * distance + v_in ** 2 + v_out ** 2) / 2))
+    v_peak = np.maximum(v_peak, np.maximum(v_in, v_out))
+    t_accel = (v_peak - v_in) / accel
+    t_decel = (v_peak - v_out) / accel
+    d_ramps = (v_in + v_peak) / 2 * t_accel + (v_peak + v_out) / 2 * t_decel
+    t_cruise = np.maximum(distance - d_ramps, 0.0) / v_peak
+    return v_peak, t_accel, t_cruise, t_decel
+
+
+class Plan:
+    """A planned job: its segments, velocity profiles and motion blocks."""
+
+    def __init__(self, params, max_speed=None, max_accel=None, block_s=BLOCK_S):
+        self.params = params
+        self.max_speed = dict(MAX_SPEED, **(max_speed or {}))
+        self.max_accel = dict(MAX_ACCEL, **(max_accel or {}))
+        self.block_s = block_s
+        self.problems = []
+        self._check_params()
+        segments = _segments(params)
+        self.steps = np.array([s[0] for s in segments], dtype=np.int64)
+        self.requested = np.array([s[1] for s in segments], dtype=np.float64)
+        self.slot_index = np.array([s[2] for s in segments], dtype=np.int64)
+        joins = np.array([s[3] for s in segments], dtype=bool)
+        self._plan_profiles(joins)
+        self._sample_blocks()
+        self._check_limits()
+
+    def _check_params(self):
+        p = self.params
+        for name in ('wind_speed', 'feed_speed', 'rot_speed', 'wind_steps', 'feed_steps',
+                     'rot_steps', 'gear_ratio', 'coils_per_slot', 'slot_length'):
+            if getattr(p, name) <= 0:
+                raise ValueError(f"{name.replace('_', ' ')} must be positive")
+        if p.wind_per_feed < 1:
+            raise ValueError("The feed would have to step faster than the winding: "
+                             "slot length / feed steps x winding steps is below 1")
+
+    def _plan_profiles(self, joins):
+        magnitude = np.abs(self.steps).astype(np.float64)
+        self.distance = magnitude.max(axis=1)  # lead axis steps
+        share = magnitude / self.distance[:, None]  # each axis' steps per lead step
+        with np.errstate(divide='ignore'):
+            speed_limit = np.array([self.max_speed[a] for a in AXES]) / share
+            accel_limit = np.array([self.max_accel[a] for a in AXES]) / share
+        self.v_max = np.minimum(self.requested, speed_limit.min(axis=1))
+        self.accel = accel_limit.min(axis=1)
+        self.clamped = self.v_max < self.requested
+        # Joined segments run into each other at the slower one's speed, as
+        # far as each can still get there from a standstill at the far end
+        n = len(self.distance)
+        junction = np.where(joins[:-1], np.minimum(self.v_max[:-1], self.v_max[1:]), 0.0)
+        v_in = np.zeros(n)
+        v_out = np.zeros(n)
+        v_out[:-1] = junction
+        v_in[1:] = junction
+        reach = np.sqrt(2 * self.accel * self.distance)
+        for k in range(n - 1):  # forward: what segment k can accelerate to
+            v_out[k] = min(v_out[k], np.sqrt(v_in[k] ** 2 + reach[k] ** 2))
+            v_in[k + 1] = v_out[k]
+        for k in range(n - 1, 0, -1):  # backward: what segment k can still brake from
+            v_in[k] = min(v_in[k], np.sqrt(v_out[k] ** 2 + reach[k] ** 2))
+            v_out[k - 1] = v_in[k]
+        self.v_in, self.v_out = v_in, v_out
+        self.v_peak, self.t_accel, self.t_cruise, self.t_decel = _profiles(
+            self.distance, self.v_max, self.accel, v_in, v_out
+        )
+        self.seg_time = self.t_accel + self.t_cruise + self.t_decel
+        self.duration = float(self.seg_time.sum())
+
+    def _position(self, seg, t):
+        # Lead axis steps done t seconds into each segment
+        v_in, v_peak, v_out = self.v_in[seg], self.v_peak[seg], self.v_out[seg]
+        a, ta, tc = self.accel[seg], self.t_accel[seg], self.t_cruise[seg]
+        s_accel = (v_in + v_peak) / 2 * ta
+        t1 = np.minimum(t, ta)
+        t2 = np.clip(t - ta, 0.0, tc)
+        t3 = np.clip(t - ta - tc, 0.0, self.t_decel[seg])
+        s = (v_in * t1 + a * t1 ** 2 / 2) * (t <= ta) + s_accel * (t > ta)
+        s = s + v_peak * t2 + v_peak * t3 - a * t3 ** 2 / 2
+        return np.minimum(s, self.distance[seg])
+
+    def _sample_blocks(self):
+        counts = np.maximum(1, np.ceil(self.seg_time / self.block_s - 1e-9)).astype(np.int64)
+        seg = np.repeat(np.arange(len(counts)), counts)
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        k = np.arange(len(seg)) - first
+        last = k == counts[seg] - 1
+        t_end = np.where(last, self.seg_time[seg], (k + 1) * self.block_s)
+        done = np.where(last, self.distance[seg], self._position(seg, t_end))
+        # Whole steps per axis by the end of each block, then per block
+        magnitude = np.abs(self.steps[seg])
+        total = np.rint(done[:, None] / self.distance[seg, None] * magnitude).astype(np.int64)
+        before = np.vstack((np.zeros((1, 3), dtype=np.int64), total[:-1]))
+        before[k == 0] = 0
+        steps = (total - before) * np.sign(self.steps[seg])
+        end_us = np.rint(t_end * 1e6).astype(np.int64)
+        start_us = np.concatenate(([0], end_us[:-1]))
+        start_us[k == 0] = 0
+        self.blocks = np.zeros(len(seg), dtype=BLOCK_DTYPE)
+        self.blocks['duration_us'] = np.maximum(end_us - start_us, 1)
+        self.blocks['steps'] = steps
+        self.block_segment = seg
+        # For progress: where in the job each block ends
+        self.block_end_s = np.cumsum(end_us - start_us) / 1e6
+        self.block_slot = self.slot_index[seg]
+        wind = np.abs(steps[:, 0])
+        cumulative = np.cumsum(wind)
+        slot_start = np.concatenate(([0], cumulative[:-1]))[np.searchsorted(
+            self.block_slot, self.block_slot, side='left')]
+        self.block_coils = (cumulative - slot_start) / self.params.steps_per_coil
+
+    def _check_limits(self):
+        names = {'wind': "Winding", 'feed': "Feed", 'rot': "Rotation"}
+        for axis in AXES:
+            requested = getattr(self.params, f"{axis}_speed")
+            if requested > self.max_speed[axis]:
+                self.problems.append(f"{names[axis]} speed {requested:g} steps/s is above the "
+                                     f"machine limit of {self.max_speed[axis]:g}; limited")
+        feed_while_winding = self.params.wind_speed / self.params.wind_per_feed
+        if feed_while_winding > self.max_speed['feed']:
+            self.problems.append(f"Feed would need {feed_while_winding:.0f} steps/s while winding; "
+                                 f"winding slowed to keep it within {self.max_speed['feed']:g}")
+        if np.abs(self.blocks['steps']).max(initial=0) >= 2 ** 15:
+            raise ValueError("Steps per block overflow; lower the speeds")
+        rate = np.abs(self.blocks['steps']).sum(axis=1) / (self.blocks['duration_us'] / 1e6)
+        if len(rate) and rate.max() > MAX_PULSE_RATE:
+            self.problems.append(f"Peak pulse rate {rate.max():.0f}/s is above what the "
+                                 f"controller can step ({MAX_PULSE_RATE:g}/s)")
+
+    def __len__(self):
+        return len(self.blocks)
+
+    @property
+    def coils_total(self):
+        return TOTAL_SLOTS * self.params.coils_per_slot
+
+    def summary(self):
+        """ One line for the console: job time, blocks and peak winding speed """
+        minutes, seconds = divmod(int(round(self.duration)), 60)
+        hours, minutes = divmod(minutes, 60)
+        wind_peak = (np.abs(self.blocks['steps'][:, 0]) / (self.blocks['duration_us'] / 1e6)).max()
+        return (f"Estimated job time {hours:d}:{minutes:02d}:{seconds:02d}, "
+                f"{len(self.blocks)} blocks ({self.blocks.nbytes / 1024:.0f} KiB), "
+                f"peak winding {wind_peak:.0f} steps/s")
+
+    def progress(self, executed):
+        """ tbcore.winder.Progress once `executed` blocks have run """
+        if not executed:
+            return Progress(0, SEQUENCE[0] + 1, 0, self.params.coils_per_slot, 0.0)
+        b = min(executed, len(self.blocks)) - 1
+        index = int(self.block_slot[b])
+        coil = min(int(self.block_coils[b] + 1e-9), self.params.coils_per_slot)
+        rate = abs(int(self.blocks['steps'][b, 0])) / (self.blocks['duration_us'][b] / 1e6)
+        progress = Progress(index, SEQUENCE[index] + 1, coil, self.params.coils_per_slot, rate)
+        progress.remaining = self.duration - float(self.block_end_s[b])
+        return progress
+
+    def chunks(self, size=CHUNK_BLOCKS, start=0):
+        """ (first block, packed blocks) of at most `size` blocks each """
+        for lo in range(start, len(self.blocks), size):
+            yield lo, self.blocks[lo:lo + size].tobytes()
+
+
+def plan_job(params, **limits):
+    """ Plan `params` (WindingParams); raises ValueError for parameters that can't be planned """
+    return Plan(params, **limits)
+
+
+class JobStream:
+    """Feed a Plan to the controller as fast as its block buffer drains."""
+
+    def __init__(self, runner, plan, on_progress=None):
+        self.runner = runner
+        self.plan = plan
+        self.on_progress = on_progress
+        self.sent = 0
+
+    async def run(self):
+        """ Stream every block and wait until the last one has run """
+        runner = self.runner
+        runner.on_blocks = self._blocks_done
+        try:
+            await runner.submit("J")
+            for lo, data in self.plan.chunks():
+                count = len(data) // BLOCK_DTYPE.itemsize
+                await runner.wait_free(count)
+                await runner.submit(f"Q,{count}", payload=data)
+                self.sent = lo + count
+            await runner.submit("W", wait_done=True)
+            self._blocks_done(len(self.plan))
+        finally:
+            runner.on_blocks = None
+
+    def _blocks_done(self, executed):
+        if self.on_progress:
+            self.on_progress(self.plan.progress(executed))
+
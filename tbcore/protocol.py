@@ -0,0 +1,247 @@
+"""Telemetry wire formats: the ASCII lines and the binary frames.
+
+Binary frames are fixed-layout, little-endian and 38 bytes long:
+
+    sync u16 (0xA5 0x5A) | seq u16 | t_us u32 | throttle f32 | rpm u32 |
+    pulse_count u32 | thrust f32 | current f32 | ambient_temp f32 |
+    object_temp f32 | crc u16
+
+The CRC is CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) over everything
+between the sync word and the CRC itself, matching crc16() in
+thrustbench/thrustbench.ino.
+"""
+import binascii
+import time
+
+import numpy as np
+
+from tbcore.parser import FIELDS, parse_lines
+
+SYNC = b"\xa5\x5a"
+FRAME_DTYPE = np.dtype([
+    ('sync', '<u2'),
+    ('seq', '<u2'),
+    ('t_us', '<u4'),
+    ('throttle', '<f4'),
+    ('rpm', '<u4'),
+    ('pulse_count', '<u4'),
+    ('thrust', '<f4'),
+    ('current', '<f4'),
+    ('ambient_temp', '<f4'),
+    ('object_temp', '<f4'),
+    ('crc', '<u2'),
+])
+FRAME_SIZE = FRAME_DTYPE.itemsize
+FRAME_FIELDS = FIELDS
+MAX_LINE = 4096  # Longest partial line kept while waiting for its newline
+MAX_SPREAD_S = 1.0  # Longest span a chunk's text lines are spread over
+
+# Commands understood by the firmware to switch the telemetry format
+ENABLE_BINARY = b"B\n"
+ENABLE_TEXT = b"A\n"
+
+
+def _crc_table():
+    table = np.zeros(256, dtype=np.uint16)
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else crc << 1
+        table[i] = crc & 0xFFFF
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def crc16(data):
+    return binascii.crc_hqx(data, 0xFFFF)
+
+
+def crc16_rows(rows):
+    """ CRC of every row of a (n, k) uint8 array, one byte column at a time """
+    crc = np.full(len(rows), 0xFFFF, dtype=np.uint16)
+    for column in rows.T:
+        index = ((crc >> 8) ^ column).astype(np.uint8)
+        crc = (crc << 8) ^ _CRC_TABLE[index]
+    return crc
+
+
+def encode_frames(seq, t_us, **fields):
+    """ Pack columns into binary frames, e.g. for simulators and tests """
+    seq = np.atleast_1d(seq)
+    frames = np.zeros(len(seq), dtype=FRAME_DTYPE)
+    frames['sync'] = np.frombuffer(SYNC, dtype='<u2')[0]
+    frames['seq'] = seq
+    frames['t_us'] = t_us
+    for name in FRAME_FIELDS:
+        frames[name] = fields.get(name, 0)
+    rows = frames.view(np.uint8).reshape(len(frames), FRAME_SIZE)
+    frames['crc'] = crc16_rows(rows[:, 2:FRAME_SIZE - 2])
+    return frames.tobytes()
+
+
+class TextDecoder:
+    """Parse the ASCII telemetry lines into columns of NumPy arrays.
+
+    feed() returns the same columns as BinaryDecoder, or an empty dict
+    when the chunk held no complete telemetry line. Text lines carry no
+    device time, so 'time' is the host clock: the lines completed by a
+    chunk arrived since the previous one, and are spread evenly over that
+    span (at most MAX_SPREAD_S) ending at the chunk's arrival, instead of
+    all sharing one timestamp.
+    """
+
+    name = 'text'
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._pending = b""
+        self._resyncing = False
+        self._last_feed = None  # host time of the previous chunk
+        self.frames = 0
+        self.malformed = 0
+
+    def resync(self):
+        """ Forget partial input; the next line counts only after a line break """
+        self._pending = b""
+        self._resyncing = True
+        self._last_feed = None
+
+    def feed(self, data):
+        now = self.clock()
+        previous, self._last_feed = self._last_feed, now
+        buf = self._pending + data
+        if self._resyncing:
+            start = buf.find(b"\n") + 1
+            if not start:
+                self._pending = b""
+                return {}
+            buf = buf[start:]
+            self._resyncing = False
+        end = buf.rfind(b"\n") + 1
+        self._pending = buf[end:][-MAX_LINE:]
+        if not end:
+            return {}
+        batch = parse_lines(buf[:end])
+        self.malformed += batch.malformed
+        if not len(batch):
+            return {}
+        self.frames += len(batch)
+        columns = batch.columns
+        columns['time'] = self._times(len(batch), previous, now)
+        return columns
+
+    @staticmethod
+    def _times(n, previous, now):
+        if previous is None or not now > previous:
+            return np.full(n, now)
+        span = min(now - previous, MAX_SPREAD_S)
+        return now - span * np.arange(n - 1, -1, -1) / n
+
+
+class BinaryDecoder:
+    """Decode binary telemetry frames into columns of NumPy arrays.
+
+    feed() returns a dict with 'seq', 'time' and one array per field in
+    FRAME_FIELDS, or an empty dict when no complete frame arrived. 'time'
+    follows the device clock (unwrapped across micros() overflow) and is
+    anchored to the host clock at the first frame. Bytes that do not
+    belong to a valid frame are skipped and counted.
+    """
+
+    name = 'binary'
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._pending = b""
+        self._t0 = None
+        self._last_seq = None
+        self._last_t_us = None
+        self._elapsed_us = 0
+        self.frames = 0
+        self.lost_frames = 0
+        self.skipped_bytes = 0
+
+    def resync(self):
+        """ Start over after a reconnect: the device may have rebooted """
+        self._pending = b""
+        self._t0 = None
+        self._last_seq = None
+        self._last_t_us = None
+        self._elapsed_us = 0
+
+    def feed(self, data):
+        buf = self._pending + data
+        raw = np.frombuffer(buf, dtype=np.uint8)
+        last_start = len(raw) - FRAME_SIZE
+        if last_start < 0:
+            self._pending = buf
+            return {}
+
+        # Every sync word with room for a full frame behind it
+        starts = np.flatnonzero((raw[:last_start + 1] == SYNC[0])
+                                & (raw[1:last_start + 2] == SYNC[1]))
+        if len(starts):
+            rows = raw[starts[:, None] + np.arange(FRAME_SIZE)]
+            crc = rows[:, -2].astype(np.uint16) | (rows[:, -1].astype(np.uint16) << 8)
+            valid = crc16_rows(rows[:, 2:-2]) == crc
+            starts, rows = starts[valid], rows[valid]
+            if np.any(np.diff(starts) < FRAME_SIZE):
+                starts, rows = self._drop_overlaps(starts, rows)
+
+        consumed = starts[-1] + FRAME_SIZE if len(starts) else 0
+        keep_from = max(consumed, last_start + 1)
+        self.skipped_bytes += keep_from - len(starts) * FRAME_SIZE
+        self._pending = buf[keep_from:]
+        if not len(starts):
+            return {}
+
+        frames = np.ascontiguousarray(rows).view(FRAME_DTYPE).ravel()
+        self.frames += len(frames)
+        return self._columns(frames)
+
+    def _drop_overlaps(self, starts, rows):
+        keep = []
+        end = -1
+        for i, start in enumerate(starts):
+            if start >= end:
+                keep.append(i)
+                end = start + FRAME_SIZE
+        return starts[keep], rows[keep]
+
+    def _columns(self, frames):
+        seq = frames['seq'].astype(np.int64)
+        t_us = frames['t_us'].astype(np.int64)
+        if self._last_seq is not None:
+            seq_steps = np.diff(seq, prepend=self._last_seq) % 0x10000
+            t_steps = np.diff(t_us, prepend=self._last_t_us) % 0x100000000
+        else:
+            seq_steps = np.diff(seq, prepend=seq[0] - 1) % 0x10000
+            t_steps = np.diff(t_us, prepend=t_us[0]) % 0x100000000
+        self.lost_frames += int(np.sum(np.maximum(seq_steps - 1, 0)))
+        elapsed_us = self._elapsed_us + np.cumsum(t_steps)
+        self._last_seq = seq[-1]
+        self._last_t_us = t_us[-1]
+        self._elapsed_us = int(elapsed_us[-1])
+        if self._t0 is None:
+            self._t0 = self.clock()
+
+        columns = {'seq': frames['seq'], 'time': self._t0 + elapsed_us / 1e6}
+        for name in FRAME_FIELDS:
+            columns[name] = frames[name].astype(np.float64)
+        return columns
+
+
+DECODERS = {
+    TextDecoder.name: TextDecoder,
+    BinaryDecoder.name: BinaryDecoder,
+}
+
+
+def make_decoder(name='text', **kwargs):
+    try:
+        decoder_class = DECODERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown telemetry protocol: {name}")
+    return decoder_class(**kwargs)
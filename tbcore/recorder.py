@@ -0,0 +1,283 @@
+"""Streaming session recorder: append-only, chunked, columnar files.
+
+A session is a directory holding
+
+    session.json   channel names, dtype and start time
+    <channel>.f8   raw little-endian float64 values, one file per channel
+    chunks.jsonl   one line per committed chunk: offset, count, t0, t1
+    gaps.jsonl     one line per connection outage: offset (first row after
+                   the gap), t0, t1; only present if there was one
+    lod/           min/max/mean level-of-detail pyramid (see tbcore.lod)
+
+Chunks are written by a background thread. Each chunk's column data is
+fsynced before its index line is appended (and fsynced), so readers only
+trust what the index covers and a crash loses at most the chunk that was
+being written.
+
+chunks.jsonl doubles as a sparse time index: Session memory-maps the
+channel files and finds a timestamp by bisecting the chunks' time ranges
+and then the one chunk's time column, so opening a session, seeking and
+slicing a window only read the pages they touch, however long the
+recording is.
+"""
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from tbcore.lod import LodPyramid
+from tbcore.parser import FIELDS
+
+CHANNELS = ('time',) + FIELDS
+DTYPE = np.dtype('<f8')
+
+
+def new_session_path(root):
+    return os.path.join(root, time.strftime("%Y%m%d-%H%M%S"))
+
+
+class SessionRecorder:
+    """Stream telemetry columns to a session directory without blocking.
+
+    write() only puts the batch on a queue. The writer thread groups
+    queued rows into chunks of `chunk_size`, or whatever arrived within
+    `max_delay` seconds, and commits each chunk as described above.
+    """
+
+    def __init__(self, path, channels=CHANNELS, chunk_size=1024, max_delay=1.0, metadata=None,
+                 lod=True):
+        self.path = path
+        self.channels = tuple(channels)
+        self.chunk_size = chunk_size
+        self.max_delay = max_delay
+        self.rows = 0
+        self.chunks = 0
+        self.error = None
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+
+        os.makedirs(path, exist_ok=True)
+        info = {
+            'channels': list(self.channels),
+            'dtype': DTYPE.str,
+            'started': time.time(),
+        }
+        info.update(metadata or {})
+        with open(os.path.join(path, 'session.json'), 'w') as f:
+            json.dump(info, f, indent=2)
+        self._files = {
+            name: open(os.path.join(path, f"{name}.f8"), 'wb', buffering=1 << 16)
+            for name in self.channels
+        }
+        self._index = open(os.path.join(path, 'chunks.jsonl'), 'w')
+        # Plot pyramid, extended with each committed chunk
+        self.lod = LodPyramid(self.channels, path=path) if lod and 'time' in self.channels else None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, columns):
+        """ Queue a batch of columns (dict of equal-length arrays) """
+        if not self._closed:
+            self._queue.put(columns)
+
+    def mark_gap(self, t0, t1):
+        """ Record that no data could arrive between host times t0 and t1 """
+        if not self._closed:
+            self._queue.put(('gap', t0, t1))
+
+    def close(self, wait=True, timeout=5.0):
+        """ Commit everything queued so far and close the files
+
+        With wait=False the final commit happens on the writer thread
+        after this returns, so the caller never waits on disk I/O.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        if wait:
+            self._thread.join(timeout)
+
+    def _run(self):
+        pending = []
+        pending_rows = 0
+        deadline = None
+        try:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    batch = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    batch = ()
+                if batch is None:
+                    break
+                if batch and isinstance(batch, tuple):
+                    # Rows queued before the gap belong before it
+                    if pending:
+                        self._commit(pending)
+                        pending, pending_rows, deadline = [], 0, None
+                    self._write_gap(*batch[1:])
+                    continue
+                if batch:
+                    n = len(batch[self.channels[0]])
+                    if n:
+                        pending.append(batch)
+                        pending_rows += n
+                        if deadline is None:
+                            deadline = time.monotonic() + self.max_delay
+                if pending and (pending_rows >= self.chunk_size or time.monotonic() >= deadline):
+                    self._commit(pending)
+                    pending, pending_rows, deadline = [], 0, None
+            if pending:
+                self._commit(pending)
+        except Exception as e:
+            self.error = e
+            print(f"Error recording session: {e}")
+        finally:
+            for f in self._files.values():
+                f.close()
+            self._index.close()
+            if self.lod:
+                self.lod.close()
+
+    def _write_gap(self, t0, t1):
+        with open(os.path.join(self.path, 'gaps.jsonl'), 'a') as f:
+            f.write(json.dumps({'offset': self.rows, 't0': t0, 't1': t1}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _commit(self, batches):
+        columns = {}
+        for name in self.channels:
+            parts = []
+            for batch in batches:
+                n = len(batch[self.channels[0]])
+                parts.append(np.asarray(batch[name], dtype=DTYPE) if name in batch else np.full(n, np.nan))
+            columns[name] = np.concatenate(parts)
+        for name, column in columns.items():
+            f = self._files[name]
+            f.write(column.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        count = len(columns[self.channels[0]])
+        times = columns.get('time', np.full(count, np.nan))
+        entry = {
+            'offset': self.rows,
+            'count': count,
+            't0': float(times[0]),
+            't1': float(times[-1]),
+        }
+        self._index.write(json.dumps(entry) + "\n")
+        self._index.flush()
+        os.fsync(self._index.fileno())
+        self.rows += count
+        self.chunks += 1
+        if self.lod:
+            # Derived data: rebuildable with tbcore.lod.build_lod, so no fsync
+            self.lod.add(columns)
+            self.lod.flush()
+
+
+def read_index(path):
+    """ Committed chunks of a session, oldest first """
+    chunks = []
+    with open(os.path.join(path, 'chunks.jsonl')) as f:
+        for line in f:
+            try:
+                chunks.append(json.loads(line))
+            except ValueError:
+                break  # torn last line after a crash
+    return chunks
+
+
+def read_gaps(path):
+    """ Connection outages of a session, oldest first """
+    gaps = []
+    try:
+        with open(os.path.join(path, 'gaps.jsonl')) as f:
+            for line in f:
+                try:
+                    gaps.append(json.loads(line))
+                except ValueError:
+                    break
+    except FileNotFoundError:
+        pass
+    return gaps
+
+
+class Session:
+    """Read-only, memory-mapped view of a recorded session.
+
+    columns maps each channel to a numpy.memmap of its committed rows;
+    nothing is read until it is sliced. Times must not go backwards,
+    which holds for everything SessionRecorder writes from one reader.
+    A session still being recorded can be refresh()ed to pick up chunks
+    committed since it was opened.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'session.json')) as f:
+            self.info = json.load(f)
+        self.channels = tuple(self.info['channels'])
+        self.dtype = np.dtype(self.info.get('dtype', DTYPE.str))
+        self.gaps = read_gaps(path)
+        self.refresh()
+
+    def refresh(self):
+        chunks = read_index(self.path)
+        self.rows = chunks[-1]['offset'] + chunks[-1]['count'] if chunks else 0
+        self._offsets = np.array([c['offset'] for c in chunks], dtype=np.int64)
+        self._counts = np.array([c['count'] for c in chunks], dtype=np.int64)
+        self._t0 = np.array([c['t0'] for c in chunks])
+        self._t1 = np.array([c['t1'] for c in chunks])
+        self.columns = {name: self._map(name) for name in self.channels}
+
+    def _map(self, name):
+        if not self.rows:
+            return np.empty(0, dtype=self.dtype)
+        return np.memmap(os.path.join(self.path, f"{name}.f8"), dtype=self.dtype,
+                         mode='r', shape=(self.rows,))
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def start(self):
+        return float(self._t0[0]) if self.rows else float('nan')
+
+    @property
+    def end(self):
+        return float(self._t1[-1]) if self.rows else float('nan')
+
+    @property
+    def duration(self):
+        return self.end - self.start if self.rows else 0.0
+
+    def offset_at(self, t, side='left'):
+        """ Row index of time `t`, like numpy.searchsorted on the time column """
+        chunk = int(np.searchsorted(self._t1, t, side))
+        if chunk == len(self._t1):
+            return self.rows
+        lo = int(self._offsets[chunk])
+        times = self.columns['time'][lo:lo + int(self._counts[chunk])]
+        return lo + int(np.searchsorted(times, t, side))
+
+    def window(self, t0, t1, channels=None):
+        """ {channel: memmap slice} of the rows with t0 <= time <= t1 """
+        lo = self.offset_at(t0)
+        hi = self.offset_at(t1, side='right')
+        return self.slice(lo, hi, channels)
+
+    def slice(self, lo, hi, channels=None):
+        return {name: self.columns[name][lo:hi] for name in channels or self.channels}
+
+
+def load_session(path):
+    """ Load every committed row of a session into memory, one array per channel """
+    session = Session(path)
+    return {name: np.array(column) for name, column in session.columns.items()}
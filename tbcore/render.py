@@ -0,0 +1,60 @@
+"""Plot refresh scheduling and min/max decimation for pyqtgraph curves."""
+import time
+
+import numpy as np
+
+
+def minmax_decimate(x, y, max_points):
+    """ Reduce a curve to about `max_points` points, keeping every peak
+
+    The samples are split into max_points // 2 buckets and each bucket
+    contributes its minimum and its maximum, in the order they occurred,
+    so spikes stay visible however far the view is zoomed out.
+    """
+    n = len(y)
+    buckets = max(1, max_points // 2)
+    if n <= max_points:
+        return x, y
+    size = n // buckets
+    full = buckets * size
+    rows = np.asarray(y[:full]).reshape(buckets, size)
+    missing = np.isnan(rows)
+    offsets = np.arange(buckets) * size
+    lo = np.argmin(np.where(missing, np.inf, rows), axis=1) + offsets
+    hi = np.argmax(np.where(missing, -np.inf, rows), axis=1) + offsets
+    index = np.sort(np.concatenate([lo, hi]))
+    if full < n:
+        # Leftover samples that don't fill a whole bucket
+        index = np.concatenate([index, [full, n - 1]])
+    return x[index], y[index]
+
+
+class RenderScheduler:
+    """Coalesce redraw requests to at most `fps` frames per second.
+
+    Call request() whenever new data arrives and ask due() from a timer;
+    it answers True at most once per frame interval and only while there
+    is something new to draw.
+    """
+
+    def __init__(self, fps=30, clock=time.monotonic):
+        self.interval = 1.0 / fps
+        self.clock = clock
+        self.dirty = False
+        self.frames = 0
+        self._last = None
+
+    def request(self):
+        self.dirty = True
+
+    def due(self, visible=True):
+        """ True when a frame should be drawn now; hidden windows stay dirty """
+        if not self.dirty or not visible:
+            return False
+        now = self.clock()
+        if self._last is not None and now - self._last < self.interval:
+            return False
+        self._last = now
+        self.dirty = False
+        self.frames += 1
+        return True
@@ -0,0 +1,167 @@
+"""Play a recorded session back as if a rig were sending it.
+
+The replay source speaks the thrustbench serial protocol, so a session
+goes through exactly the decode, derive, stats and plot path of a live
+run. Open it like any port:
+
+    serial.serial_for_url("replay:///path/to/session?speed=4&start=30")
+        in-process, through tbcore/urlhandler/protocol_replay.py; any
+        dashboard port box or `python -m tbcore.headless` accepts it
+
+    speed   playback rate, 1 = real time; 0 plays as fast as the reader
+            takes the data, which makes a deterministic load generator
+    start   seconds into the session to start from
+    loop    1 to start over at the end instead of going quiet
+
+The port object's `replay` attribute (a SessionReplay) seeks and changes
+speed while playing. Text lines are stamped by the host clock when they
+arrive, so at N x speed the dashboard's time axis runs N x fast; after
+"B" (protocol "binary") frames carry the recorded timing instead.
+"""
+import threading
+import time
+
+import numpy as np
+
+from tbcore.protocol import encode_frames
+from tbcore.recorder import Session
+
+MAX_BURST = 1024  # Rows per read when playing as fast as possible
+
+
+class SessionReplay:
+    """Recorded session with a play head that advances with the clock.
+
+    Like BenchSimulator it needs no thread: read_available() returns
+    every row that became due since the last call. seek() and set_speed()
+    may be called from another thread than the reads. The session stays
+    memory-mapped, so only the rows played (and the index pages a seek
+    touches) are ever read.
+    """
+
+    def __init__(self, path, speed=1.0, start=0.0, loop=False, clock=time.monotonic):
+        if speed < 0:
+            raise ValueError("speed must not be negative")
+        self.path = path
+        self.clock = clock
+        self.loop = loop
+        self.session = Session(path)
+        self.columns = self.session.columns
+        self.times = self.columns['time']
+        self.rows = len(self.session)
+        self.t_start = self.session.start
+        self.duration = self.session.duration
+        self.binary = False
+        self.rows_sent = 0
+        self.seq = 0
+        self._lock = threading.Lock()
+        self._out = bytearray()
+        self._command = b""
+        self._t_shift_us = 0  # keeps frame times increasing across seeks
+        self._last_t_us = -1
+        self.speed = speed
+        self.seek(start)
+
+    @property
+    def position(self):
+        """ Seconds into the session the play head is at """
+        with self._lock:
+            return self._position(self.clock())
+
+    @property
+    def done(self):
+        return not self.loop and self._next >= self.rows
+
+    def _position(self, now):
+        if self.speed == 0:
+            # As fast as possible: the play head is wherever reading got to
+            return self._offset(self._next) if self._next < self.rows else self.duration
+        return self._anchor_pos + (now - self._anchor_clock) * self.speed
+
+    def _offset(self, row):
+        return float(self.times[row] - self.t_start)
+
+    def seek(self, seconds):
+        with self._lock:
+            seconds = min(max(seconds, 0.0), self.duration)
+            self._next = self.session.offset_at(self.t_start + seconds)
+            self._anchor_pos = seconds
+            self._anchor_clock = self.clock()
+            self._out.clear()
+            if self._last_t_us >= 0:
+                # Frame times carry on from the last frame sent, so decoders see no jump back
+                self._t_shift_us = self._last_t_us + 1 - int(seconds * 1e6)
+
+    def set_speed(self, speed):
+        if speed < 0:
+            raise ValueError("speed must not be negative")
+        with self._lock:
+            now = self.clock()
+            self._anchor_pos = self._position(now)
+            self._anchor_clock = now
+            self.speed = speed
+
+    def next_sample_in(self):
+        """ Seconds until the next row is due """
+        with self._lock:
+            if self.speed == 0:
+                return 0.0
+            if self._next >= self.rows:
+                return 0.1  # idle at the end; seek() may move the play head back
+            due = (self._offset(self._next) - self._position(self.clock())) / self.speed
+            return max(0.0, due)
+
+    def write(self, data):
+        """ Host -> device bytes: "B"/"A" switch the format, the rest is ignored """
+        self._command += data
+        while b"\n" in self._command:
+            line, self._command = self._command.split(b"\n", 1)
+            command = line.strip()[:1]
+            if command in (b"B", b"b"):
+                self.binary = True
+            elif command in (b"A", b"a"):
+                self.binary = False
+        return len(data)
+
+    def read_available(self):
+        """ Output for every row that is due by now """
+        with self._lock:
+            if self.speed == 0:
+                end = min(self._next + MAX_BURST, self.rows)
+            else:
+                position = self._position(self.clock())
+                end = self.session.offset_at(self.t_start + position, side='right')
+            if end > self._next:
+                self._emit(self._next, end)
+                self._next = end
+            if self.loop and self._next >= self.rows and self.rows:
+                self._next = 0
+                self._anchor_pos = 0.0
+                self._anchor_clock = self.clock()
+                self._t_shift_us = self._last_t_us + 1
+            data = bytes(self._out)
+            self._out.clear()
+            return data
+
+    def _emit(self, start, end):
+        rows = slice(start, end)
+        c = self.columns
+        self.rows_sent += end - start
+        if self.binary:
+            t_us = ((self.times[rows] - self.t_start) * 1e6).astype(np.int64) + self._t_shift_us
+            self._last_t_us = int(t_us[-1])
+            seq = (self.seq + np.arange(end - start)) % 0x10000
+            self.seq = (self.seq + end - start) % 0x10000
+            self._out += encode_frames(
+                seq, t_us % 0x100000000,
+                **{name: np.nan_to_num(c[name][rows]) for name in c if name != 'time'}
+            )
+            return
+        lines = [
+            f"Throttle{c['throttle'][i]:.2f},RPM:{c['rpm'][i]:.0f},"
+            f"PulseCount:{c['pulse_count'][i]:.0f},Thrust:{c['thrust'][i]:.1f},"
+            f"Current:{c['current'][i]:.2f},AmbientTemp:{c['ambient_temp'][i]:.1f},"
+            f"ObjectTemp:{c['object_temp'][i]:.1f}\r\n"
+            for i in range(start, end)
+        ]
+        self._out += "".join(lines).encode()
@@ -0,0 +1,180 @@
+"""Several thrust benches driven side by side from one process.
+
+Each Rig owns its port, reader thread, plot buffers, statistics and
+optional recorder, so rigs share nothing but the manager. Opening and
+closing ports happens on a thread pool: a rig whose port hangs in the
+driver (or was unplugged) only ever blocks its own worker, while
+RigManager.poll(), called from the GUI timer, never touches a port and
+only drains the rigs' queues.
+"""
+import concurrent.futures
+import os
+import time
+
+from tbcore.acquisition import merge_batches, open_reader
+from tbcore.calibration import load_profile, rig_key
+from tbcore.derived import DERIVED, SUPPLY_VOLTAGE, Derive
+from tbcore.parser import FIELDS
+from tbcore.recorder import CHANNELS, SessionRecorder, new_session_path
+from tbcore.ringbuffer import open_channels
+from tbcore.stats import StatsEngine
+
+PLOT_CHANNELS = ('time', 'thrust', 'current', 'rpm', 'object_temp', 'throttle') + DERIVED
+
+
+class Rig:
+    """One bench: connection state, buffers, statistics and recorder."""
+
+    DISCONNECTED = 'disconnected'
+    CONNECTING = 'connecting'
+    CONNECTED = 'connected'
+    RECONNECTING = 'reconnecting'
+    FAILED = 'failed'
+
+    def __init__(self, name, port, protocol='text', warmup_s=None, capacity=36000,
+                 history_dir=None, voltage=SUPPLY_VOLTAGE):
+        self.name = name
+        self.port = port
+        self.protocol = protocol
+        self.warmup_s = warmup_s
+        self.voltage = voltage
+        self.state = self.DISCONNECTED
+        self.error = None
+        self.reader = None
+        self.recorder = None
+        self.calibration = None  # the rig's saved tbcore.calibration.Profile, loaded on connect
+        self.started = time.time()
+        self.samples = 0
+        self.buffers = open_channels(PLOT_CHANNELS, capacity, history_dir)
+        self.stats = StatsEngine(FIELDS + DERIVED)
+        self.last = {}
+
+    def connect(self):
+        """ Open the port; blocking, so RigManager runs it on its pool """
+        self.state = self.CONNECTING
+        try:
+            self.calibration = load_profile(rig_key(self.port))
+            self.reader = open_reader(self.port, self.protocol, self.warmup_s, self.recorder,
+                                      derive=Derive(self.voltage), calibration=self.calibration)
+        except Exception as e:
+            self.error = e
+            self.state = self.FAILED
+            raise
+        self.error = None
+        self.state = self.CONNECTED
+        return self
+
+    def disconnect(self):
+        reader, self.reader = self.reader, None
+        if reader:
+            reader.close()
+        self.state = self.DISCONNECTED
+
+    def write(self, command):
+        if self.reader:
+            self.reader.write(command)
+
+    def poll(self):
+        """ Move decoded batches into the buffers; returns how many samples arrived """
+        if not self.reader:
+            return 0
+        if self.reader.error and self.state != self.FAILED:
+            self.error = self.reader.error
+            self.state = self.FAILED
+        elif self.state in (self.CONNECTED, self.RECONNECTING):
+            # The reader reopens an unplugged rig by itself
+            reconnecting = self.reader.state == self.reader.RECONNECTING
+            self.state = self.RECONNECTING if reconnecting else self.CONNECTED
+        batch = merge_batches(self.reader.drain())
+        if batch is None:
+            return 0
+        self.buffers['time'].extend(batch['time'] - self.started)
+        for name in PLOT_CHANNELS[1:]:
+            self.buffers[name].extend(batch[name])
+        self.stats.add(batch)
+        count = len(batch['time'])
+        self.last = {name: batch[name][-1] for name in batch}
+        self.samples += count
+        return count
+
+    def start_recording(self, root):
+        self.recorder = SessionRecorder(
+            new_session_path(os.path.join(root, self.name)), CHANNELS + DERIVED,
+            metadata={'rig': self.name, 'port': self.port, 'protocol': self.protocol,
+                      'voltage': self.voltage,
+                      'calibration': self.calibration.to_dict() if self.calibration else None},
+        )
+        if self.reader:
+            self.reader.recorder = self.recorder
+        return self.recorder
+
+    def stop_recording(self, wait=False):
+        recorder, self.recorder = self.recorder, None
+        if self.reader:
+            self.reader.recorder = None
+        if recorder:
+            recorder.close(wait=wait)
+        return recorder
+
+    def close(self):
+        self.stop_recording(wait=True)
+        self.disconnect()
+        for buffer in self.buffers.values():
+            buffer.close()
+
+
+class RigManager:
+    """Open, poll and close any number of rigs without one stalling another."""
+
+    def __init__(self, max_workers=8):
+        self.rigs = {}
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix='rig')
+        self._pending = {}
+
+    def add(self, rig):
+        if rig.name in self.rigs:
+            raise ValueError(f"Rig {rig.name!r} already exists")
+        self.rigs[rig.name] = rig
+        return rig
+
+    def remove(self, name):
+        rig = self.rigs.pop(name)
+        self._pool.submit(rig.close)
+
+    def connect(self, name):
+        """ Start opening a rig's port in the background """
+        rig = self.rigs[name]
+        if rig.state in (Rig.CONNECTING, Rig.CONNECTED, Rig.RECONNECTING):
+            return
+        rig.state = Rig.CONNECTING
+        self._pending[name] = self._pool.submit(rig.connect)
+
+    def disconnect(self, name):
+        rig = self.rigs[name]
+        rig.stop_recording()
+        self._pool.submit(rig.disconnect)
+
+    def send(self, name, command):
+        """ Write a command without waiting on the port """
+        self._pool.submit(self.rigs[name].write, command)
+
+    def poll(self):
+        """ Drain every rig; returns {name: samples received} """
+        for name, future in list(self._pending.items()):
+            if future.done():
+                del self._pending[name]
+                if future.exception():
+                    print(f"Error connecting {name}: {future.exception()}")
+        return {name: rig.poll() for name, rig in self.rigs.items()}
+
+    def broadcast(self, command):
+        for name in self.rigs:
+            self.send(name, command)
+
+    def close(self):
+        for rig in self.rigs.values():
+            rig.stop_recording(wait=False)
+        futures = [self._pool.submit(rig.close) for rig in self.rigs.values()]
+        concurrent.futures.wait(futures, timeout=5.0)
+        self._pool.shutdown(wait=False)
+        self.rigs.clear()
@@ -0,0 +1,120 @@
+"""Fixed-capacity NumPy ring buffers for the telemetry series."""
+import os
+
+import numpy as np
+
+
+class RingBuffer:
+    """Preallocated series that keeps the newest `capacity` samples.
+
+    Every value is written twice, at `i` and `i + capacity`, so the newest
+    samples always form one contiguous slice and view() never has to copy.
+    When `spill_path` is set, each completed pass over the buffer is
+    appended to that file as raw values, so the full history ends up on
+    disk instead of in RAM.
+    """
+
+    def __init__(self, capacity, spill_path=None, dtype=np.float64):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self._data = np.zeros(2 * capacity, dtype=dtype)
+        self._head = 0       # next write position in [0, capacity)
+        self._count = 0      # valid samples, at most capacity
+        self._spilled = 0    # positions of the current pass already on disk
+        self._spill_file = None
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value):
+        head = self._head
+        self._data[head] = value
+        self._data[head + self.capacity] = value
+        self._count = min(self._count + 1, self.capacity)
+        if head + 1 == self.capacity:
+            self._wrap()
+        else:
+            self._head = head + 1
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self._data.dtype).ravel()
+        while len(values):
+            n = min(self.capacity - self._head, len(values))
+            start = self._head
+            self._data[start:start + n] = values[:n]
+            self._data[start + self.capacity:start + self.capacity + n] = values[:n]
+            self._count = min(self._count + n, self.capacity)
+            values = values[n:]
+            if start + n == self.capacity:
+                self._wrap()
+            else:
+                self._head = start + n
+
+    def view(self, n=None):
+        """ Read-only view of the newest `n` samples (all of them by default) """
+        if n is None or n > self._count:
+            n = self._count
+        end = self._head + self.capacity
+        view = self._data[end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def last(self):
+        if not self._count:
+            raise IndexError("ring buffer is empty")
+        return self._data[self._head + self.capacity - 1]
+
+    def flush(self):
+        """ Write samples not yet on disk to the spill file """
+        if self.spill_path is None:
+            return
+        self._spill(self._spilled, self._head)
+        self._spilled = self._head
+        if self._spill_file:
+            self._spill_file.flush()
+
+    def close(self):
+        self.flush()
+        if self._spill_file:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def history(self):
+        """ Full history: everything spilled to disk plus the unspilled tail """
+        if self.spill_path is None:
+            return self.view().copy()
+        self.flush()
+        if not os.path.exists(self.spill_path):
+            return np.empty(0, dtype=self._data.dtype)
+        return np.fromfile(self.spill_path, dtype=self._data.dtype)
+
+    def _wrap(self):
+        self._spill(self._spilled, self.capacity)
+        self._spilled = 0
+        self._head = 0
+
+    def _spill(self, start, stop):
+        if self.spill_path is None or stop <= start:
+            return
+        if self._spill_file is None:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            self._spill_file = open(self.spill_path, 'ab')
+        self._data[start:stop].tofile(self._spill_file)
+
+
+def open_channels(names, capacity, spill_dir=None):
+    """ Create one RingBuffer per channel, spilling to `<spill_dir>/<name>.f8` """
+    buffers = {}
+    for name in names:
+        spill_path = os.path.join(spill_dir, f"{name}.f8") if spill_dir else None
+        buffers[name] = RingBuffer(capacity, spill_path=spill_path)
+    return buffers
+
+
+def window_start(times, span):
+    """ Index of the first sample inside the trailing `span` seconds """
+    if not len(times):
+        return 0
+    return int(np.searchsorted(times, times[-1] - span))
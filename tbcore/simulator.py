@@ -0,0 +1,204 @@
+"""Virtual thrust bench that speaks the thrustbench.ino serial protocol.
+
+The simulator emits the firmware's telemetry lines (or binary frames
+after "B") at any sample rate, with optional noise and dropped samples,
+and answers the firmware command set: "0"-"9", "N%", "R", "S", "B", "A".
+
+Two ways to use it:
+
+    serial.serial_for_url("sim://?rate=1000&noise=0.02&dropout=0.001")
+        in-process, through tbcore/urlhandler/protocol_sim.py; any
+        dashboard port box accepts the same URL
+
+    python -m tbcore.simulator --rate 1000 --noise 0.02
+        exposes a pseudo terminal (Linux/macOS) that other programs can
+        open like a real Arduino
+"""
+import argparse
+import os
+import re
+import select
+import sys
+import time
+
+import numpy as np
+
+from tbcore.protocol import encode_frames
+
+SPEED_OPTIONS = (10, 20, 30, 40, 50, 60, 70, 80, 90, 100)
+RAMP_PER_S = 1 / 0.075  # firmware ramps 1 % every 75 ms
+_TO_INT = re.compile(r"\s*([-+]?\d+)")  # what Arduino's String.toInt() reads
+
+# Rough model of a 2 kg-class motor and prop at 100 % throttle
+MAX_THRUST_G = 2000.0
+MAX_RPM = 12000.0
+MAX_CURRENT_A = 30.0
+AMBIENT_C = 24.0
+MOTOR_RISE_C = 40.0
+LOADCELL_NOISE_G = 50.0  # load cell noise at zero thrust, scaled by `noise`
+
+
+class BenchSimulator:
+    """Software model of a rig running thrustbench.ino.
+
+    Time only advances when output is requested, so the model needs no
+    thread: read_available() generates every sample due since the last
+    call in one vectorized step.
+    """
+
+    def __init__(self, rate_hz=1.0, noise=0.0, dropout=0.0, seed=None, clock=time.monotonic):
+        if rate_hz <= 0:
+            raise ValueError("rate_hz must be positive")
+        self.rate_hz = rate_hz
+        self.noise = noise
+        self.dropout = dropout
+        self.clock = clock
+        self.rng = np.random.default_rng(seed)
+        self.binary = False
+        self.seq = 0
+        self.speed = 0.0
+        self.target_speed = 0
+        self.samples = 0
+        self.dropped = 0
+        self._out = bytearray()
+        self._command = b""
+        self._start = clock()
+        self._last = self._start
+        self._next_sample = self._start + 1.0 / rate_hz
+        self._emit(b"Thrustbench ready\r\n")
+
+    def next_sample_in(self):
+        """ Seconds until the next sample is due """
+        return max(0.0, self._next_sample - self.clock())
+
+    def write(self, data):
+        """ Feed host -> device bytes; complete lines are run as commands """
+        self.read_available(generate_only=True)
+        self._command += data
+        while b"\n" in self._command:
+            line, self._command = self._command.split(b"\n", 1)
+            self.process_command(line.decode('ascii', errors='replace').strip())
+        return len(data)
+
+    def process_command(self, command):
+        # Same parsing as processCommand() in thrustbench.ino
+        if command.endswith("%"):
+            match = _TO_INT.match(command[:-1])
+            self.target_speed = min(max(int(match.group(1)) if match else 0, 0), 100)
+            self._emit(f"Target speed: {self.target_speed}%\r\n".encode())
+            return
+        if not command:
+            return
+        cmd = command[0]
+        if "0" <= cmd <= "9":
+            self.target_speed = SPEED_OPTIONS[int(cmd)]
+            self._emit(f"Target motor speed set to {self.target_speed}%\r\n".encode())
+        elif cmd in "Rr":
+            self._emit(f"Current motor speed: {int(self.speed)}%\r\n".encode())
+        elif cmd in "Ss":
+            self.target_speed = 0
+            self._emit(b"Stopping motor gradually\r\n")
+        elif cmd in "Bb":
+            self.binary = True
+        elif cmd in "Aa":
+            self.binary = False
+        else:
+            self._emit(b"Invalid command. Use 0-9 or N% to set speed, R to read current speed, "
+                       b"S to stop motor, B/A for binary/ASCII telemetry.\r\n")
+
+    def read_available(self, generate_only=False):
+        """ Generate every sample due by now and return the pending output """
+        now = self.clock()
+        if now >= self._next_sample:
+            n = int((now - self._next_sample) * self.rate_hz) + 1
+            times = self._next_sample + np.arange(n) / self.rate_hz
+            self._next_sample = times[-1] + 1.0 / self.rate_hz
+            self._generate(times)
+        if generate_only:
+            return b""
+        data = bytes(self._out)
+        self._out.clear()
+        return data
+
+    def _ramp(self, times):
+        """ Speed at each sample time, ramping toward the target like the ESC code """
+        elapsed = times - self._last
+        step = np.minimum(elapsed * RAMP_PER_S, abs(self.target_speed - self.speed))
+        speed = self.speed + np.sign(self.target_speed - self.speed) * step
+        self.speed = float(speed[-1])
+        self._last = float(times[-1])
+        return speed
+
+    def _generate(self, times):
+        n = len(times)
+        speed = self._ramp(times)
+        load = speed / 100.0
+        jitter = self.rng.standard_normal((4, n)) * self.noise if self.noise else np.zeros((4, n))
+        throttle = np.floor(speed)
+        rpm = np.maximum(MAX_RPM * load * (1 + jitter[0]), 0).astype(np.int64)
+        pulses = (rpm / 60.0 / self.rate_hz).astype(np.int64)
+        thrust = MAX_THRUST_G * load ** 2 * (1 + jitter[1]) + LOADCELL_NOISE_G * jitter[3]
+        current = np.maximum(MAX_CURRENT_A * load ** 3 * (1 + jitter[2]), 0)
+        ambient = np.full(n, AMBIENT_C)
+        objtemp = AMBIENT_C + MOTOR_RISE_C * load ** 2
+        kept = self.rng.random(n) >= self.dropout if self.dropout else np.ones(n, dtype=bool)
+
+        seq = (self.seq + np.arange(n)) % 0x10000
+        self.seq = (self.seq + n) % 0x10000
+        self.samples += int(kept.sum())
+        self.dropped += int(n - kept.sum())
+        if self.binary:
+            t_us = ((times - self._start) * 1e6).astype(np.int64) % 0x100000000
+            self._emit(encode_frames(
+                seq[kept], t_us[kept], throttle=throttle[kept], rpm=rpm[kept],
+                pulse_count=pulses[kept], thrust=thrust[kept], current=current[kept],
+                ambient_temp=ambient[kept], object_temp=objtemp[kept],
+            ))
+            return
+        lines = [
+            f"Throttle{throttle[i]:.2f},RPM:{rpm[i]},PulseCount:{pulses[i]},"
+            f"Thrust:{thrust[i]:.1f},Current:{current[i]:.2f},"
+            f"AmbientTemp:{ambient[i]:.1f},ObjectTemp:{objtemp[i]:.1f}\r\n"
+            for i in np.flatnonzero(kept)
+        ]
+        self._emit("".join(lines).encode())
+
+    def _emit(self, data):
+        self._out += data
+
+
+def run_pty(simulator):
+    """ Serve the simulator on a pseudo terminal until interrupted """
+    import tty
+
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    print(f"Simulated thrust bench on {os.ttyname(slave)}", flush=True)
+    try:
+        while True:
+            readable, _, _ = select.select([master], [], [], simulator.next_sample_in())
+            if readable:
+                simulator.write(os.read(master, 1024))
+            data = simulator.read_available()
+            if data:
+                os.write(master, data)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        os.close(master)
+        os.close(slave)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate a thrust bench on a pseudo terminal.")
+    parser.add_argument('--rate', type=float, default=1.0, help="samples per second")
+    parser.add_argument('--noise', type=float, default=0.0, help="relative noise, e.g. 0.02")
+    parser.add_argument('--dropout', type=float, default=0.0, help="fraction of samples dropped")
+    parser.add_argument('--seed', type=int, help="random seed for reproducible runs")
+    args = parser.parse_args(argv)
+    run_pty(BenchSimulator(args.rate, args.noise, args.dropout, args.seed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""Streaming statistics for every telemetry channel.
+
+Nothing here keeps samples. Each channel carries
+
+    RunningStats   count, mean, variance (Welford, merged per batch with
+                   Chan's parallel update), min and max
+    QuantileSketch log-spaced histogram with a fixed relative error
+                   (the DDSketch layout), filled a batch at a time with
+                   np.bincount
+
+and StatsEngine keeps three scopes of them side by side:
+
+    session   everything since the engine was created or reset
+    step      one set per throttle step, keyed by whatever set_step() was
+              last given (usually the commanded throttle)
+    window    the last `window_s` seconds, kept as a ring of per-block
+              RunningStats that are merged on query; no quantiles
+
+so the GUI and the headless runner can ask for summaries at any time
+without rescanning history.
+"""
+import collections
+import math
+
+import numpy as np
+
+from tbcore.parser import FIELDS
+
+QUANTILES = (0.5, 0.95)
+
+
+class RunningStats:
+    """Count, mean, variance, min and max of a stream, NaNs ignored."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.nan
+        self.max = math.nan
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        n = len(values)
+        if not n:
+            return
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        self._merge(n, mean, m2, float(values.min()), float(values.max()))
+
+    def merge(self, other):
+        if other.count:
+            self._merge(other.count, other.mean, other.m2, other.min, other.max)
+
+    def _merge(self, n, mean, m2, lo, hi):
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = lo if math.isnan(self.min) else min(self.min, lo)
+        self.max = hi if math.isnan(self.max) else max(self.max, hi)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance) if self.count > 1 else math.nan
+
+    def summary(self):
+        return {'count': self.count, 'mean': self.mean if self.count else math.nan,
+                'std': self.std, 'min': self.min, 'max': self.max}
+
+
+class _Bins:
+    """Counts for a run of consecutive integer keys, grown as keys arrive."""
+
+    def __init__(self):
+        self.offset = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def add(self, keys):
+        if not len(keys):
+            return
+        lo, hi = int(keys.min()), int(keys.max())
+        if not len(self.counts):
+            self.offset = lo
+        if lo < self.offset or hi >= self.offset + len(self.counts):
+            start = min(lo, self.offset)
+            grown = np.zeros(max(hi + 1, self.offset + len(self.counts)) - start, dtype=np.int64)
+            grown[self.offset - start:self.offset - start + len(self.counts)] = self.counts
+            self.offset, self.counts = start, grown
+        self.counts += np.bincount(keys - self.offset, minlength=len(self.counts))
+
+
+class QuantileSketch:
+    """Streaming quantiles within `relative_accuracy` of the true value.
+
+    Each value x goes into bucket ceil(log_gamma |x|), gamma being
+    (1 + a) / (1 - a), with separate buckets for negative values and a
+    counter for values within `min_value` of zero. Memory grows with the
+    logarithm of the value range, not the sample count: 1 % accuracy
+    over 0.001..1e6 is about 1000 buckets.
+    """
+
+    def __init__(self, relative_accuracy=0.01, min_value=1e-6):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.positive = _Bins()
+        self.negative = _Bins()
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+        self.count += len(values)
+        positive = values[values > self.min_value]
+        negative = -values[values < -self.min_value]
+        self.zeros += len(values) - len(positive) - len(negative)
+        self.positive.add(np.ceil(np.log(positive) / self.log_gamma).astype(np.int64))
+        self.negative.add(np.ceil(np.log(negative) / self.log_gamma).astype(np.int64))
+
+    def quantile(self, p):
+        if not self.count:
+            return math.nan
+        rank = p * (self.count - 1)
+        # Walk from the most negative value up: negative buckets by
+        # decreasing magnitude, then zeros, then positive buckets
+        negative = np.cumsum(self.negative.counts[::-1])
+        if len(negative) and rank < negative[-1]:
+            key = self.negative.offset + len(negative) - 1 - int(np.searchsorted(negative, rank, 'right'))
+            return -self._value(key)
+        rank -= negative[-1] if len(negative) else 0
+        if rank < self.zeros:
+            return 0.0
+        rank -= self.zeros
+        positive = np.cumsum(self.positive.counts)
+        index = min(int(np.searchsorted(positive, rank, 'right')), len(positive) - 1)
+        return self._value(self.positive.offset + index)
+
+    def _value(self, key):
+        # Midpoint (in relative terms) of bucket (gamma^(key-1), gamma^key]
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+
+class ChannelStats:
+    """RunningStats and a quantile sketch for each of a set of channels."""
+
+    def __init__(self, channels=FIELDS, quantiles=QUANTILES):
+        self.samples = 0
+        self.quantiles = tuple(quantiles)
+        self.stats = {name: RunningStats() for name in channels}
+        self.sketches = {name: QuantileSketch() for name in channels} if quantiles else {}
+
+    def add(self, columns):
+        self.samples += len(columns['time'])
+        for name, stats in self.stats.items():
+            if name in columns:
+                stats.add(columns[name])
+                if self.sketches:
+                    self.sketches[name].add(columns[name])
+
+    def summary(self, name):
+        result = self.stats[name].summary()
+        for p in self.quantiles:
+            result[f"p{p * 100:g}"] = self.sketches[name].quantile(p)
+        return result
+
+
+class SlidingStats:
+    """RunningStats over the last `window_s` seconds of sample time.
+
+    Samples are summarised into `blocks` time blocks as they arrive;
+    blocks that fall out of the window are dropped, so the window edge
+    is accurate to one block.
+    """
+
+    def __init__(self, channels=FIELDS, window_s=10.0, blocks=20):
+        self.channels = tuple(channels)
+        self.window_s = window_s
+        self.block_s = window_s / blocks
+        self.blocks = collections.deque()  # (block number, {channel: RunningStats})
+
+    def add(self, columns):
+        times = np.asarray(columns['time'], dtype=np.float64)
+        if not len(times):
+            return
+        block_ids = np.floor(times / self.block_s).astype(np.int64)
+        # Telemetry arrives in time order, so each block is one contiguous run
+        edges = np.flatnonzero(np.diff(block_ids)) + 1
+        for start, stop in zip(np.r_[0, edges], np.r_[edges, len(times)]):
+            block_id = int(block_ids[start])
+            if not self.blocks or self.blocks[-1][0] != block_id:
+                self.blocks.append((block_id, {name: RunningStats() for name in self.channels}))
+            block = self.blocks[-1][1]
+            for name in self.channels:
+                if name in columns:
+                    block[name].add(columns[name][start:stop])
+        oldest = int(np.floor((times[-1] - self.window_s) / self.block_s))
+        while self.blocks and self.blocks[0][0] < oldest:
+            self.blocks.popleft()
+
+    def summary(self, name):
+        stats = RunningStats()
+        for _, block in self.blocks:
+            stats.merge(block[name])
+        return stats.summary()
+
+
+class StatsEngine:
+    """Session, per-step and sliding-window statistics, fed batch by batch."""
+
+    def __init__(self, channels=FIELDS, window_s=10.0, quantiles=QUANTILES):
+        self.channels = tuple(channels)
+        self.window_s = window_s
+        self.quantiles = quantiles
+        self.reset()
+
+    def reset(self):
+        self.session = ChannelStats(self.channels, self.quantiles)
+        self.window = SlidingStats(self.channels, self.window_s)
+        self.steps = {}
+        self.step = None
+
+    def set_step(self, key):
+        """ Samples from now on also count toward step `key` (None for no step) """
+        self.step = key
+        if key is not None and key not in self.steps:
+            self.steps[key] = ChannelStats(self.channels, self.quantiles)
+
+    def add(self, columns):
+        self.session.add(columns)
+        self.window.add(columns)
+        if self.step is not None:
+            self.steps[self.step].add(columns)
+
+    def query(self, name, scope='session', step=None):
+        """ Summary dict of one channel: count, mean, std, min, max (+ quantiles) """
+        if scope == 'session':
+            return self.session.summary(name)
+        if scope == 'window':
+            return self.window.summary(name)
+        if scope == 'step':
+            key = self.step if step is None else step
+            if key not in self.steps:
+                # Same keys as a real step, quantiles included, all empty
+                return ChannelStats((name,), self.quantiles).summary(name)
+            return self.steps[key].summary(name)
+        raise ValueError(f"Unknown statistics scope: {scope}")
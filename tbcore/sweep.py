@@ -0,0 +1,189 @@
+"""Automated throttle sweeps that advance as soon as the rig settles.
+
+A sweep steps through a throttle profile, e.g. "10:100:10" (start, stop,
+step, inclusive) or "20,35,50". After each "N%" command the engine
+watches thrust, RPM and current over a rolling time window and moves on
+once every channel's standard deviation over that window is within
+tolerance, instead of waiting a fixed dwell. Each step leaves one
+operating point: the mean (and spread) of every telemetry field over
+the settled window.
+
+The engine has no thread or timer of its own. Feed it every decoded
+batch through update(); call update() with no batch to let step
+timeouts fire while no data is arriving.
+"""
+import csv
+import time
+
+import numpy as np
+
+from tbcore.parser import FIELDS
+
+SETTLE_FIELDS = ('thrust', 'rpm', 'current')
+# Allowed standard deviation over the window: the larger of a fraction
+# of the mean and an absolute floor for readings near zero
+REL_TOLERANCE = {'thrust': 0.01, 'rpm': 0.01, 'current': 0.02}
+ABS_TOLERANCE = {'thrust': 5.0, 'rpm': 50.0, 'current': 0.1}
+
+
+def parse_profile(text):
+    """ "10:50:10" -> [10, 20, 30, 40, 50]; "20,35,50" -> [20, 35, 50] """
+    text = text.strip()
+    if ":" in text:
+        start, stop, step = (int(part) for part in text.split(":"))
+        if step == 0:
+            raise ValueError("Sweep step must not be 0")
+        throttles = list(range(start, stop + (1 if step > 0 else -1), step))
+    else:
+        throttles = [int(part) for part in text.split(",")]
+    for throttle in throttles:
+        if not 0 <= throttle <= 100:
+            raise ValueError(f"Throttle out of range: {throttle}")
+    if not throttles:
+        raise ValueError(f"Empty sweep profile: {text!r}")
+    return throttles
+
+
+class SteadyStateDetector:
+    """Rolling mean/variance of a few channels over the last `window_s` seconds.
+
+    Only the samples inside the window are kept, so memory is bounded by
+    the sample rate times the window length.
+    """
+
+    def __init__(self, window_s=1.0, fields=SETTLE_FIELDS, rel_tolerance=None, abs_tolerance=None):
+        self.window_s = window_s
+        self.fields = tuple(fields)
+        self.rel_tolerance = dict(REL_TOLERANCE, **(rel_tolerance or {}))
+        self.abs_tolerance = dict(ABS_TOLERANCE, **(abs_tolerance or {}))
+        self.reset()
+
+    def reset(self):
+        self.window = {name: np.empty(0) for name in ('time',) + FIELDS}
+
+    def add(self, columns):
+        times = np.asarray(columns['time'], dtype=np.float64)
+        if not len(times):
+            return
+        for name in self.window:
+            values = columns.get(name)
+            if values is None:
+                values = np.full(len(times), np.nan)
+            self.window[name] = np.concatenate([self.window[name], values])
+        # Drop everything older than the window
+        start = np.searchsorted(self.window['time'], self.window['time'][-1] - self.window_s)
+        if start:
+            for name in self.window:
+                self.window[name] = self.window[name][start:]
+
+    def span(self):
+        times = self.window['time']
+        return float(times[-1] - times[0]) if len(times) > 1 else 0.0
+
+    def settled(self):
+        """ True once the window is full and every channel is within tolerance """
+        # Allow for one missing sample at the window edge
+        if self.span() < 0.9 * self.window_s:
+            return False
+        for name in self.fields:
+            values = self.window[name][~np.isnan(self.window[name])]
+            if len(values) < 2:
+                return False
+            limit = max(self.rel_tolerance[name] * abs(values.mean()), self.abs_tolerance[name])
+            if values.std() > limit:
+                return False
+        return True
+
+    def summary(self):
+        """ Mean and standard deviation of every field over the window """
+        point = {'samples': len(self.window['time'])}
+        for name in FIELDS:
+            values = self.window[name][~np.isnan(self.window[name])]
+            point[name] = float(values.mean()) if len(values) else np.nan
+            point[f"{name}_std"] = float(values.std()) if len(values) else np.nan
+        return point
+
+
+class SweepEngine:
+    """Step a rig through a throttle profile, one operating point per step.
+
+    `send` is called with each command (bytes), normally the serial
+    port's write. A step ends when the detector reports steady state, but
+    never before `min_dwell_s` (so the ESC ramp has begun) and never
+    after `max_dwell_s`; a step that times out is still recorded, with
+    settled=False.
+    """
+
+    def __init__(self, profile, send, window_s=1.0, min_dwell_s=0.5, max_dwell_s=30.0,
+                 clock=time.monotonic, **tolerances):
+        self.profile = list(profile)
+        self.send = send
+        self.min_dwell_s = min_dwell_s
+        self.max_dwell_s = max_dwell_s
+        self.clock = clock
+        self.detector = SteadyStateDetector(window_s, **tolerances)
+        self.points = []
+        self.index = None
+        self.done = False
+        self._step_start = None
+
+    @property
+    def running(self):
+        return self.index is not None and not self.done
+
+    @property
+    def throttle(self):
+        return self.profile[self.index] if self.running else None
+
+    def start(self):
+        self.points = []
+        self.done = False
+        self._begin_step(0)
+
+    def abort(self):
+        """ Stop the sweep where it is; the rig is told to stop """
+        if self.running:
+            self.done = True
+            self.send(b"S\n")
+
+    def update(self, columns=None):
+        """ Feed one batch; returns the operating point if a step just finished """
+        if not self.running:
+            return None
+        if columns:
+            self.detector.add(columns)
+        elapsed = self.clock() - self._step_start
+        if elapsed < self.min_dwell_s:
+            return None
+        settled = self.detector.settled()
+        if not settled and elapsed < self.max_dwell_s:
+            return None
+
+        point = self.detector.summary()
+        point.update(step=self.index, target=self.throttle, settled=settled, dwell_s=elapsed)
+        self.points.append(point)
+        if self.index + 1 < len(self.profile):
+            self._begin_step(self.index + 1)
+        else:
+            self.done = True
+            self.send(b"S\n")
+        return point
+
+    def _begin_step(self, index):
+        self.index = index
+        self.detector.reset()
+        self._step_start = self.clock()
+        self.send(f"{self.profile[index]}%\n".encode())
+
+    def curve(self, field='thrust'):
+        """ Measured throttle and `field` of every operating point so far """
+        return (np.array([p['throttle'] for p in self.points]),
+                np.array([p[field] for p in self.points]))
+
+    def write_csv(self, path):
+        columns = ['step', 'target', 'settled', 'dwell_s', 'samples']
+        columns += [name for field in FIELDS for name in (field, f"{field}_std")]
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, columns)
+            writer.writeheader()
+            writer.writerows(self.points)
@@ -0,0 +1,268 @@
+"""Asyncio serial transport: open, stream lines, send commands, reconnect.
+
+One SerialTransport per device. Waiting on the device never blocks the
+caller: where the port has a file descriptor (POSIX serial ports) it is
+watched with loop.add_reader, so an idle port costs no CPU and no
+thread; anything else (Windows, pyserial URL handlers such as sim://)
+is read by one executor thread blocked in the driver.
+
+    transport = SerialTransport("COM6", settle_s=2)
+    await transport.open()
+    transport.send(b"5\\n")          # queued until the Arduino has reset
+    async for line in transport.lines():
+        ...
+
+If the port fails (e.g. the cable is pulled) the transport keeps trying
+to reopen it every `reconnect_s` seconds until close(); lines() just
+resumes.
+
+Qt dashboards run asyncio on the Qt thread: call install_event_loop(app)
+before creating windows and run_app(app, loop) instead of app.exec_().
+With qasync installed both share one event loop and nothing polls;
+without it the asyncio loop is stepped from a QTimer, which still never
+blocks but wakes every few milliseconds.
+"""
+import asyncio
+import sys
+
+import serial
+
+from tbcore.acquisition import BAUDRATE
+
+FALLBACK_STEP_MS = 10
+
+
+class SerialTransport:
+    """Line-oriented, reconnecting serial connection for asyncio code."""
+
+    CLOSED = 'closed'
+    OPENING = 'opening'
+    OPEN = 'open'
+    RECONNECTING = 'reconnecting'
+
+    def __init__(self, port, baudrate=BAUDRATE, settle_s=0.0, reconnect_s=2.0,
+                 on_state=None, encoding='utf-8'):
+        self.port = port
+        self.baudrate = baudrate
+        self.settle_s = settle_s
+        self.reconnect_s = reconnect_s
+        self.on_state = on_state
+        self.encoding = encoding
+        self.state = self.CLOSED
+        self.error = None
+        self.serial = None
+        self._loop = None
+        self._lines = None
+        self._buffer = bytearray()
+        self._ready = None
+        self._writes = None
+        self._tasks = []
+        self._fd = None
+
+    async def open(self):
+        """ Open the port; raises serial.SerialException if that fails """
+        self._loop = asyncio.get_event_loop()
+        self._lines = asyncio.Queue()
+        self._writes = asyncio.Queue()
+        self._ready = asyncio.Event()
+        self._tasks = []
+        self._set_state(self.OPENING)
+        try:
+            await self._connect()
+        except serial.SerialException:
+            self._set_state(self.CLOSED)
+            raise
+        self._tasks.append(self._loop.create_task(self._write_loop()))
+
+    async def close(self):
+        self.close_now()
+
+    def close_now(self):
+        """ close() for code that can't await, e.g. a Qt closeEvent """
+        self._set_state(self.CLOSED)
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._disconnect()
+        if self._lines is not None:
+            self._lines.put_nowait(None)  # ends lines()
+
+    def send(self, data, urgent=False):
+        """ Queue a command; written in order once the device is ready
+
+        Urgent data (e.g. an emergency stop) is written straight away when
+        the device is ready, ahead of anything still queued.
+        """
+        if self._writes is None or self.state == self.CLOSED:
+            return
+        if urgent and self._ready.is_set():
+            try:
+                self.serial.write(data)
+                return
+            except (serial.SerialException, OSError) as e:
+                self._lost(e)
+        self._writes.put_nowait(data)
+
+    async def write(self, data):
+        await self._ready.wait()
+        self.serial.write(data)
+
+    async def readline(self):
+        """ Next line without its line ending, or None once closed """
+        return await self._lines.get()
+
+    async def lines(self):
+        while True:
+            line = await self._lines.get()
+            if line is None:
+                return
+            yield line
+
+    async def _connect(self):
+        # Opening can block in the driver, so it never runs on the loop thread
+        self.serial = await self._loop.run_in_executor(
+            None, lambda: serial.serial_for_url(self.port, self.baudrate, timeout=0)
+        )
+        self.error = None
+        self._buffer.clear()
+        self._set_state(self.OPEN)
+        try:
+            self._fd = self.serial.fileno() if sys.platform != 'win32' else None
+        except (AttributeError, OSError, NotImplementedError):
+            self._fd = None
+        if self._fd is not None:
+            try:
+                self._loop.add_reader(self._fd, self._on_readable)
+            except NotImplementedError:  # e.g. the Proactor loop
+                self._fd = None
+        if self._fd is None:
+            self.serial.timeout = 0.5
+            self._tasks.append(self._loop.create_task(self._executor_reads()))
+        # Boards such as the Uno reset when the port opens
+        self._loop.call_later(self.settle_s, self._ready.set)
+
+    def _disconnect(self):
+        if self._ready is not None:
+            self._ready.clear()
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            self._fd = None
+        if self.serial is not None:
+            try:
+                self.serial.close()
+            except serial.SerialException:
+                pass
+            self.serial = None
+
+    def _on_readable(self):
+        try:
+            data = self.serial.read(self.serial.in_waiting or 1)
+        except (serial.SerialException, OSError) as e:
+            self._lost(e)
+            return
+        self._feed(data)
+
+    async def _executor_reads(self):
+        port = self.serial
+        while self.state == self.OPEN and port is self.serial:
+            try:
+                data = await self._loop.run_in_executor(
+                    None, lambda: port.read(max(1, port.in_waiting))
+                )
+            except (serial.SerialException, OSError, TypeError) as e:
+                if port is self.serial:
+                    self._lost(e)
+                return
+            self._feed(data)
+
+    def _feed(self, data):
+        if not data:
+            return
+        self._buffer += data
+        *lines, rest = self._buffer.split(b"\n")
+        self._buffer = bytearray(rest)
+        for line in lines:
+            self._lines.put_nowait(line.decode(self.encoding, errors='replace').strip())
+
+    def _lost(self, error):
+        if self.state != self.OPEN:
+            return
+        print(f"Lost {self.port}: {error}")
+        self.error = error
+        self._disconnect()
+        self._set_state(self.RECONNECTING)
+        self._tasks.append(self._loop.create_task(self._reconnect()))
+
+    async def _reconnect(self):
+        while self.state == self.RECONNECTING:
+            await asyncio.sleep(self.reconnect_s)
+            try:
+                await self._connect()
+            except serial.SerialException as e:
+                self.error = e
+
+    async def _write_loop(self):
+        while True:
+            data = await self._writes.get()
+            while True:
+                await self._ready.wait()
+                try:
+                    self.serial.write(data)
+                    break
+                except (serial.SerialException, OSError) as e:
+                    self._lost(e)
+
+    def _set_state(self, state):
+        self.state = state
+        if self.on_state:
+            self.on_state(state)
+
+
+def install_event_loop(app):
+    """ Make asyncio run on the Qt thread; call before creating windows """
+    try:
+        import qasync
+    except ImportError:
+        qasync = None
+    if qasync:
+        loop = qasync.QEventLoop(app)
+    else:
+        from PyQt5.QtCore import QTimer
+
+        loop = asyncio.new_event_loop()
+
+        def step():
+            # Run whatever is ready, without waiting for more
+            loop.call_soon(loop.stop)
+            loop.run_forever()
+
+        timer = QTimer(app)
+        timer.timeout.connect(step)
+        timer.start(FALLBACK_STEP_MS)
+    asyncio.set_event_loop(loop)
+    return loop
+
+
+def run_app(app, loop):
+    """ Replacement for app.exec_() once install_event_loop() was called """
+    if type(loop).__module__.startswith('qasync'):
+        # qasync's run_forever() is the Qt event loop
+        with loop:
+            loop.run_forever()
+            _finish_tasks(loop)
+        return 0
+    code = app.exec_()
+    _finish_tasks(loop)
+    loop.run_until_complete(loop.shutdown_asyncgens())
+    loop.close()
+    return code
+
+
+def _finish_tasks(loop):
+    # Tasks still pending when the window closed (readers, writers, a
+    # close that was scheduled) run to cancellation before the loop goes
+    tasks = asyncio.all_tasks(loop)
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
@@ -0,0 +1 @@
+"""pyserial URL handlers, registered by tbcore.acquisition."""
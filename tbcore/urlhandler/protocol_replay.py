@@ -0,0 +1,34 @@
+"""pyserial "replay://" URL handler backed by tbcore.replay.
+
+    replay://<session directory>[?speed=<x>][&start=<s>][&loop=1]
+"""
+import os
+import urllib.parse
+
+from serial.serialutil import SerialException
+
+from tbcore.replay import SessionReplay
+from tbcore.urlhandler.source import SourceSerial
+
+
+class Serial(SourceSerial):
+    """Serial port whose other end plays back a recorded session."""
+
+    scheme = "replay"
+    options = {'speed': ('speed', float), 'start': ('start', float),
+               'loop': ('loop', lambda value: bool(int(value)))}
+
+    @property
+    def replay(self):
+        return self.source
+
+    def make_source(self, url):
+        path, options = self.from_url(url)
+        try:
+            return SessionReplay(path, **options)
+        except (OSError, ValueError) as e:
+            raise SerialException(f"Cannot replay {path}: {e}")
+
+    def from_url(self, url):
+        parts, options = self.split_url(url)
+        return os.path.expanduser(urllib.parse.unquote(parts.netloc + parts.path)), options
@@ -0,0 +1,24 @@
+"""pyserial "sim://" URL handler backed by tbcore.simulator.
+
+    sim://[?rate=<Hz>][&noise=<fraction>][&dropout=<fraction>][&seed=<int>]
+"""
+from tbcore.simulator import BenchSimulator
+from tbcore.urlhandler.source import SourceSerial
+
+
+class Serial(SourceSerial):
+    """Serial port whose other end is a simulated thrust bench."""
+
+    scheme = "sim"
+    options = {'rate': ('rate_hz', float), 'noise': ('noise', float),
+               'dropout': ('dropout', float), 'seed': ('seed', int)}
+
+    @property
+    def simulator(self):
+        return self.source
+
+    def make_source(self, url):
+        return BenchSimulator(**self.from_url(url))
+
+    def from_url(self, url):
+        return self.split_url(url)[1]
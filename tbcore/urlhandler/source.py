@@ -0,0 +1,136 @@
+"""Shared pyserial port for the URL handlers whose other end is in-process.
+
+A source is any object with
+
+    read_available()   bytes generated since the last call
+    next_sample_in()   seconds until it will have more
+    write(data)        host -> device bytes; returns how many were taken
+
+(tbcore.simulator.BenchSimulator, tbcore.replay.SessionReplay). A handler
+subclasses SourceSerial, names its URL scheme and option converters and
+builds the source in make_source().
+"""
+import time
+import urllib.parse
+
+from serial.serialutil import PortNotOpenError, SerialBase, SerialException
+
+
+class SourceSerial(SerialBase):
+    """Serial port that reads from and writes to a source object."""
+
+    scheme = None
+    # URL query option -> (keyword argument, converter)
+    options = {}
+
+    def __init__(self, *args, **kwargs):
+        self.source = None
+        self._buffer = bytearray()
+        super().__init__(*args, **kwargs)
+
+    def make_source(self, url):
+        raise NotImplementedError
+
+    def open(self):
+        if self.is_open:
+            raise SerialException("Port is already open.")
+        if self._port is None:
+            raise SerialException("Port must be configured before it can be used.")
+        self.source = self.make_source(self._port)
+        self._buffer = bytearray()
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+        super().close()
+
+    def split_url(self, url):
+        """ (urlsplit parts, keyword arguments from the query) """
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme != self.scheme:
+            raise SerialException(f"expected a {self.scheme}:// URL, got {url!r}")
+        options = {}
+        for option, values in urllib.parse.parse_qs(parts.query, True).items():
+            if option not in self.options:
+                raise SerialException(f"unknown {self.scheme}:// option: {option!r}")
+            name, convert = self.options[option]
+            try:
+                options[name] = convert(values[0])
+            except ValueError as e:
+                raise SerialException(f"invalid {self.scheme}:// option {option}: {e}")
+        return parts, options
+
+    def _reconfigure_port(self):
+        pass  # baud rate and framing mean nothing to an in-process source
+
+    def _fill(self):
+        self._buffer += self.source.read_available()
+
+    @property
+    def in_waiting(self):
+        if not self.is_open:
+            raise PortNotOpenError()
+        self._fill()
+        return len(self._buffer)
+
+    def read(self, size=1):
+        if not self.is_open:
+            raise PortNotOpenError()
+        deadline = None if self._timeout is None else time.monotonic() + self._timeout
+        self._fill()
+        while len(self._buffer) < size and self.is_open:
+            wait = self.source.next_sample_in()
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                wait = min(wait, remaining)
+            time.sleep(wait)
+            self._fill()
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def write(self, data):
+        if not self.is_open:
+            raise PortNotOpenError()
+        return self.source.write(bytes(data))
+
+    def reset_input_buffer(self):
+        if not self.is_open:
+            raise PortNotOpenError()
+        self._fill()
+        self._buffer.clear()
+
+    def reset_output_buffer(self):
+        if not self.is_open:
+            raise PortNotOpenError()
+
+    @property
+    def out_waiting(self):
+        return 0
+
+    def _update_break_state(self):
+        pass
+
+    def _update_rts_state(self):
+        pass
+
+    def _update_dtr_state(self):
+        pass
+
+    @property
+    def cts(self):
+        return True
+
+    @property
+    def dsr(self):
+        return True
+
+    @property
+    def ri(self):
+        return False
+
+    @property
+    def cd(self):
+        return True
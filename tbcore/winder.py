@@ -0,0 +1,307 @@
+"""Job runner for the stator winder controller (stepper/stepMotor).
+
+Commands go out one at a time through a SerialTransport, each waiting
+for the controller's acknowledgement:
+
+    host -> controller          controller -> host
+    P,<params...>               ACK,P  or  ERR,P,<reason>
+    H / S / M,...               ACK,<c> when accepted, DONE,<c> when finished
+    E  (emergency stop)         ESTOP
+                                PROGRESS,<index>,<slot>,<coil>,<coils>,<steps/s>
+    J / Q,<n> + blocks / W      planned jobs, see tbcore.planner
+                                FREE,<free blocks>,<blocks executed>
+
+A command that is not acknowledged within `ack_timeout` is resent
+(`retries` times, only for commands that are safe to repeat) and then
+fails, which also drops everything queued behind it. Long commands stay
+in flight until DONE; PROGRESS lines keep them alive, and one that goes
+quiet for `stall_timeout` seconds fails. Any other line from the
+controller is passed to on_message.
+
+estop() never waits in the queue: it drops every queued command, writes
+"E" ahead of anything the transport still holds and repeats it until
+the controller confirms, so its latency is one write plus however long
+the controller takes to notice (one step period, see stepMotor.ino).
+
+Everything runs on the asyncio loop, i.e. the Qt thread with
+tbcore.transport.install_event_loop, so callbacks may touch widgets.
+"""
+import asyncio
+import collections
+import time
+
+import serial
+
+TOTAL_SLOTS = 12  # Must match stepMotor.ino
+ACK_TIMEOUT_S = 1.0
+STALL_TIMEOUT_S = 30.0
+ESTOP_REPEATS = 5
+
+
+class CommandFailed(Exception):
+    pass
+
+
+class Command:
+    """One controller command and the future its sender awaits."""
+
+    def __init__(self, text, wait_done=False, retries=0, payload=b""):
+        self.text = text.strip()
+        self.code = self.text[:1].upper()
+        self.wait_done = wait_done
+        self.retries = retries
+        self.payload = payload  # binary data sent right after the line
+        self.future = None
+
+    def __repr__(self):
+        return f"Command({self.text!r})"
+
+
+class Progress:
+    """Latest PROGRESS report of a winding job."""
+
+    def __init__(self, index=0, slot=0, coil=0, coils=0, rate=0.0):
+        self.index = index  # position in the winding sequence, 0-based
+        self.slot = slot
+        self.coil = coil  # coils completed in this slot
+        self.coils = coils
+        self.rate = rate  # winding steps per second over the last coil
+        self.remaining = None  # seconds left, when the job was planned on the host
+        self.time = time.monotonic()
+
+    @classmethod
+    def parse(cls, fields):
+        index, slot, coil, coils = (int(f) for f in fields[:4])
+        return cls(index, slot, coil, coils, float(fields[4]))
+
+    @property
+    def coils_done(self):
+        return self.index * self.coils + self.coil
+
+    @property
+    def coils_total(self):
+        return TOTAL_SLOTS * self.coils
+
+    @property
+    def fraction(self):
+        return self.coils_done / self.coils_total if self.coils_total else 0.0
+
+
+class JobRunner:
+    """Command queue with acks, timeouts and a queue-jumping emergency stop."""
+
+    IDLE = 'idle'
+    BUSY = 'busy'
+    STOPPED = 'stopped'  # after an emergency stop, until the next command
+
+    def __init__(self, transport, ack_timeout=ACK_TIMEOUT_S, stall_timeout=STALL_TIMEOUT_S,
+                 on_progress=None, on_message=None, on_state=None):
+        self.transport = transport
+        self.ack_timeout = ack_timeout
+        self.stall_timeout = stall_timeout
+        self.on_progress = on_progress
+        self.on_message = on_message
+        self.on_state = on_state
+        self.state = self.IDLE
+        self.progress = None
+        self.current = None
+        # Planned jobs: the controller's free block buffer and blocks run so far
+        self.free = 0
+        self.executed = 0
+        self.on_blocks = None
+        self._free_changed = None
+        self._queue = collections.deque()
+        self._wakeup = None
+        self._replies = None  # ACK/DONE/ERR/ESTOP lines for the command in flight
+        self._stopped = None
+        self._activity = 0.0
+        self._tasks = []
+
+    def start(self):
+        """ Start reading replies and sending commands; the transport must be open """
+        loop = asyncio.get_event_loop()
+        self._wakeup = asyncio.Event()
+        self._stopped = asyncio.Event()
+        self._free_changed = asyncio.Event()
+        self._replies = asyncio.Queue()
+        self._tasks = [loop.create_task(self._read_loop()), loop.create_task(self._send_loop())]
+
+    def close(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._drop_queue(CommandFailed("Runner closed"))
+
+    @property
+    def pending(self):
+        """ Commands queued or in flight """
+        current = self.current
+        return len(self._queue) + (current is not None and not current.future.done())
+
+    def submit(self, text, wait_done=False, retries=0, payload=b""):
+        """ Queue a command; returns a future resolved with the ACK (or DONE) fields """
+        command = Command(text, wait_done, retries, payload)
+        command.future = asyncio.get_event_loop().create_future()
+        self._queue.append(command)
+        self._wakeup.set()
+        return command.future
+
+    def estop(self):
+        """ Emergency stop ahead of everything queued; returns a future set on ESTOP """
+        self._drop_queue(CommandFailed("Emergency stop"))
+        self._stopped.clear()
+        self._set_state(self.STOPPED)
+        self._free_changed.set()  # wakes a wait_free() so it notices
+        asyncio.get_event_loop().create_task(self._estop())
+        return asyncio.ensure_future(self._stopped.wait())
+
+    async def wait_free(self, blocks):
+        """ Until the controller's block buffer has room for `blocks` """
+        while self.free < blocks:
+            if self.state == self.STOPPED:
+                raise CommandFailed("Emergency stop")
+            self._free_changed.clear()
+            try:
+                await asyncio.wait_for(self._free_changed.wait(), 1.0)
+            except asyncio.TimeoutError:
+                if time.monotonic() - self._activity > self.stall_timeout:
+                    raise CommandFailed(f"controller buffer stuck full for {self.stall_timeout:g} s")
+
+    async def _estop(self):
+        for _ in range(ESTOP_REPEATS):
+            self.transport.send(b"E\n", urgent=True)
+            try:
+                await asyncio.wait_for(asyncio.shield(self._stopped.wait()), self.ack_timeout)
+                return
+            except asyncio.TimeoutError:
+                continue
+        self._message("Emergency stop not confirmed by the controller")
+
+    def _drop_queue(self, error):
+        commands = list(self._queue) + ([self.current] if self.current else [])
+        self._queue.clear()
+        for command in commands:
+            if command.future and not command.future.done():
+                command.future.set_exception(error)
+                command.future.exception()  # nobody may be awaiting it
+
+    async def _send_loop(self):
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            command = self.current = self._queue.popleft()
+            self._set_state(self.BUSY)
+            try:
+                reply = await self._run(command)
+                if not command.future.done():
+                    command.future.set_result(reply)
+            except (CommandFailed, serial.SerialException) as e:
+                # Already failed when an emergency stop dropped it; anything
+                # queued since is new and stays
+                if not command.future.done():
+                    command.future.set_exception(e)
+                    command.future.exception()
+                    # Whatever was queued behind it assumed it had worked
+                    self._drop_queue(CommandFailed(f"{command.text} failed: {e}"))
+            finally:
+                self.current = None
+            if self.state == self.BUSY and not self._queue:
+                self._set_state(self.IDLE)
+
+    async def _run(self, command):
+        while not self._replies.empty():
+            self._replies.get_nowait()  # late replies to the previous command
+        for attempt in range(command.retries + 1):
+            # Waits out the board's reset, so the timeout only counts from the write
+            await self.transport.write((command.text + "\n").encode() + command.payload)
+            try:
+                reply = await asyncio.wait_for(self._replies.get(), self.ack_timeout)
+                break
+            except asyncio.TimeoutError:
+                if command.future.done():  # dropped by an emergency stop
+                    return
+        else:
+            raise CommandFailed(f"no acknowledgement within {self.ack_timeout:g} s")
+        self._check(command, reply)
+        if not command.wait_done:
+            return reply
+        self._activity = time.monotonic()
+        while True:
+            try:
+                reply = await asyncio.wait_for(self._replies.get(), 1.0)
+            except asyncio.TimeoutError:
+                if command.future.done():
+                    return
+                if time.monotonic() - self._activity > self.stall_timeout:
+                    raise CommandFailed(f"no progress for {self.stall_timeout:g} s")
+                continue
+            self._check(command, reply)
+            if reply[0] == 'DONE':
+                return reply
+
+    def _check(self, command, reply):
+        kind, code, *rest = reply + ['']
+        if kind == 'ESTOP':
+            raise CommandFailed("Emergency stop")
+        if kind == 'ERR':
+            raise CommandFailed(rest[0] or "rejected by the controller")
+
+    async def _read_loop(self):
+        async for line in self.transport.lines():
+            if not line:
+                continue
+            self._activity = time.monotonic()
+            fields = line.split(",")
+            kind = fields[0]
+            if kind in ('ACK', 'DONE', 'ERR'):
+                # Queued, not handed over, so a DONE right behind its ACK isn't
+                # lost; a reply to an earlier command is only reported
+                current = self.current
+                if current and len(fields) > 1 and fields[1].upper() == current.code:
+                    if kind == 'ACK' and current.code in 'JQ' and len(fields) > 2:
+                        self._set_free(int(fields[2]))
+                    self._replies.put_nowait(fields)
+                else:
+                    self._message(f"Unexpected reply: {line}")
+            elif kind == 'PROGRESS':
+                try:
+                    self.progress = Progress.parse(fields[1:])
+                except (ValueError, IndexError):
+                    self._message(line)
+                    continue
+                if self.on_progress:
+                    self.on_progress(self.progress)
+            elif kind == 'FREE':
+                try:
+                    free, executed = int(fields[1]), int(fields[2])
+                except (ValueError, IndexError):
+                    self._message(line)
+                    continue
+                self.executed = executed
+                self._set_free(free)
+                if self.on_blocks:
+                    self.on_blocks(executed)
+            elif kind == 'ESTOP':
+                if self.current:
+                    self._replies.put_nowait(fields)
+                self._stopped.set()
+                self._set_state(self.STOPPED)
+                self._message("Emergency stop confirmed")
+            else:
+                self._message(line)
+
+    def _set_free(self, free):
+        self.free = free
+        self._free_changed.set()
+
+    def _message(self, text):
+        if self.on_message:
+            self.on_message(text)
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            if self.on_state:
+                self.on_state(state)
@@ -0,0 +1,276 @@
+from PyQt5.QtWidgets import (QApplication, QLineEdit, QMainWindow, QVBoxLayout, QHBoxLayout,
+                             QWidget, QPushButton, QLabel, QComboBox, QTabWidget,
+                             QTableWidget, QTableWidgetItem)
+import time
+import os
+import shutil
+import sys
+import tempfile
+import serial.tools.list_ports
+import pyqtgraph as pg
+from PyQt5.QtCore import QTimer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from tbcore.rigs import Rig, RigManager
+from tbcore.render import RenderScheduler, minmax_decimate
+from tbcore.ringbuffer import window_start
+
+FRAME_INTERVAL_MS = 33  # Poll every rig's reader once per frame
+RENDER_FPS = 30  # Upper bound on plot redraws per second, per rig
+WARMUP_S = 4  # ESC arming / load cell settling time after the first line
+PLOT_WINDOW_S = 10  # Seconds shown by the scrolling time plots
+PLOT_CAPACITY = 36000  # Samples per channel kept in RAM per rig (1 h at 10 Hz)
+SESSION_ROOT = os.path.join(os.path.expanduser("~"), "thrustbench_sessions")
+OVERVIEW_COLUMNS = ["Rig", "Port", "State", "Samples", "Rate /s", "Thrust g", "Current A",
+                    "g/W", "Temp C"]
+
+button_style = "background-color: #555555; color: white; font-size: 16px; font-weight: 500;"
+value_style = "padding: 6; border: 1px solid white; font-size: 20px; background-color: black; color: #39FF14;"
+
+
+class RigPanel(QWidget):
+    """Controls, live values and plots of one rig."""
+
+    def __init__(self, manager, rig):
+        super().__init__()
+        self.manager = manager
+        self.rig = rig
+        self.render_scheduler = RenderScheduler(RENDER_FPS)
+        layout = QVBoxLayout(self)
+
+        controls = QHBoxLayout()
+        self.connect_button = QPushButton("Connect")
+        self.connect_button.setStyleSheet("background-color: #4CAF50; color: white; font-size: 16px;")
+        self.connect_button.clicked.connect(self.toggle_connection)
+        self.record_button = QPushButton("REC")
+        self.record_button.setStyleSheet(button_style)
+        self.record_button.clicked.connect(self.toggle_recording)
+        self.speed_input = QLineEdit()
+        self.speed_input.setPlaceholderText("Enter %")
+        self.speed_input.setFixedWidth(100)
+        self.speed_input.returnPressed.connect(self.handle_input_speed)
+        self.stop_button = QPushButton("STOP")
+        self.stop_button.setStyleSheet("background-color: red; color: white; font-size: 16px; font-weight: 600;")
+        self.stop_button.clicked.connect(self.stop_motor)
+        self.state_label = QLabel(rig.state)
+        for widget in (QLabel(f"{rig.name}: {rig.port} ({rig.protocol})"), self.state_label,
+                       self.connect_button, self.record_button, self.speed_input, self.stop_button):
+            controls.addWidget(widget)
+        controls.addStretch()
+        layout.addLayout(controls)
+
+        values = QHBoxLayout()
+        self.displays = {}
+        for name, label in (('thrust', "Thrust g"), ('current', "Current A"), ('rpm', "RPM"),
+                            ('object_temp', "Temp C"), ('g_per_w', "g/W")):
+            display = QLabel("0")
+            display.setStyleSheet(value_style)
+            display.setFixedSize(140, 50)
+            values.addWidget(QLabel(label))
+            values.addWidget(display)
+            self.displays[name] = display
+        values.addStretch()
+        layout.addLayout(values)
+
+        self.time_plot = pg.PlotWidget(title="Thrust and Current vs Time")
+        self.time_plot.setLabel('bottom', 'Time (s)')
+        self.time_plot.addLegend()
+        self.time_plot.setMouseEnabled(x=False, y=False)
+        self.thrust_time_curve = self.time_plot.plot(pen='g', name="Thrust (g)")
+        self.current_time_curve = self.time_plot.plot(pen='b', name="Current (A) x 10")
+        self.thrust_plot = pg.PlotWidget(title="Thrust vs Throttle")
+        self.thrust_plot.setLabel('left', 'Thrust (g)')
+        self.thrust_plot.setLabel('bottom', 'Throttle (%)')
+        self.thrust_curve = self.thrust_plot.plot(pen='g')
+        layout.addWidget(self.time_plot)
+        layout.addWidget(self.thrust_plot)
+
+    def toggle_connection(self):
+        if self.rig.state in (Rig.CONNECTED, Rig.CONNECTING, Rig.RECONNECTING):
+            self.manager.disconnect(self.rig.name)
+            self.record_button.setText("REC")
+            self.record_button.setStyleSheet(button_style)
+        else:
+            self.manager.connect(self.rig.name)
+
+    def toggle_recording(self):
+        if self.rig.recorder:
+            recorder = self.rig.stop_recording()
+            print(f"Recording saved to {recorder.path}")
+            self.record_button.setText("REC")
+            self.record_button.setStyleSheet(button_style)
+        elif self.rig.state == Rig.CONNECTED:
+            self.rig.start_recording(SESSION_ROOT)
+            self.record_button.setText("REC ●")
+            self.record_button.setStyleSheet("background-color: red; color: white; font-size: 16px;")
+        else:
+            print(f"Connect {self.rig.name} before recording.")
+
+    def handle_input_speed(self):
+        try:
+            speed = int(self.speed_input.text())
+        except ValueError:
+            print("Invalid input. Please enter a number.")
+            return
+        if 10 <= speed <= 100:
+            self.manager.send(self.rig.name, f"{speed}%\n".encode())
+            self.rig.stats.set_step(speed)
+            self.speed_input.clear()
+        else:
+            print("Please enter a value between 10 and 100.")
+
+    def stop_motor(self):
+        self.manager.send(self.rig.name, b"S\n")
+        self.rig.stats.set_step(0)
+
+    def update_view(self, new_samples):
+        """ Called every frame with the number of samples the rig just received """
+        self.state_label.setText(self.rig.state)
+        connected = self.rig.state in (Rig.CONNECTED, Rig.RECONNECTING)
+        self.connect_button.setText("Disconnect" if connected else "Connect")
+        if not new_samples:
+            return
+        self.render_scheduler.request()
+        if not self.render_scheduler.due(self.isVisible()):
+            return
+        for name, display in self.displays.items():
+            display.setText(f"{self.rig.last.get(name, float('nan')):.2f}")
+
+        buffers = self.rig.buffers
+        times = buffers['time'].view()
+        start = window_start(times, PLOT_WINDOW_S)
+        max_points = 2 * max(self.time_plot.width(), 100)
+        self.thrust_time_curve.setData(
+            *minmax_decimate(times[start:], buffers['thrust'].view()[start:], max_points)
+        )
+        self.current_time_curve.setData(
+            *minmax_decimate(times[start:], buffers['current'].view()[start:] * 10, max_points)
+        )
+        self.thrust_curve.setData(*minmax_decimate(
+            buffers['throttle'].view(), buffers['thrust'].view(), 2 * max(self.thrust_plot.width(), 100)
+        ))
+        if len(times) > 1:
+            self.time_plot.setXRange(times[-1] - PLOT_WINDOW_S, times[-1], padding=0)
+
+
+class MultiRigGUI(QMainWindow):
+    """Tabbed view of several rigs, with an overview table of all of them."""
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("DA ThrustBench multi-rig console")
+        self.setGeometry(0, 0, 1600, 1000)
+        self.manager = RigManager()
+        self.panels = {}
+        # Plot history spills here; recordings go to SESSION_ROOT
+        self.history_dir = tempfile.mkdtemp(prefix="thrustbench-")
+        self._rates = {}
+        self._last_poll = time.monotonic()
+
+        central = QWidget()
+        self.setCentralWidget(central)
+        layout = QVBoxLayout(central)
+
+        add_layout = QHBoxLayout()
+        self.port_combo = QComboBox()
+        # Editable so pyserial URLs such as sim://?rate=100 can be typed in
+        self.port_combo.setEditable(True)
+        self.port_combo.setFixedWidth(300)
+        self.refresh_ports()
+        self.protocol_combo = QComboBox()
+        self.protocol_combo.addItems(["text", "binary"])
+        add_button = QPushButton("Add rig")
+        add_button.clicked.connect(self.add_rig)
+        stop_all = QPushButton("STOP ALL")
+        stop_all.setStyleSheet("background-color: red; color: white; font-size: 16px; font-weight: 600;")
+        stop_all.clicked.connect(self.stop_all)
+        for widget in (self.port_combo, self.protocol_combo, add_button, stop_all):
+            add_layout.addWidget(widget)
+        add_layout.addStretch()
+        layout.addLayout(add_layout)
+
+        self.tabs = QTabWidget()
+        self.tabs.setTabsClosable(True)
+        self.tabs.tabCloseRequested.connect(self.remove_rig)
+        self.overview = QTableWidget(0, len(OVERVIEW_COLUMNS))
+        self.overview.setHorizontalHeaderLabels(OVERVIEW_COLUMNS)
+        self.tabs.addTab(self.overview, "Overview")
+        # The overview can't be closed
+        self.tabs.tabBar().setTabButton(0, self.tabs.tabBar().RightSide, None)
+        layout.addWidget(self.tabs)
+
+        self.data_timer = QTimer(self)
+        self.data_timer.timeout.connect(self.update_data)
+        self.data_timer.start(FRAME_INTERVAL_MS)
+        self.overview_timer = QTimer(self)
+        self.overview_timer.timeout.connect(self.update_overview)
+        self.overview_timer.start(1000)
+
+    def refresh_ports(self):
+        self.port_combo.clear()
+        self.port_combo.addItems([port.device for port in serial.tools.list_ports.comports()])
+
+    def add_rig(self):
+        port = self.port_combo.currentText().strip()
+        if not port:
+            return
+        name = f"rig{len(self.panels) + 1}"
+        while name in self.manager.rigs:
+            name += "'"
+        rig = self.manager.add(Rig(name, port, self.protocol_combo.currentText(), WARMUP_S,
+                                   PLOT_CAPACITY, os.path.join(self.history_dir, name)))
+        panel = RigPanel(self.manager, rig)
+        self.panels[name] = panel
+        self.tabs.addTab(panel, name)
+        self.manager.connect(name)
+
+    def remove_rig(self, index):
+        panel = self.tabs.widget(index)
+        if panel is self.overview:
+            return
+        self.tabs.removeTab(index)
+        del self.panels[panel.rig.name]
+        self.manager.remove(panel.rig.name)
+        panel.deleteLater()
+
+    def stop_all(self):
+        self.manager.broadcast(b"S\n")
+
+    def update_data(self):
+        received = self.manager.poll()
+        now = time.monotonic()
+        elapsed, self._last_poll = now - self._last_poll, now
+        for name, count in received.items():
+            # Smoothed sample rate for the overview
+            rate = count / elapsed if elapsed > 0 else 0.0
+            self._rates[name] = 0.9 * self._rates.get(name, rate) + 0.1 * rate
+            self.panels[name].update_view(count)
+
+    def update_overview(self):
+        rigs = list(self.manager.rigs.values())
+        self.overview.setRowCount(len(rigs))
+        for row, rig in enumerate(rigs):
+            cells = [rig.name, rig.port, rig.state if not rig.error else f"{rig.state}: {rig.error}",
+                     str(rig.samples), f"{self._rates.get(rig.name, 0.0):.0f}"]
+            for name, fmt in (('thrust', "{:.1f}"), ('current', "{:.2f}"),
+                              ('g_per_w', "{:.2f}"), ('object_temp', "{:.1f}")):
+                cells.append(fmt.format(rig.last[name]) if name in rig.last else "-")
+            for column, text in enumerate(cells):
+                self.overview.setItem(row, column, QTableWidgetItem(text))
+
+    def closeEvent(self, event):
+        self.data_timer.stop()
+        self.manager.close()
+        shutil.rmtree(self.history_dir, ignore_errors=True)
+        event.accept()
+
+
+def main():
+    app = QApplication(sys.argv)
+    gui = MultiRigGUI()
+    gui.show()
+    sys.exit(app.exec_())
+
+
+if __name__ == "__main__":
+    main()
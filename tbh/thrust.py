@@ -1,16 +1,37 @@
 from PyQt5.QtWidgets import (QApplication, QDialog, QLineEdit, QMessageBox,
                              QMainWindow, QVBoxLayout, QHBoxLayout,
-                             QWidget, QPushButton, QLabel, QComboBox)
+                             QWidget, QPushButton, QLabel, QComboBox, QSlider)
 import time
 import os
+import shutil
 import sys
-import serial
-import requests
-import pyqtgraph as pg
+import tempfile
 from PyQt5.QtGui import QPixmap, QFontDatabase, QFont
-import serial.tools.list_ports
 from PyQt5.QtCore import Qt, QTimer
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from tbcore.calibration import (CHANNELS as CALIBRATED, UNITS, Capture, Profile, load_profile,
+                                rig_key, save_profile)
+from tbcore.derived import DERIVED, LABELS, SUPPLY_VOLTAGE, Derive, ThrottleBins
+from tbcore.hotplug import PortWatcher
+from tbcore.lod import LodPyramid
+from tbcore.parser import FIELDS
+from tbcore.recorder import CHANNELS, SessionRecorder, new_session_path
+from tbcore.render import RenderScheduler, minmax_decimate
+from tbcore.ringbuffer import open_channels
+from tbcore.stats import StatsEngine
+from tbcore.sweep import SweepEngine, parse_profile
+
+FRAME_INTERVAL_MS = 33  # Poll the reader thread every frame
+RENDER_FPS = 30  # Upper bound on plot redraws per second
+WARMUP_S = 4  # ESC arming / load cell settling time after the first line
+PLOT_WINDOW_S = 10  # Seconds shown by the scrolling time plots
+PLOT_SPANS = {"10 s": 10, "1 min": 60, "10 min": 600, "1 h": 3600, "All": None}
+PLOT_CAPACITY = 36000  # Samples per channel kept in RAM (1 h at 10 Hz)
+SESSION_ROOT = os.path.join(os.path.expanduser("~"), "thrustbench_sessions")
+SWEEP_PROFILE = "10:100:10"  # Used when the speed box holds no profile
+REPLAY_SPEEDS = {"1×": 1.0, "2×": 2.0, "5×": 5.0, "10×": 10.0, "Max": 0.0}
+
 
 # class LoginDialog(QDialog):
 #     def __init__(self):
@@ -40,6 +61,7 @@ from PyQt5.QtCore import Qt, QTimer
 #         email = self.email_input.text()
 #         password = self.password_input.text()
 
+#         import requests  # imported here so it never slows down startup
 #         response = requests.post("http://127.0.0.1:8000/api/login/", data={"email": email, "password": password})
 
 #         if response.status_code == 200:
@@ -49,6 +71,140 @@ from PyQt5.QtCore import Qt, QTimer
 #             QMessageBox.warning(self, "Error", response.json().get("message"))
 
 
+class CalibrationDialog(QDialog):
+    """Guided zero / known-load calibration of the connected rig.
+
+    Points are captured from the live telemetry while the dialog is open
+    (ThrustbenchGUI feeds it every batch), refitted and saved to the rig's
+    profile straight away, and take effect on the next batch.
+    """
+
+    DEGREES = {"Linear": 1, "Quadratic": 2, "Cubic": 3}
+
+    def __init__(self, gui):
+        super().__init__(gui)
+        self.gui = gui
+        self.capture = None
+        self.setWindowTitle("Calibration")
+        layout = QVBoxLayout(self)
+
+        self.channel_combo = QComboBox()
+        for name in CALIBRATED:
+            self.channel_combo.addItem(f"{name.capitalize()} ({UNITS[name]})", name)
+        self.channel_combo.currentIndexChanged.connect(self.update_status)
+        layout.addWidget(self.channel_combo)
+
+        self.zero_button = QPushButton("Zero")
+        self.zero_button.setToolTip("Nothing on the load cell / motor stopped")
+        self.zero_button.clicked.connect(lambda: self.start_capture(0.0))
+        layout.addWidget(self.zero_button)
+
+        point_layout = QHBoxLayout()
+        self.reference_input = QLineEdit()
+        self.reference_input.setPlaceholderText("Known load")
+        self.reference_input.returnPressed.connect(self.capture_point)
+        self.point_button = QPushButton("Capture")
+        self.point_button.clicked.connect(self.capture_point)
+        point_layout.addWidget(self.reference_input)
+        point_layout.addWidget(self.point_button)
+        layout.addLayout(point_layout)
+
+        fit_layout = QHBoxLayout()
+        self.degree_combo = QComboBox()
+        self.degree_combo.addItems(self.DEGREES)
+        self.degree_combo.currentTextChanged.connect(self.refit)
+        self.reset_button = QPushButton("Reset")
+        self.reset_button.setToolTip("Back to the firmware's scaling")
+        self.reset_button.clicked.connect(self.reset)
+        fit_layout.addWidget(self.degree_combo)
+        fit_layout.addWidget(self.reset_button)
+        layout.addLayout(fit_layout)
+
+        self.status_label = QLabel()
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+        self.update_status()
+
+    def channel(self):
+        return self.channel_combo.currentData()
+
+    def capture_point(self):
+        try:
+            reference = float(self.reference_input.text())
+        except ValueError:
+            self.status_label.setText("Enter the known load as a number.")
+            return
+        self.start_capture(reference)
+
+    def start_capture(self, reference):
+        if not self.gui.reader:
+            self.status_label.setText("Connect to the thrust bench first.")
+            return
+        self.capture = Capture(self.channel(), reference)
+        self.set_capturing(True)
+        self.status_label.setText(f"Hold steady at {reference:g} {UNITS[self.channel()]}…")
+
+    def set_capturing(self, capturing):
+        for widget in (self.zero_button, self.point_button, self.channel_combo,
+                       self.degree_combo, self.reset_button):
+            widget.setEnabled(not capturing)
+
+    def add(self, batch):
+        """ Called by the GUI with every batch while a capture runs """
+        if not self.capture:
+            return
+        self.capture.add(batch)
+        if not self.capture.done:
+            self.status_label.setText(f"Capturing… {self.capture.progress:.0%}")
+            return
+        capture, self.capture = self.capture, None
+        self.set_capturing(False)
+        try:
+            raw = capture.result()[0]
+            profile = self.gui.calibration.copy()
+            profile.add_point(capture.channel, raw, capture.reference, self.degree())
+        except ValueError as e:
+            self.status_label.setText(f"Calibration failed: {e}")
+            return
+        self.gui.set_calibration(profile)
+        capture.model = profile.model(capture.channel)  # refitted with this point
+        unit = UNITS[capture.channel]
+        note = "" if capture.steady else (f"\nReading moved during capture (std {capture.std:.3g} {unit});"
+                                          " consider repeating.")
+        self.update_status(note=note)
+
+    def degree(self):
+        return self.DEGREES[self.degree_combo.currentText()]
+
+    def refit(self):
+        points = self.gui.calibration.points.get(self.channel())
+        if not points or len(points) < 2:
+            self.update_status()
+            return
+        profile = self.gui.calibration.copy()
+        profile.set_points(self.channel(), points, self.degree())
+        self.gui.set_calibration(profile)
+        self.update_status()
+
+    def reset(self):
+        profile = self.gui.calibration.copy()
+        profile.reset(self.channel())
+        self.gui.set_calibration(profile)
+        self.update_status()
+
+    def update_status(self, *args, note=""):
+        profile = self.gui.calibration
+        lines = [f"Rig: {profile.rig or 'not connected'}"]
+        for name in CALIBRATED:
+            lines.append(f"{name}: {profile.describe(name)}")
+        self.status_label.setText("\n".join(lines) + note)
+
+    def closeEvent(self, event):
+        self.capture = None
+        self.set_capturing(False)
+        event.accept()
+
+
 class ThrustbenchGUI(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -74,6 +230,15 @@ class ThrustbenchGUI(QMainWindow):
         custom_font = QFont(font_family, 16)  # Set font size to 18
 
         self.serial_port = None
+        self.reader = None
+        self.recorder = None
+        self.sweep = None
+        # Host-side calibration of the connected rig, see tbcore.calibration
+        self.calibration = Profile(None)
+        self.calibration_dialog = None
+        self.stats = StatsEngine(FIELDS + DERIVED, window_s=PLOT_WINDOW_S)
+        self.throttle_bins = ThrottleBins()
+        self.render_scheduler = RenderScheduler(RENDER_FPS)
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
         self.layout = QHBoxLayout(self.central_widget)
@@ -82,13 +247,23 @@ class ThrustbenchGUI(QMainWindow):
         self.layout.setStretch(0, 3)
         self.layout.setStretch(1, 7)
 
-        # Data storage for the temperature vs. time graph
-        self.time_data = []  # No fixed limit
-        self.temp_data = []
-        self.current_data = []
-        self.thrust_data = []
-        self.throttle_data = []
-        self.start_time = time.time()
+        # Data storage for the plots: fixed-size buffers in RAM, the full
+        # history spills to a temporary directory that goes away on close
+        # (SessionRecorder keeps what should outlive the window)
+        self.session_start = time.time()
+        self.history_dir = tempfile.mkdtemp(prefix="thrustbench-")
+        self.buffers = open_channels(
+            ['time', 'temp', 'current', 'thrust', 'throttle'] + list(DERIVED),
+            PLOT_CAPACITY, self.history_dir
+        )
+        self.time_data = self.buffers['time']
+        self.temp_data = self.buffers['temp']
+        self.current_data = self.buffers['current']
+        self.thrust_data = self.buffers['thrust']
+        self.throttle_data = self.buffers['throttle']
+        # Min/max/mean pyramid of the time plots, for spans longer than the
+        # buffers; on disk next to the spilled history, like the buffers
+        self.lod = LodPyramid(('temp', 'current'), path=self.history_dir)
 
         # variables
         left_panel_bg = "#ffd000"
@@ -112,9 +287,22 @@ class ThrustbenchGUI(QMainWindow):
         self.port_layout.setSpacing(0)
         self.port_layout.setContentsMargins(10, 0, 10, 0)
         self.port_combo = QComboBox()
-        self.refresh_ports()
+        # Editable so pyserial URLs such as sim://?rate=100 can be typed in
+        self.port_combo.setEditable(True)
+        # Lists the ports off the GUI thread, then keeps the list current as
+        # adapters are plugged in and out
+        self.port_watcher = PortWatcher()
+        self.port_watcher.start()
+        self.ports_listed = False
+        self.reader_state = None
+        self.gaps_shown = 0
         self.port_combo.setFixedSize(150, 30)
         self.port_combo.setStyleSheet("background-color: #fbb02d;")
+        # Telemetry format used on this connection
+        self.protocol_combo = QComboBox()
+        self.protocol_combo.addItems(["text", "binary"])
+        self.protocol_combo.setFixedSize(80, 30)
+        self.protocol_combo.setStyleSheet("background-color: #fbb02d;")
         self.connect_button = QPushButton("Connect")
         self.connect_button.setStyleSheet("background-color: #4CAF50; color: white; font-size: 18px;")
         self.connect_button.setFixedSize(80, 30)
@@ -127,6 +315,7 @@ class ThrustbenchGUI(QMainWindow):
         self.logo_label.setPixmap(self.logo_pixmap.scaled(180, 80, Qt.KeepAspectRatio))
         self.port_layout.addWidget(self.logo_label)
         self.port_layout.addWidget(self.port_combo)
+        self.port_layout.addWidget(self.protocol_combo)
         self.port_layout.addWidget(self.connect_button)
 
         # self.port_layout.setAlignment(Qt.AlignLeft)
@@ -165,10 +354,10 @@ class ThrustbenchGUI(QMainWindow):
         self.elapsed_time = 0  # To track frozen time when the motor stops
         self.is_motor_running = False  # Flag to track motor state
 
-        # Timer to update the motor data
+        # Timer to pull samples from the reader thread and repaint
         self.data_timer = QTimer(self)
         self.data_timer.timeout.connect(self.update_data)
-        self.data_timer.start(100)  # Update motor data every 100ms
+        self.data_timer.start(FRAME_INTERVAL_MS)
 
         # Timer to update the timer label
         self.display_timer = QTimer(self)
@@ -222,6 +411,18 @@ class ThrustbenchGUI(QMainWindow):
         self.h_layout.addLayout(self.throttle_layout)
         self.h_layout.addLayout(self.temp_layout)
 
+        # Live statistics of the displayed channels, refreshed every second
+        self.stats_scope_combo = QComboBox()
+        self.stats_scope_combo.addItems(["session", "step", "window"])
+        self.stats_scope_combo.setFixedSize(120, 30)
+        self.stats_scope_combo.setStyleSheet("background-color: #fbb02d;")
+        self.stats_scope_combo.currentTextChanged.connect(self.update_stats_display)
+        self.stats_label = QLabel()
+        self.stats_label.setFixedWidth(420)
+        self.stats_label.setStyleSheet("font-size: 13px; font-family: monospace; color: black;")
+        self.h_layout.addWidget(self.stats_scope_combo)
+        self.h_layout.addWidget(self.stats_label)
+
         self.bottom_layout_widget = QWidget()
         self.bottom_layout = QHBoxLayout()
 
@@ -241,6 +442,38 @@ class ThrustbenchGUI(QMainWindow):
         self.speed_input_layout.addWidget(self.speed_input)
         # Connect the returnPressed signal to handle Enter key
         self.speed_input.returnPressed.connect(self.handle_input_speed)
+
+        # Stream every sample of the connection to a session on disk
+        self.record_button = QPushButton("REC")
+        self.record_button.setFixedSize(120, 60)
+        self.record_button.setFont(custom_font)
+        self.record_button.setStyleSheet("background-color: #555555; color: white; font-size: 18px; font-weight: 500;")
+        self.record_button.clicked.connect(self.toggle_recording)
+        self.speed_input_layout.addWidget(self.record_button)
+
+        # Automated sweep; the speed box may hold a profile such as 20:80:10
+        self.sweep_button = QPushButton("SWEEP")
+        self.sweep_button.setFixedSize(120, 60)
+        self.sweep_button.setFont(custom_font)
+        self.sweep_button.setStyleSheet("background-color: #555555; color: white; font-size: 18px; font-weight: 500;")
+        self.sweep_button.clicked.connect(self.toggle_sweep)
+        self.speed_input_layout.addWidget(self.sweep_button)
+
+        # Zero and known-load calibration, no reflash or restart needed
+        self.calibrate_button = QPushButton("CAL")
+        self.calibrate_button.setFixedSize(120, 60)
+        self.calibrate_button.setFont(custom_font)
+        self.calibrate_button.setStyleSheet("background-color: #555555; color: white; font-size: 18px; font-weight: 500;")
+        self.calibrate_button.clicked.connect(self.show_calibration)
+        self.speed_input_layout.addWidget(self.calibrate_button)
+
+        # The per-throttle-bin means drawn on the thrust plot, as a table
+        self.bins_button = QPushButton("BINS")
+        self.bins_button.setFixedSize(120, 60)
+        self.bins_button.setFont(custom_font)
+        self.bins_button.setStyleSheet("background-color: #555555; color: white; font-size: 18px; font-weight: 500;")
+        self.bins_button.clicked.connect(self.save_bins)
+        self.speed_input_layout.addWidget(self.bins_button)
         
         # Motor speed control
         self.speed_display_widget = QWidget()
@@ -297,6 +530,58 @@ class ThrustbenchGUI(QMainWindow):
         self.plot_layout = QVBoxLayout()
         self.plot_layout.setContentsMargins(10, 5, 0, 5)
 
+        # How much history the time plots show
+        span_layout = QHBoxLayout()
+        self.span_combo = QComboBox()
+        self.span_combo.addItems(PLOT_SPANS)
+        self.span_combo.setFixedSize(100, 30)
+        self.span_combo.setStyleSheet("background-color: #fbb02d;")
+        self.span_combo.currentIndexChanged.connect(self.render_scheduler.request)
+        span_layout.addWidget(QLabel("Time span"))
+        span_layout.addWidget(self.span_combo)
+        span_layout.addStretch()
+        self.plot_layout.addLayout(span_layout)
+
+        # Play head of a replay:// session; hidden for live rigs
+        self.replay_widget = QWidget()
+        replay_layout = QHBoxLayout(self.replay_widget)
+        replay_layout.setContentsMargins(0, 0, 0, 0)
+        self.replay_slider = QSlider(Qt.Horizontal)
+        self.replay_slider.sliderReleased.connect(self.seek_replay)
+        self.replay_position = QLabel("0.0 s")
+        self.replay_speed_combo = QComboBox()
+        self.replay_speed_combo.addItems(REPLAY_SPEEDS)
+        self.replay_speed_combo.setStyleSheet("background-color: #fbb02d;")
+        self.replay_speed_combo.currentTextChanged.connect(self.change_replay_speed)
+        replay_layout.addWidget(self.replay_slider)
+        replay_layout.addWidget(self.replay_position)
+        replay_layout.addWidget(self.replay_speed_combo)
+        self.replay_widget.hide()
+        self.plot_layout.addWidget(self.replay_widget)
+        # The plots themselves are built by build_plots() once the window is up
+        self.plots_ready = False
+        self.main_layout.addLayout(self.plot_layout)
+
+        self.layout.addWidget(self.main_widget)
+
+        self.showMaximized()
+
+    @property
+    def startup_done(self):
+        return self.plots_ready and self.ports_listed
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.plots_ready:
+            # Once the first frame is on screen
+            QTimer.singleShot(0, self.build_plots)
+
+    def build_plots(self):
+        if self.plots_ready:
+            return
+        # pyqtgraph is the slowest import, so it waits until the window is shown
+        import pyqtgraph as pg
+
         # Create a plot widget for temperature vs. time
         self.temp_plot = pg.PlotWidget(title="Temperature vs Time")
         self.temp_plot.setLabel('left', 'Temperature (°C)')
@@ -304,7 +589,7 @@ class ThrustbenchGUI(QMainWindow):
         self.temp_plot.addLegend()
         self.temp_plot.setYRange(0, 100)
         self.temp_plot.setMouseEnabled(x=False, y=False)
-        self.temp_curve = self.temp_plot.plot(pen='r', name="Object Temp")
+        self.temp_curve = self.temp_plot.plot(pen='r', name="Object Temp", connect='finite')
 
         # Create a plot widget for current vs. time
         self.current_plot = pg.PlotWidget(title="Current vs Time")
@@ -315,35 +600,45 @@ class ThrustbenchGUI(QMainWindow):
         # Disable zooming
         self.current_plot.setMouseEnabled(x=False, y=False)
 
-        self.current_curve = self.current_plot.plot(pen='b', name="Current")
+        self.current_curve = self.current_plot.plot(pen='b', name="Current", connect='finite')
 
         # Plot for thrust vs. throttle
         self.thrust_plot = pg.PlotWidget(title="Thrust vs Throttle")
         self.thrust_plot.setLabel('left', 'Thrust (g)')
         self.thrust_plot.setLabel('bottom', 'Throttle (%)')
         self.thrust_plot.addLegend()
-        self.thrust_curve = self.thrust_plot.plot(pen='g', name="Thrust vs Throttle")
+        self.thrust_curve = self.thrust_plot.plot(pen='g', name="Thrust vs Throttle",
+                                                 connect='finite')
+        self.bins_curve = self.thrust_plot.plot(pen=pg.mkPen('k', width=2), name="Mean per 5 %")
+        # Channel shown against throttle: thrust or one of tbcore.derived
+        self.y_channel_combo = QComboBox()
+        for name in ('thrust',) + DERIVED:
+            self.y_channel_combo.addItem(LABELS[name], name)
+        self.y_channel_combo.setFixedSize(200, 30)
+        self.y_channel_combo.setStyleSheet("background-color: #fbb02d;")
+        self.y_channel_combo.currentIndexChanged.connect(self.change_y_channel)
+        self.sweep_curve = self.thrust_plot.plot(pen=None, symbol='o', symbolBrush='r',
+                                                 name="Sweep points")
 
         # Enable dynamic Y-axis range for thrust_plot
         self.thrust_plot.enableAutoRange(axis=pg.ViewBox.YAxis, enable=True)
 
         self.plot_layout.addWidget(self.temp_plot)
         self.plot_layout.addWidget(self.current_plot)
-        self.plot_layout.addWidget(self.thrust_plot)
-        self.main_layout.addLayout(self.plot_layout)
 
-        self.layout.addWidget(self.main_widget)
-
-        self.showMaximized()
-
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_data)
-        self.timer.start(100)  # Update every 100ms
+        # Both time plots scroll together, so one setXRange moves both
+        self.current_plot.setXLink(self.temp_plot)
+        self.plot_layout.addWidget(self.y_channel_combo)
+        self.plot_layout.addWidget(self.thrust_plot)
+        self.plots_ready = True
+        self.render_scheduler.request()
 
     def refresh_ports(self):
+        text = self.port_combo.currentText()
         self.port_combo.clear()
-        ports = [port.device for port in serial.tools.list_ports.comports()]
-        self.port_combo.addItems(ports)
+        self.port_combo.addItems([info.device for info in self.port_watcher.ports])
+        if text:
+            self.port_combo.setEditText(text)
 
     def handle_input_speed(self):
         try:
@@ -365,18 +660,38 @@ class ThrustbenchGUI(QMainWindow):
 
     def connect_serial(self):
         if self.serial_port:
-            self.serial_port.close()
+            if self.recorder:
+                self.toggle_recording()
+            self.reader.close()
+            self.reader = None
+            self.reader_state = None
             self.serial_port = None
             self.connect_button.setText("Connect")
             self.connect_button.setStyleSheet("background-color: green;")
             self.port_combo.setEnabled(True)
+            self.protocol_combo.setEnabled(True)
+            self.replay_widget.hide()
         else:
+            # pyserial and the reader are only needed from here on, so
+            # they stay out of the startup path (like pyqtgraph)
+            import serial
+            from tbcore.acquisition import open_reader
+
             try:
                 port = self.port_combo.currentText()
-                self.serial_port = serial.Serial(port, 57600, timeout=1)
+                self.calibration = load_profile(rig_key(port))
+                self.reader = open_reader(port, self.protocol_combo.currentText(), WARMUP_S,
+                                          derive=Derive(SUPPLY_VOLTAGE), calibration=self.calibration)
+                self.serial_port = self.reader.serial_port
+                self.reader_state = self.reader.state
+                self.gaps_shown = 0
                 self.connect_button.setText("Disconnect")
                 self.connect_button.setStyleSheet("background-color: red;")
                 self.port_combo.setEnabled(False)
+                self.protocol_combo.setEnabled(False)
+                self.show_replay_controls()
+                if self.calibration_dialog:
+                    self.calibration_dialog.update_status()
                 print(f"Connected to {port}")
             except serial.SerialException as e:
                 print(f"Error connecting to {port}: {e}")
@@ -384,33 +699,276 @@ class ThrustbenchGUI(QMainWindow):
     def set_motor_speed(self, value):
         if self.serial_port:
             command = f"{value}%\n"
-            self.serial_port.write(command.encode())
+            self.reader.write(command.encode())
             self.speed_display.setText(f"{(value)}%")
+            self.stats.set_step(value)
 
 
 
     def stop_motor(self):
+        if self.sweep and self.sweep.running:
+            self.sweep.abort()
+            self.finish_sweep()
         if self.serial_port:
             command = "S\n"
-            self.serial_port.write(command.encode())
+            self.reader.write(command.encode())
             self.speed_display.setText("0%")
+            self.stats.set_step(0)
             # Freeze the timer when the motor stops
             if self.is_motor_running:
                 self.elapsed_time += time.time() - self.start_time
                 self.is_motor_running = False
 
     def update_data(self):
-        if self.serial_port and self.serial_port.in_waiting:
-            try:
-                line = self.serial_port.readline().decode('utf-8', errors='replace').strip()
-                # print("line is read")
-                self.parse_data(line)
-                # print("parsing done")
-
+        self.update_ports()
+        if not self.reader:
+            return
+        # Gaps are noted before the batches that follow them are queued
+        gaps = self.reader.gaps[self.gaps_shown:]
+        batches = self.reader.drain()
+        for batch in batches:
+            while gaps and batch['time'][0] >= gaps[0][1]:
+                self.add_gap(gaps.pop(0)[0])
+            self.add_samples(batch)
+            if self.calibration_dialog:
+                self.calibration_dialog.add(batch)
+        if self.sweep and self.sweep.running:
+            self.update_sweep(batches)
+        if batches:
+            self.render_scheduler.request()
+        if self.render_scheduler.due(self.plots_visible()):
+            self.refresh_plots()
+            self.update_replay_position()
+
+    def plots_visible(self):
+        # Nothing to redraw behind a hidden or minimized window
+        return self.isVisible() and not self.isMinimized()
+
+    def add_samples(self, samples):
+        # Columns from tbcore.protocol, one array per telemetry field
+        times = samples['time'] - self.session_start
+        self.time_data.extend(times)
+        self.lod.add({'time': times, 'temp': samples['object_temp'], 'current': samples['current']})
+        self.temp_data.extend(samples['object_temp'])
+        self.current_data.extend(samples['current'])
+        self.throttle_data.extend(samples['throttle'])
+        self.thrust_data.extend(samples['thrust'])
+        for name in DERIVED:
+            self.buffers[name].extend(samples[name])
+        self.stats.add(samples)
+        self.throttle_bins.add(samples)
+
+        # Update displays with matching precision to Arduino output
+        self.thrust_display.setText(f"{samples['thrust'][-1]:.1f}")      # 1 decimal place
+        self.current_display.setText(f"{samples['current'][-1]:.2f}")    # 2 decimal places
+        self.temp_display.setText(f"{samples['object_temp'][-1]:.1f}")   # 1 decimal place
+        self.throttle_display.setText(f"{samples['rpm'][-1]:.0f}")
+
+    def add_gap(self, t):
+        # A NaN row breaks the time plots where the rig was unplugged
+        self.gaps_shown += 1
+        for name, buffer in self.buffers.items():
+            buffer.extend([t - self.session_start if name == 'time' else float('nan')])
+        self.lod.add_gap(t - self.session_start)
+
+    def update_ports(self):
+        events = self.port_watcher.drain()
+        for event, info in events:
+            print(f"Port {event}: {info.device}")
+        first_scan = not self.ports_listed and self.port_watcher.scanned.is_set()
+        if (events or first_scan) and self.port_combo.isEnabled():
+            self.refresh_ports()
+            self.ports_listed = True
+
+    def update_connection_state(self):
+        if not self.reader or self.reader.state == self.reader_state:
+            return
+        self.reader_state = self.reader.state
+        if self.reader_state == self.reader.RECONNECTING:
+            self.connect_button.setText("Reconnecting…")
+            self.connect_button.setStyleSheet("background-color: orange;")
+        elif self.reader_state == self.reader.FAILED:
+            self.connect_button.setText("Lost")
+            self.connect_button.setStyleSheet("background-color: grey;")
+        else:
+            self.connect_button.setText("Disconnect")
+            self.connect_button.setStyleSheet("background-color: red;")
+
+    def refresh_plots(self):
+        if not self.plots_ready:
+            self.render_scheduler.request()
+            return
+        # Only hand pyqtgraph about two points per horizontal pixel: the
+        # newest samples for short spans, the LOD pyramid level that
+        # matches the pixels for long ones
+        times = self.time_data.view()
+        span = PLOT_SPANS[self.span_combo.currentText()]
+        end = times[-1] if len(times) else 0.0
+        start = end - span if span else 0.0
+        max_points = 2 * max(self.temp_plot.width(), 100)
+        self.temp_curve.setData(
+            *self.lod.curve('temp', start, end, max_points, (times, self.temp_data.view()))
+        )
+        self.current_curve.setData(
+            *self.lod.curve('current', start, end, max_points, (times, self.current_data.view()))
+        )
+        y_channel = self.y_channel_combo.currentData()
+        self.thrust_curve.setData(*minmax_decimate(
+            self.throttle_data.view(), self.buffers[y_channel].view(),
+            2 * max(self.thrust_plot.width(), 100)
+        ))
+        self.bins_curve.setData(*self.throttle_bins.curve(y_channel))
+
+        # Dynamically adjust X-axis to scroll with time
+        if len(times) > 1:
+            self.temp_plot.setXRange(start, end, padding=0)
+
+    def replay(self):
+        # The SessionReplay behind a replay:// port, or None for a live rig
+        return getattr(self.reader.serial_port, 'replay', None) if self.reader else None
+
+    def show_replay_controls(self):
+        replay = self.replay()
+        if not replay:
+            return
+        self.replay_slider.setRange(0, int(replay.duration * 10))
+        speed = next((text for text, value in REPLAY_SPEEDS.items() if value == replay.speed), None)
+        if speed:
+            self.replay_speed_combo.setCurrentText(speed)
+        self.replay_widget.show()
+
+    def update_replay_position(self):
+        replay = self.replay()
+        if replay and not self.replay_slider.isSliderDown():
+            position = replay.position
+            self.replay_slider.setValue(int(position * 10))
+            self.replay_position.setText(f"{position:.1f} / {replay.duration:.1f} s")
+
+    def seek_replay(self):
+        replay = self.replay()
+        if replay:
+            replay.seek(self.replay_slider.value() / 10)
+
+    def change_replay_speed(self, text):
+        replay = self.replay()
+        if replay:
+            replay.set_speed(REPLAY_SPEEDS[text])
+
+    def change_y_channel(self):
+        self.thrust_plot.setTitle(f"{self.y_channel_combo.currentText()} vs Throttle")
+        self.thrust_plot.setLabel('left', self.y_channel_combo.currentText())
+        self.render_scheduler.request()
+
+    def toggle_sweep(self):
+        if self.sweep and self.sweep.running:
+            self.stop_motor()
+            return
+        if not self.serial_port:
+            print("Connect to the thrust bench before sweeping.")
+            return
+        text = self.speed_input.text()
+        try:
+            profile = parse_profile(text if (":" in text or "," in text) else SWEEP_PROFILE)
+        except ValueError as e:
+            print(f"Invalid sweep profile: {e}")
+            return
+        self.speed_input.clear()
+        self.sweep = SweepEngine(profile, self.reader.write)
+        self.sweep.start()
+        self.stats.set_step(self.sweep.throttle)
+        self.sweep_curve.setData([], [])
+        self.speed_display.setText(f"{self.sweep.throttle}%")
+        self.sweep_button.setText("SWEEP ●")
+        self.sweep_button.setStyleSheet("background-color: red; color: white; font-size: 18px; font-weight: 500;")
+        if not self.is_motor_running:
+            self.start_time = time.time()
+            self.is_motor_running = True
+            self.elapsed_time = 0
+
+    def update_sweep(self, batches):
+        # With no new data the engine still checks the step timeout
+        for batch in batches or [None]:
+            if self.sweep.update(batch):
+                self.sweep_curve.setData(*self.sweep.curve())
+                if self.sweep.running:
+                    self.speed_display.setText(f"{self.sweep.throttle}%")
+                    self.stats.set_step(self.sweep.throttle)
+        if self.sweep.done:
+            self.finish_sweep()
+            self.stop_motor()
+
+    def finish_sweep(self):
+        self.sweep_button.setText("SWEEP")
+        self.sweep_button.setStyleSheet("background-color: #555555; color: white; font-size: 18px; font-weight: 500;")
+        if self.sweep.points:
+            os.makedirs(SESSION_ROOT, exist_ok=True)
+            path = os.path.join(SESSION_ROOT, f"sweep-{time.strftime('%Y%m%d-%H%M%S')}.csv")
+            self.sweep.write_csv(path)
+            print(f"Sweep operating points saved to {path}")
+
+    def save_bins(self):
+        """ Write the per-throttle-bin means to a CSV next to the sessions """
+        if not len(self.throttle_bins.table()['throttle']):
+            print("No throttle bins to save yet")
+            return None
+        os.makedirs(SESSION_ROOT, exist_ok=True)
+        path = os.path.join(SESSION_ROOT, f"bins-{time.strftime('%Y%m%d-%H%M%S')}.csv")
+        self.throttle_bins.write_csv(path)
+        print(f"Throttle bins saved to {path}")
+        return path
+
+    def show_calibration(self):
+        if not self.calibration_dialog:
+            self.calibration_dialog = CalibrationDialog(self)
+        self.calibration_dialog.update_status()
+        self.calibration_dialog.show()
+        self.calibration_dialog.raise_()
+
+    def set_calibration(self, profile):
+        # Swapped whole: the reader thread picks it up with its next batch
+        self.calibration = profile
+        if self.reader:
+            self.reader.calibration = profile
+        if profile.rig:
+            print(f"Calibration saved to {save_profile(profile)}")
+
+    def toggle_recording(self):
+        if self.recorder:
+            self.reader.recorder = None
+            # The writer thread commits the last chunk in the background
+            self.recorder.close(wait=False)
+            print(f"Recording saved to {self.recorder.path}")
+            self.recorder = None
+            self.record_button.setText("REC")
+            self.record_button.setStyleSheet("background-color: #555555; color: white; font-size: 18px; font-weight: 500;")
+        elif self.reader:
+            self.recorder = SessionRecorder(
+                new_session_path(SESSION_ROOT), CHANNELS + DERIVED,
+                metadata={'port': self.port_combo.currentText(),
+                          'protocol': self.reader.decoder.name,
+                          'voltage': SUPPLY_VOLTAGE,
+                          'calibration': self.calibration.to_dict()},
+            )
+            self.reader.recorder = self.recorder
+            self.record_button.setText("REC ●")
+            self.record_button.setStyleSheet("background-color: red; color: white; font-size: 18px; font-weight: 500;")
+        else:
+            print("Connect to the thrust bench before recording.")
+
+    def closeEvent(self, event):
+        self.port_watcher.stop()
+        if self.reader:
+            self.reader.stop()
+        if self.recorder:
+            self.recorder.close()
+        if self.serial_port:
+            self.reader.serial_port.close()
+        for buffer in self.buffers.values():
+            buffer.close()
+        self.lod.close()
+        shutil.rmtree(self.history_dir, ignore_errors=True)
+        event.accept()
 
-            except Exception as e:
-                print(f"Error reading data: {e}")
-    
     def update_timer_display(self):
         # Only update the timer if the motor has been started
         if self.is_motor_running and self.start_time is not None:
@@ -424,60 +982,24 @@ class ThrustbenchGUI(QMainWindow):
         hours, rem = divmod(elapsed, 3600)
         minutes, seconds = divmod(rem, 60)
         self.timer_label.setText(f"{int(hours):02}:{int(minutes):02}:{int(seconds):02}")
+        self.update_stats_display()
+        self.update_connection_state()
+
+    def update_stats_display(self):
+        scope = self.stats_scope_combo.currentText()
+        lines = [f"{'':8}{'mean':>8}{'std':>7}{'min':>8}{'max':>8}"]
+        for name, label in (('thrust', "Thrust"), ('current', "Current"),
+                            ('rpm', "RPM"), ('object_temp', "Temp"),
+                            ('power', "Power"), ('g_per_w', "g/W")):
+            s = self.stats.query(name, scope)
+            lines.append(f"{label:8}{s['mean']:>8.1f}{s['std']:>7.1f}{s['min']:>8.1f}{s['max']:>8.1f}")
+        if scope != 'window':
+            s = self.stats.query('thrust', scope)
+            nan = float('nan')
+            lines.append(f"Thrust p50 {s.get('p50', nan):.1f}  p95 {s.get('p95', nan):.1f}")
+        self.stats_label.setText("\n".join(lines))
 
 
-    def parse_data(self, data):
-        try:
-            if data.startswith("Throttle:"):  # Note the colon here
-                parts = data.split(",")
-                if len(parts) >= 5:
-                    # Create a dictionary to store parsed values
-                    parsed = {}
-                    for part in parts:
-                        key, value = part.split(":")
-                        parsed[key.strip()] = value.strip()
-
-                    # Extract values with fallback
-                    throttle = float(parsed.get('Throttle', 0))
-                    rpm = int(parsed.get('RPM', 0))
-                    thrust = float(parsed.get('Thrust', 0))
-                    current = float(parsed.get('Current', 0))
-                    object_temp = float(parsed.get('ObjectTemp', 0))
-                    
-                    # Update displays with matching precision to Arduino output
-                    if self.thrust_display.text() == '0':
-                        time.sleep(4)
-                    
-                    self.thrust_display.setText(f"{thrust:.1f}")      # 1 decimal place
-                    self.current_display.setText(f"{current:.2f}")    # 2 decimal places
-                    self.temp_display.setText(f"{object_temp:.1f}")   # 1 decimal place
-                    self.throttle_display.setText(f"{rpm}")  # 1 decimal place
-
-                    # Calculate elapsed time
-                    current_time = time.time() - self.start_time
-                    self.time_data.append(current_time)
-
-                    # Append data for plots (already converted to float above)
-                    self.temp_data.append(object_temp)
-                    self.current_data.append(current)
-                    self.throttle_data.append(throttle)
-                    self.thrust_data.append(thrust)
-
-                    # Update plots
-                    self.temp_curve.setData(self.time_data, self.temp_data)
-                    self.current_curve.setData(self.time_data, self.current_data)
-                    self.thrust_curve.setData(self.throttle_data, self.thrust_data)
-
-                    # Dynamically adjust X-axis to scroll with time
-                    if len(self.time_data) > 1:
-                        self.temp_plot.setXRange(self.time_data[-1] - 10, self.time_data[-1], padding=0)
-                        self.current_plot.setXRange(self.time_data[-1] - 10, self.time_data[-1], padding=0)
-
-        except Exception as e:
-            print(f"Error parsing data: {e}")
-            # Optionally print the raw data for debugging
-            # print(f"Raw data: {data}")
-
 def main():
     app = QApplication(sys.argv)
     gui = ThrustbenchGUI()
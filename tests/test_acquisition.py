@@ -0,0 +1,136 @@
+import time
+
+import numpy as np
+import serial
+
+from tbcore.acquisition import RETRY_S, SerialReader, WarmupGate, merge_batches, open_reader
+
+
+def _drain_until(reader, rows, timeout=5.0):
+    batches = []
+    deadline = time.monotonic() + timeout
+    while sum(len(b['time']) for b in batches) < rows and time.monotonic() < deadline:
+        time.sleep(0.02)
+        batches += reader.drain()
+    return batches
+
+
+def test_reader_drains_every_line_of_a_fast_port():
+    reader = open_reader("sim://?rate=2000", reconnect_timeout=0)
+    try:
+        batches = _drain_until(reader, 1000)
+    finally:
+        reader.close()
+    merged = merge_batches(batches)
+    assert len(merged['thrust']) >= 1000
+    assert len(batches) < len(merged['thrust'])  # many lines per batch, not one per tick
+    assert reader.decoder.malformed == 0
+
+
+def test_merge_batches():
+    assert merge_batches([]) is None
+    one = {'time': np.arange(2.0)}
+    assert merge_batches([one]) is one
+    merged = merge_batches([one, {'time': np.arange(2.0, 5.0)}])
+    assert list(merged['time']) == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_warmup_discards_until_the_phase_ends():
+    clock = FakeClock()
+    gate = WarmupGate(4.0, clock=clock)
+    assert gate.filter([]) == [] and gate.state == WarmupGate.WAITING
+    assert gate.filter(['a']) == [] and gate.state == WarmupGate.WARMING_UP
+    clock.now = 3.0
+    assert gate.remaining() == 1.0
+    assert gate.filter(['b']) == []
+    clock.now = 4.0
+    assert gate.filter(['c']) == ['c'] and gate.state == WarmupGate.READY
+    assert gate.discarded == 2
+
+
+def test_warmup_can_hold_items_back():
+    clock = FakeClock()
+    gate = WarmupGate(1.0, keep=True, clock=clock)
+    gate.filter(['a'])
+    clock.now = 2.0
+    assert gate.filter([]) == ['a']  # released by a poll without data
+    gate.restart()
+    assert gate.state == WarmupGate.WAITING
+
+
+class FlakyPort:
+    """A port that is unplugged after `reads` reads."""
+
+    def __init__(self, port, reads):
+        self.port = port
+        self.reads = reads
+
+    @property
+    def in_waiting(self):
+        if not self.reads:
+            raise serial.SerialException("device disconnected")
+        self.reads -= 1
+        return self.port.in_waiting
+
+    def read(self, size):
+        return self.port.read(size)
+
+    def write(self, data):
+        return self.port.write(data)
+
+    def close(self):
+        self.port.close()
+
+
+class GapLog:
+    def __init__(self):
+        self.gaps = []
+
+    def mark_gap(self, t0, t1):
+        self.gaps.append((t0, t1))
+
+    def write(self, columns):
+        pass
+
+
+def test_reader_reopens_a_lost_port_and_records_the_gap():
+    reopened = []
+
+    def reopen():
+        if not reopened:
+            reopened.append(None)
+            raise serial.SerialException("not attached yet")
+        return serial.serial_for_url("sim://?rate=500", timeout=1)
+
+    recorder = GapLog()
+    first = FlakyPort(serial.serial_for_url("sim://?rate=500", timeout=1), reads=5)
+    reader = SerialReader(first, reopen=reopen, reconnect_timeout=5.0, recorder=recorder)
+    reader.start()
+    try:
+        deadline = time.monotonic() + 5.0
+        while not reader.gaps and time.monotonic() < deadline:
+            time.sleep(0.05)
+        batches = _drain_until(reader, 50)
+    finally:
+        reader.close()
+    assert reader.state == SerialReader.READING and reader.error is None
+    assert len(reader.gaps) == 1 and recorder.gaps == reader.gaps
+    t0, t1 = reader.gaps[0]
+    assert t1 - t0 >= RETRY_S  # one failed reopen first
+    assert batches[-1]['time'][-1] > t1
+
+
+def test_reader_gives_up_without_reopen():
+    reader = SerialReader(FlakyPort(serial.serial_for_url("sim://?rate=100", timeout=1), reads=0))
+    reader.start()
+    reader.join(2.0)
+    assert reader.state == SerialReader.FAILED
+    assert isinstance(reader.error, serial.SerialException)
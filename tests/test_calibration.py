@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from tbcore.calibration import Capture, Model, Profile, fit, load_profile, residuals, save_profile
+
+
+def test_one_point_moves_the_offset_and_keeps_the_gain():
+    model = fit([(10.0, 0.0)], base=Model([5.0, 2.0]))
+    assert model.gain == pytest.approx(2.0)
+    assert model(10.0) == pytest.approx(0.0)
+
+
+def test_two_points_fit_gain_and_offset():
+    model = fit([(100.0, 0.0), (600.0, 500.0)])
+    assert model.gain == pytest.approx(1.0)
+    assert model.offset == pytest.approx(-100.0)
+    assert residuals(model, [(100.0, 0.0), (600.0, 500.0)]) == pytest.approx([0.0, 0.0])
+
+
+def test_points_with_the_same_raw_reading_are_rejected():
+    with pytest.raises(ValueError):
+        fit([(5.0, 0.0), (5.0, 100.0)])
+    with pytest.raises(ValueError):
+        fit([])
+
+
+def test_higher_degree_is_limited_by_the_points():
+    model = fit([(0.0, 0.0), (1.0, 1.0), (2.0, 4.0)], degree=2)
+    assert model.degree == 2
+    assert model(3.0) == pytest.approx(9.0)
+    assert fit([(0.0, 0.0), (1.0, 2.0)], degree=3).degree == 1
+
+
+def test_profile_calibrates_in_place_and_keeps_raw_columns():
+    profile = Profile('rig', models={'thrust': Model([1.0, 2.0])})
+    columns = profile({'thrust': np.array([1.0, 2.0]), 'current': np.array([0.5])})
+    assert list(columns['thrust']) == [3.0, 5.0]
+    assert list(columns['thrust_raw']) == [1.0, 2.0]
+    assert list(columns['current']) == list(columns['current_raw']) == [0.5]
+
+
+def test_a_new_zero_replaces_earlier_zeros():
+    profile = Profile('rig')
+    profile.add_point('thrust', 100.0, 0.0)
+    profile.add_point('thrust', 600.0, 500.0)
+    profile.add_point('thrust', 110.0, 0.0)
+    assert profile.points['thrust'] == [(600.0, 500.0), (110.0, 0.0)]
+    assert profile.model('thrust')(110.0) == pytest.approx(0.0)
+    profile.reset('thrust')
+    assert profile.describe('thrust') == "firmware"
+
+
+def test_profile_round_trips_through_json(tmp_path):
+    profile = Profile('rig-1')
+    profile.add_point('current', 0.02, 0.0)
+    profile.add_point('current', 1.02, 2.0)
+    path = save_profile(profile, root=str(tmp_path))
+    assert path.endswith("rig-1.json")
+    loaded = load_profile('rig-1', root=str(tmp_path))
+    assert loaded.points == profile.points
+    assert loaded.model('current').coefficients == pytest.approx(profile.model('current').coefficients)
+    assert not load_profile('other', root=str(tmp_path)).models
+
+
+def test_capture_averages_the_raw_channel_over_its_duration():
+    capture = Capture('thrust', duration_s=1.0)
+    capture.add({'time': np.array([0.0, 0.5]), 'thrust': np.array([9.0, 9.0]),
+                 'thrust_raw': np.array([100.0, np.nan])})
+    assert capture.progress == pytest.approx(0.5)
+    assert not capture.done
+    capture.add({'time': np.array([0.9, 1.2]), 'thrust_raw': np.array([102.0, 500.0])})
+    assert capture.done
+    assert capture.progress == 1.0
+    mean, std, count = capture.result()
+    assert (mean, std, count) == (101.0, 1.0, 2)
+    assert capture.steady
+
+
+def test_capture_steadiness_is_judged_in_calibrated_units():
+    # HX711 counts: 20 counts of noise at 100 counts per g is 0.2 g, steady
+    capture = Capture('thrust', duration_s=1.0)
+    capture.add({'time': np.array([0.0, 0.5, 1.5]), 'thrust_raw': np.array([50000.0, 50040.0, 0.0])})
+    assert not capture.steady
+    capture.model = Model([-500.0, 0.01])
+    assert capture.std == pytest.approx(0.2)
+    assert capture.steady
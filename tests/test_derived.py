@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from tbcore.derived import Derive, ThrottleBins
+
+
+def batch(**columns):
+    return {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+
+
+def test_derive_adds_power_and_ratios():
+    columns = Derive(voltage=10.0)(batch(thrust=[200.0], current=[2.0], rpm=[10000.0]))
+    assert columns['power'][0] == pytest.approx(20.0)
+    assert columns['g_per_w'][0] == pytest.approx(10.0)
+    assert columns['g_per_a'][0] == pytest.approx(100.0)
+    assert columns['thrust_per_krpm2'][0] == pytest.approx(2.0)
+
+
+def test_ratios_are_nan_below_the_minimum_current_and_rpm():
+    columns = Derive()(batch(thrust=[5.0, 5.0], current=[0.0, 0.05], rpm=[0.0, 50.0]))
+    assert np.isnan(columns['g_per_w']).all()
+    assert np.isnan(columns['g_per_a']).all()
+    assert np.isnan(columns['thrust_per_krpm2']).all()
+
+
+def test_a_voltage_column_overrides_the_supply_voltage():
+    columns = Derive(voltage=12.0)(batch(thrust=[100.0], current=[1.0], rpm=[0.0], voltage=[16.0]))
+    assert columns['power'][0] == pytest.approx(16.0)
+
+
+def test_throttle_bins_average_per_bin():
+    bins = ThrottleBins(channels=('throttle', 'thrust'), width=10)
+    bins.add(batch(throttle=[10, 11, 9, 50, np.nan], thrust=[100, 110, 90, 500, 999]))
+    bins.add(batch(throttle=[50], thrust=[np.nan]))
+    table = bins.table()
+    assert list(table['throttle']) == [10.0, 50.0]
+    assert table['thrust'] == pytest.approx([100.0, 500.0])
+    throttle, thrust = bins.curve('thrust')
+    assert list(throttle) == [10.0, 50.0]
+    bins.reset()
+    assert not len(bins.table()['throttle'])
+
+
+def test_throttle_bins_write_csv(tmp_path):
+    bins = ThrottleBins(channels=('throttle', 'thrust'), width=10)
+    bins.add(batch(throttle=[20, 20], thrust=[1.0, 3.0]))
+    path = tmp_path / "bins.csv"
+    bins.write_csv(str(path))
+    assert path.read_text().splitlines() == ["throttle,thrust", "20.0,2.0"]
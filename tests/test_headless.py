@@ -0,0 +1,49 @@
+import csv
+import os
+import subprocess
+import sys
+
+import pytest
+
+from tbcore.headless import parse_program
+from tbcore.recorder import Session
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+
+def _headless(*args):
+    return subprocess.run([sys.executable, "-m", "tbcore.headless", *args, "--no-calibration"],
+                          cwd=ROOT, capture_output=True, text=True, timeout=60, check=True)
+
+
+def test_parse_program():
+    assert parse_program("20:30,40:2.5") == [(20, 30.0), (40, 2.5)]
+    with pytest.raises(ValueError):
+        parse_program("120:10")
+
+
+def test_program_then_replay_to_the_end(tmp_path):
+    _headless("sim://?rate=200", "--program", "30:3", "--warmup", "0", "--record", str(tmp_path))
+    (path,) = [os.path.join(tmp_path, name) for name in os.listdir(tmp_path)]
+    session = Session(path)
+    # The commanded throttle, not a SPEED_OPTIONS entry
+    assert session.columns['throttle'][-1] == 30
+    result = _headless(f"replay://{path}?speed=0", "--warmup", "0")
+    assert "End of replay" in result.stdout
+    (summary,) = [line.split() for line in result.stdout.splitlines() if line.split()[:1] == ["all"]]
+    assert int(summary[1]) == len(session)  # every recorded row played back
+
+
+def test_program_exports_throttle_bins(tmp_path):
+    path = tmp_path / "bins.csv"
+    result = _headless("sim://?rate=200", "--program", "10:2", "--warmup", "0",
+                       "--bins-csv", str(path))
+    assert f"Throttle bins written to {path}" in result.stdout
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    # The simulated ESC ramps up through the lower bins to 10 %
+    throttle = [float(row['throttle']) for row in rows]
+    thrust = [float(row['thrust']) for row in rows]
+    assert throttle[-1] == 10.0
+    assert thrust == sorted(thrust)
+    assert 'g_per_w' in rows[0]
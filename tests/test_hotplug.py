@@ -0,0 +1,38 @@
+import time
+
+from tbcore.hotplug import DeviceId, PortWatcher
+
+
+class Info:
+    def __init__(self, device, serial_number=None, vid=None, pid=None):
+        self.device = device
+        self.serial_number = serial_number
+        self.vid = vid
+        self.pid = pid
+
+
+def test_device_found_by_serial_number_under_a_new_name():
+    device = DeviceId.of("COM6", [Info("COM6", "A1", 0x2341, 0x0043)])
+    ports = [Info("COM3", "B2", 0x2341, 0x0043), Info("COM7", "A1", 0x2341, 0x0043)]
+    assert device.find(ports) == "COM7"
+
+
+def test_vid_pid_only_trusted_when_unambiguous():
+    device = DeviceId.of("COM6", [Info("COM6", vid=0x1A86, pid=0x7523)])
+    assert device.find([Info("COM8", vid=0x1A86, pid=0x7523)]) == "COM8"
+    assert device.find([Info("COM8", vid=0x1A86, pid=0x7523),
+                        Info("COM9", vid=0x1A86, pid=0x7523)]) is None
+    assert DeviceId.of("sim://", []) is None
+
+
+def test_watcher_reports_arrivals_and_removals():
+    scans = iter([[Info("COM1")], [Info("COM1"), Info("COM2")], [Info("COM2")]])
+    watcher = PortWatcher(interval=0.01, comports=lambda: next(scans, [Info("COM2")]))
+    watcher.start()
+    events = []
+    deadline = time.monotonic() + 5.0
+    while len(events) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+        events += [(event, info.device) for event, info in watcher.drain()]
+    watcher.stop()
+    assert events == [(PortWatcher.ADDED, "COM2"), (PortWatcher.REMOVED, "COM1")]
@@ -0,0 +1,137 @@
+import os
+import pty
+import time
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QSettings  # noqa: E402
+from PyQt5.QtWidgets import QApplication, QMessageBox  # noqa: E402
+
+from load.load import (CALIBRATION_FACTOR, DEFAULT_MODE, ScaleFilter, ScaleReader,  # noqa: E402
+                       WeightDisplayApp)
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # QSettings go to tmp_path, and warnings would block on a modal dialog
+    QSettings.setPath(QSettings.NativeFormat, QSettings.UserScope, str(tmp_path))
+    monkeypatch.setattr(QMessageBox, 'warning', lambda *args: None)
+    qapp = QApplication.instance() or QApplication([])
+    widgets = []
+
+    def make():
+        widgets.append(WeightDisplayApp())
+        return widgets[-1]
+
+    yield make
+    for widget in widgets:
+        widget.close()
+    qapp.processEvents()
+
+
+@pytest.mark.parametrize('kind, expected', [
+    ("None", 30.0), ("Moving average", 20.0), ("Median", 20.0), ("EMA", 22.5),
+])
+def test_filters(kind, expected):
+    scale_filter = ScaleFilter(kind, window=3, alpha=0.5, outlier_mads=0)
+    values = [scale_filter.add(v) for v in (10.0, 20.0, 30.0)]
+    assert values[-1] == pytest.approx(expected)
+
+
+def test_a_spike_is_rejected_even_when_the_reading_is_steady():
+    scale_filter = ScaleFilter(window=10, resolution=0.01)
+    for _ in range(6):
+        assert scale_filter.add(100.0) == 100.0
+    assert scale_filter.add(100.02) == 100.02  # within the noise floor
+    assert scale_filter.add(250.0) is None
+    assert scale_filter.add(100.0) == 100.0
+    assert scale_filter.rejected == 1
+
+
+def test_a_lasting_change_is_accepted_after_a_few_readings():
+    scale_filter = ScaleFilter("Median", window=10)
+    for value in (0.0, 1.0, -1.0, 0.0, 1.0):
+        scale_filter.add(value)
+    assert [scale_filter.add(500.0) for _ in range(3)] == [None, None, 500.0]
+    assert scale_filter.add(501.0) == 500.5  # the window started over at the step
+
+
+def test_tare_and_calibration_are_applied_and_remembered(app):
+    gui = app()
+    assert gui.mode_combobox.currentText() == DEFAULT_MODE
+    assert gui.factor == CALIBRATION_FACTOR
+    gui.add_readings([(0.0, 1000.0)])
+    gui.tare()
+    gui.add_readings([(0.5, 2000.0)])
+    gui.known_weight_input.setText("50")
+    gui.calibrate()
+    assert (gui.offset, gui.factor) == (1000.0, 20.0)
+    gui.add_readings([(1.0, 3000.0), (1.2, 1500.0)])
+    gui.refresh_display()
+    assert gui.weight_value.text() == "25.00 g"
+    assert gui.summary_label.text().startswith("Last 4 readings: min 0.00 g, max 100.00 g, mean 43.75 g")
+    assert "3 readings/s" in gui.summary_label.text()
+
+    # Kept per mode across runs
+    gui.mode_combobox.setCurrentText("Standard (9600 baud, g)")
+    assert (gui.offset, gui.factor) == (0.0, 1.0)
+    again = app()
+    assert (again.offset, again.factor) == (1000.0, 20.0)
+
+
+def test_calibration_needs_a_reading_and_a_weight(app):
+    gui = app()
+    gui.calibrate()
+    gui.add_readings([(0.0, 1000.0)])
+    gui.tare()
+    gui.known_weight_input.setText("50")
+    gui.calibrate()  # no change since the tare
+    assert (gui.offset, gui.factor) == (1000.0, CALIBRATION_FACTOR)
+
+
+def test_reader_parses_whole_lines_and_counts_malformed_ones():
+    reader = ScaleReader("unused")
+    assert reader.parse(b"Weight: 12.5 g\r\n-3") == [(pytest.approx(time.time(), abs=1), 12.5)]
+    batch = reader.parse(b"4\r\nRaw reading: 1400\r\nTaring complete.\r\n\xff\xfe\r\n.5\n\n")
+    assert [value for _, value in batch] == [-34.0, 0.5]
+    assert reader.malformed == 3
+
+
+def wait_until(qapp, condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        qapp.processEvents()
+        time.sleep(0.01)
+
+
+def test_reading_stops_and_restarts_on_its_thread(app):
+    master, slave = pty.openpty()
+    gui = app()
+    qapp = QApplication.instance()
+    gui.mode_combobox.setCurrentText("Standard (9600 baud, g)")
+    gui.port_combobox.addItem(os.ttyname(slave))
+    gui.port_combobox.setCurrentText(os.ttyname(slave))
+    try:
+        for weight in (12.5, 40.0):
+            gui.toggle_reading()
+            assert not gui.port_combobox.isEnabled()
+
+            def shown():
+                # Opening the port flushes its input, so keep sending until it's read
+                os.write(master, f"Weight: {weight} g\r\n".encode())
+                return gui.weight_value.text() == f"{weight:.2f} g"
+
+            wait_until(qapp, shown)
+            thread = gui.serial_thread
+            started = time.monotonic()
+            gui.toggle_reading()
+            assert time.monotonic() - started < 1.0
+            assert gui.serial_thread is None and not thread.isRunning()
+            assert gui.port_combobox.isEnabled()
+    finally:
+        gui.stop_reading()
+        os.close(master)
+        os.close(slave)
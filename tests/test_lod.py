@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from tbcore.lod import LodPyramid, build_lod, open_lod
+from tbcore.recorder import Session, SessionRecorder
+
+
+def _columns(n, t0=0.0):
+    times = t0 + np.arange(n) * 0.01
+    return {'time': times, 'temp': np.sin(times), 'current': np.cos(times)}
+
+
+def test_levels_summarize_blocks():
+    pyramid = LodPyramid(('temp',), factor=4, levels=2)
+    columns = _columns(100)
+    for lo in range(0, 100, 7):
+        pyramid.add({name: values[lo:lo + 7] for name, values in columns.items()})
+    level = pyramid.level(1)
+    assert pyramid.blocks(1) == 25 and pyramid.blocks(2) == 6
+    blocks = columns['temp'].reshape(25, 4)
+    assert np.allclose(level['temp']['min'], blocks.min(axis=1))
+    assert np.allclose(level['temp']['max'], blocks.max(axis=1))
+    assert np.allclose(level['temp']['mean'], blocks.mean(axis=1))
+
+
+def test_file_backed_pyramid_matches_memory(tmp_path):
+    memory = LodPyramid(('temp', 'current'))
+    files = LodPyramid(('temp', 'current'), path=str(tmp_path))
+    for lo in range(0, 20000, 1000):
+        batch = _columns(1000, lo * 0.01)
+        memory.add(batch)
+        files.add(batch)
+        for k in (1, 3):
+            assert np.array_equal(files.level(k)['temp']['max'], memory.level(k)['temp']['max'])
+    raw = _columns(20000)
+    args = ('current', 0.0, 200.0, 500, (raw['time'], raw['current']))
+    assert all(np.array_equal(a, b) for a, b in zip(files.curve(*args), memory.curve(*args)))
+    files.close()
+
+
+def test_curve_breaks_at_gaps():
+    pyramid = LodPyramid(('temp',))
+    raw = _columns(50000)
+    pyramid.add(raw)
+    pyramid.add_gap(123.4)
+    for max_points in (100, 100000):  # a pyramid level, then the raw samples
+        x, y = pyramid.curve('temp', 0.0, 500.0, max_points, (raw['time'], raw['temp']))
+        at = np.flatnonzero(np.isnan(y))
+        assert len(at) == 1 and x[at[0]] == pytest.approx(123.4)
+        assert np.all(np.diff(x) >= 0)
+
+
+def test_recorded_pyramid_and_gaps(tmp_path):
+    path = str(tmp_path / "session")
+    recorder = SessionRecorder(path, channels=('time', 'temp'))
+    recorder.write(_columns(3000))
+    recorder.mark_gap(30.0, 40.0)
+    recorder.write(_columns(3000, 40.0))
+    recorder.close(wait=True)
+    session = Session(path)
+    recorded = open_lod(session)
+    assert recorded.gaps == [30.0]
+    rebuilt = build_lod(session)
+    assert np.array_equal(recorded.level(2)['temp']['min'], rebuilt.level(2)['temp']['min'])
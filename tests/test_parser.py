@@ -0,0 +1,31 @@
+import math
+
+from tbcore.parser import FIELDS, parse_lines
+
+LINE = (b"Throttle50.00,RPM:5400,PulseCount:90,Thrust:812.4,Current:11.52,"
+        b"AmbientTemp:24.1,ObjectTemp:38.7\r\n")
+OTHER = b"Throttle:20.00,Thrust:100.0,RPM:2000,Current:2.50,AmbientTemp:24.0,ObjectTemp:30.0\r\n"
+
+
+def test_one_layout_in_one_pass():
+    batch = parse_lines(LINE * 3)
+    assert len(batch) == 3 and batch.malformed == 0
+    assert list(batch.columns['rpm']) == [5400.0] * 3
+    assert set(batch.columns) == set(FIELDS)
+
+
+def test_mixed_layouts_and_missing_fields():
+    batch = parse_lines(LINE + OTHER)
+    assert list(batch.columns['throttle']) == [50.0, 20.0]
+    assert math.isnan(batch.columns['pulse_count'][1])
+
+
+def test_damaged_lines_are_counted_not_parsed():
+    batch = parse_lines(LINE + b"Throttle50.00,RPM:54#0,Thrust:8\r\n" + b"Target speed: 30%\r\n" + LINE)
+    assert len(batch) == 2
+    assert batch.malformed == 1  # the status line isn't telemetry at all
+
+
+def test_no_telemetry():
+    batch = parse_lines(b"Thrustbench ready\r\n")
+    assert len(batch) == 0
@@ -0,0 +1,83 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from tbcore.planner import (AXES, BLOCK_DTYPE, MAX_SPEED, TOTAL_SLOTS, JobStream, WindingParams,
+                            plan_job)
+
+
+@pytest.fixture(scope='module')
+def plan():
+    return plan_job(WindingParams(coils_per_slot=5))
+
+
+def test_block_steps_add_up_to_every_segment(plan):
+    per_segment = np.zeros_like(plan.steps)
+    np.add.at(per_segment, plan.block_segment, plan.blocks['steps'].astype(np.int64))
+    assert np.array_equal(per_segment, plan.steps)
+    wind = np.abs(plan.blocks['steps'][:, 0].astype(np.int64)).sum()
+    assert wind == TOTAL_SLOTS * 5 * plan.params.steps_per_coil
+
+
+def test_blocks_keep_time_and_speed_limits(plan):
+    seconds = plan.blocks['duration_us'] / 1e6
+    assert seconds.sum() == pytest.approx(plan.duration, abs=1e-3)
+    for axis, steps in zip(AXES, np.abs(plan.blocks['steps'].astype(np.int64)).T):
+        # Whole steps per block: at most one step of rounding
+        assert np.all(steps <= MAX_SPEED[axis] * seconds + 1)
+
+
+def test_progress_and_chunks(plan):
+    start = plan.progress(0)
+    assert start.coils_done == 0
+    end = plan.progress(len(plan))
+    assert end.coils_done == end.coils_total == TOTAL_SLOTS * 5
+    assert end.remaining == pytest.approx(0.0, abs=1e-3)
+    data = b"".join(chunk for _, chunk in plan.chunks())
+    assert np.array_equal(np.frombuffer(data, dtype=BLOCK_DTYPE), plan.blocks)
+
+
+def test_limits_are_reported_or_rejected():
+    fast = plan_job(WindingParams(wind_speed=10000.0, coils_per_slot=1))
+    assert any("Winding speed" in problem for problem in fast.problems)
+    with pytest.raises(ValueError):
+        plan_job(WindingParams(coils_per_slot=0))
+    with pytest.raises(ValueError):
+        plan_job(WindingParams(slot_length=0.5))  # feed faster than the winding
+
+
+class FakeRunner:
+    """Controller with a block buffer that drains while the host waits."""
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.free = 0
+        self.queued = 0
+        self.commands = []
+        self.on_blocks = None
+
+    def submit(self, text, wait_done=False, payload=b""):
+        self.commands.append(text)
+        if text == "J":
+            self.free = self.capacity
+        elif text.startswith("Q,"):
+            count = int(text[2:])
+            assert len(payload) == count * BLOCK_DTYPE.itemsize
+            assert count <= self.free, "more blocks than the controller has room for"
+            self.free -= count
+            self.queued += count
+        future = asyncio.get_event_loop().create_future()
+        future.set_result([])
+        return future
+
+    async def wait_free(self, blocks):
+        self.free = self.capacity  # everything queued so far has run
+
+
+def test_stream_never_overfills_the_controller(plan):
+    runner = FakeRunner()
+    stream = JobStream(runner, plan)
+    asyncio.run(stream.run())
+    assert runner.commands[0] == "J" and runner.commands[-1] == "W"
+    assert runner.queued == stream.sent == len(plan)
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from tbcore.protocol import (FRAME_SIZE, BinaryDecoder, TextDecoder, crc16, crc16_rows,
+                             encode_frames, make_decoder)
+
+
+class FakeClock:
+    def __call__(self):
+        return 1000.0
+
+
+def _frames(seq, t_us=None):
+    seq = np.asarray(seq)
+    return encode_frames(seq, seq * 1000 if t_us is None else t_us, thrust=seq * 10.0,
+                         rpm=seq, current=1.5)
+
+
+def test_vectorized_crc_matches_crc16():
+    rows = np.random.default_rng(4).integers(0, 256, (50, FRAME_SIZE - 4), dtype=np.uint8)
+    assert list(crc16_rows(rows)) == [crc16(row.tobytes()) for row in rows]
+    assert crc16(b"123456789") == 0x29B1  # CRC-16/CCITT-FALSE check value
+
+
+def test_frames_decode_across_chunk_boundaries():
+    data = _frames(np.arange(100))
+    decoder = BinaryDecoder(clock=FakeClock())
+    thrust = []
+    for lo in range(0, len(data), 77):
+        columns = decoder.feed(data[lo:lo + 77])
+        thrust.extend(columns.get('thrust', []))
+    assert thrust == [float(s * 10) for s in range(100)]
+    assert decoder.lost_frames == 0 and decoder.skipped_bytes == 0
+
+
+def test_resync_after_garbage_and_corruption():
+    good = _frames(np.arange(10))
+    damaged = bytearray(_frames(np.arange(10, 20)))
+    damaged[5 * FRAME_SIZE + 10] ^= 0xFF  # breaks frame 15's CRC
+    decoder = BinaryDecoder(clock=FakeClock())
+    columns = decoder.feed(b"\x00\xa5junk" + good + bytes(damaged) + _frames(np.arange(20, 25)))
+    seq = list(columns['seq'])
+    assert seq == [s for s in range(25) if s != 15]
+    assert decoder.lost_frames == 1
+    assert decoder.skipped_bytes == 6 + FRAME_SIZE
+
+
+def test_device_time_unwraps_micros_overflow():
+    t_us = (np.arange(4) * 1_000_000 + 0xFFFFFFFF - 1_500_000) % 0x100000000
+    columns = BinaryDecoder(clock=FakeClock()).feed(_frames(np.arange(4), t_us))
+    assert np.allclose(np.diff(columns['time']), 1.0)
+
+
+def test_text_decoder_keeps_partial_lines():
+    line = (b"Throttle50.00,RPM:5400,PulseCount:90,Thrust:812.4,Current:11.52,"
+            b"AmbientTemp:24.1,ObjectTemp:38.7\r\n")
+    decoder = make_decoder('text', clock=FakeClock())
+    assert decoder.feed(line[:30]) == {}
+    columns = decoder.feed(line[30:] + line)
+    assert list(columns['thrust']) == [812.4, 812.4]
+    assert isinstance(decoder, TextDecoder)
+
+
+def test_make_decoder_passes_options_and_rejects_unknown_protocols():
+    decoder = make_decoder('binary', clock=FakeClock())
+    assert isinstance(decoder, BinaryDecoder)
+    assert decoder.feed(_frames([0]))['time'][0] == 1000.0
+    with pytest.raises(ValueError):
+        make_decoder('morse')
+
+
+class SteppingClock:
+    def __init__(self, *times):
+        self.times = list(times)
+
+    def __call__(self):
+        return self.times.pop(0)
+
+
+def test_text_lines_are_spread_over_the_time_since_the_previous_chunk():
+    line = (b"Throttle50.00,RPM:5400,PulseCount:90,Thrust:812.4,Current:11.52,"
+            b"AmbientTemp:24.1,ObjectTemp:38.7\r\n")
+    decoder = TextDecoder(clock=SteppingClock(10.0, 10.4, 30.0))
+    assert list(decoder.feed(line * 2)['time']) == [10.0, 10.0]  # nothing to spread over yet
+    assert decoder.feed(line * 4)['time'] == pytest.approx([10.1, 10.2, 10.3, 10.4])
+    # After a long silence only the last MAX_SPREAD_S is used
+    assert decoder.feed(line * 2)['time'] == pytest.approx([29.5, 30.0])
@@ -0,0 +1,56 @@
+import json
+import os
+
+import numpy as np
+
+from tbcore.recorder import Session, SessionRecorder, load_session, read_index
+
+
+def _record(path, batches, **kwargs):
+    recorder = SessionRecorder(path, channels=('time', 'thrust'), lod=False, **kwargs)
+    for batch in batches:
+        recorder.write(batch)
+    recorder.close(wait=True)
+    return recorder
+
+
+def _batches(rows, size, t0=0.0):
+    times = t0 + np.arange(rows) * 0.01
+    return [{'time': times[lo:lo + size], 'thrust': times[lo:lo + size] * 2}
+            for lo in range(0, rows, size)]
+
+
+def test_chunks_and_index_cover_every_row(tmp_path):
+    path = str(tmp_path)
+    recorder = _record(path, _batches(5000, 37), chunk_size=1000)
+    assert recorder.rows == 5000 and recorder.error is None
+    chunks = read_index(path)
+    assert [c['offset'] for c in chunks] == list(np.cumsum([0] + [c['count'] for c in chunks[:-1]]))
+    assert sum(c['count'] for c in chunks) == 5000
+    data = load_session(path)
+    assert np.array_equal(data['thrust'], data['time'] * 2)
+
+
+def test_missing_channels_are_recorded_as_nan(tmp_path):
+    _record(str(tmp_path), [{'time': np.arange(3.0)}])
+    assert np.isnan(load_session(str(tmp_path))['thrust']).all()
+
+
+def test_torn_index_line_is_ignored(tmp_path):
+    path = str(tmp_path)
+    _record(path, _batches(3000, 500), chunk_size=1000)
+    with open(os.path.join(path, 'chunks.jsonl'), 'a') as f:
+        f.write('{"offset": 3000, "cou')  # crash while appending the next chunk
+    assert len(Session(path)) == 3000
+
+
+def test_gaps_are_ordered_with_the_rows(tmp_path):
+    path = str(tmp_path)
+    recorder = SessionRecorder(path, channels=('time', 'thrust'), lod=False)
+    recorder.write(_batches(10, 10)[0])
+    recorder.mark_gap(5.0, 6.0)
+    recorder.write(_batches(10, 10, 6.0)[0])
+    recorder.close(wait=True)
+    with open(os.path.join(path, 'gaps.jsonl')) as f:
+        assert json.loads(f.readline()) == {'offset': 10, 't0': 5.0, 't1': 6.0}
+    assert Session(path).gaps[0]['offset'] == 10
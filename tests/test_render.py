@@ -0,0 +1,52 @@
+import numpy as np
+
+from tbcore.render import RenderScheduler, minmax_decimate
+
+
+def test_decimation_keeps_every_peak():
+    x = np.arange(100000.0)
+    y = np.zeros(100000)
+    y[12345], y[67890] = 50.0, -50.0
+    dx, dy = minmax_decimate(x, y, 1000)
+    assert len(dx) <= 1002
+    assert dy.max() == 50.0 and dy.min() == -50.0
+    assert np.all(np.diff(dx) >= 0)  # flat buckets give min and max at one sample
+
+
+def test_short_curves_pass_through():
+    x = np.arange(10.0)
+    dx, dy = minmax_decimate(x, x, 100)
+    assert dx is x and dy is x
+
+
+def test_nan_gaps_survive_decimation():
+    y = np.sin(np.arange(10000.0))
+    y[5000:5100] = np.nan
+    dx, dy = minmax_decimate(np.arange(10000.0), y, 400)
+    # An all-NaN bucket keeps a NaN, so connect='finite' curves still break
+    assert np.isnan(dy).any()
+    assert np.all((dx[np.isnan(dy)] >= 5000) & (dx[np.isnan(dy)] < 5100))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_scheduler_coalesces_requests():
+    clock = FakeClock()
+    scheduler = RenderScheduler(fps=10, clock=clock)
+    assert not scheduler.due()  # nothing to draw
+    for _ in range(5):
+        scheduler.request()
+    assert scheduler.due()
+    scheduler.request()
+    clock.now = 0.05
+    assert not scheduler.due()  # within the frame interval
+    assert not scheduler.due(visible=False)
+    clock.now = 0.1
+    assert scheduler.due()
+    assert scheduler.frames == 2
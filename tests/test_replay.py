@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+import serial
+
+import tbcore.acquisition  # noqa: F401  registers replay://
+from tbcore.parser import FIELDS
+from tbcore.protocol import BinaryDecoder, TextDecoder
+from tbcore.recorder import CHANNELS, SessionRecorder
+from tbcore.replay import SessionReplay
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def session(tmp_path):
+    path = str(tmp_path / "session")
+    recorder = SessionRecorder(path, CHANNELS, lod=False)
+    times = 1000.0 + np.arange(500) * 0.02  # 10 s at 50 Hz
+    columns = {name: np.full(500, 1.0) for name in FIELDS}
+    columns.update(time=times, thrust=np.round(np.arange(500) * 0.5, 1), throttle=np.full(500, 40.0))
+    recorder.write(columns)
+    recorder.close(wait=True)
+    return path
+
+
+def test_fast_replay_sends_every_row_as_telemetry(session):
+    replay = SessionReplay(session, speed=0)
+    decoder = TextDecoder()
+    thrust = []
+    while not replay.done:
+        thrust.extend(decoder.feed(replay.read_available()).get('thrust', []))
+    assert thrust == [round(i * 0.5, 1) for i in range(500)]
+
+
+def test_binary_replay_keeps_the_recorded_timing(session):
+    replay = SessionReplay(session, speed=0)
+    replay.write(b"B\n")
+    columns = BinaryDecoder().feed(replay.read_available())
+    assert np.allclose(np.diff(columns['time']), 0.02, atol=1e-5)
+
+
+def test_play_head_follows_the_clock_speed_and_seeks(session):
+    clock = FakeClock()
+    replay = SessionReplay(session, speed=2.0, start=1.0, clock=clock)
+    clock.now = 1.0
+    assert replay.position == pytest.approx(3.0)
+    replay.read_available()
+    assert replay.rows_sent == 101  # rows from 1.0 s to 3.0 s inclusive
+    replay.seek(9.0)
+    replay.set_speed(1.0)
+    clock.now = 5.0
+    assert replay.position == pytest.approx(13.0)
+    replay.read_available()
+    assert replay.done
+
+
+def test_looping_replay_starts_over(session):
+    replay = SessionReplay(session, speed=0, loop=True)
+    for _ in range(3):
+        replay.read_available()
+    assert replay.rows_sent == 3 * 500
+    assert not replay.done
+
+
+def test_replay_url_plays_the_session_through_pyserial(session):
+    port = serial.serial_for_url(f"replay://{session}?speed=0", timeout=0.1)
+    decoder = TextDecoder()
+    rows = 0
+    while not port.replay.done or port.in_waiting:
+        rows += len(decoder.feed(port.read(port.in_waiting or 1)).get('thrust', []))
+    port.close()
+    assert rows == 500
+
+
+def test_replay_url_errors(tmp_path):
+    with pytest.raises(serial.SerialException, match="Cannot replay"):
+        serial.serial_for_url(f"replay://{tmp_path}/missing")
+    with pytest.raises(serial.SerialException, match="unknown replay:// option"):
+        serial.serial_for_url(f"replay://{tmp_path}?sped=2")
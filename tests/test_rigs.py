@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from tbcore import rigs
+from tbcore.calibration import Profile
+from tbcore.recorder import Session
+from tbcore.rigs import PLOT_CHANNELS, Rig, RigManager
+
+
+@pytest.fixture(autouse=True)
+def no_saved_calibration(monkeypatch):
+    # Keep the tests away from the user's calibration directory
+    monkeypatch.setattr(rigs, 'load_profile', Profile)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.02)
+
+
+def test_rig_fills_its_buffers_and_records(tmp_path):
+    rig = Rig('a', "sim://?rate=500")
+    rig.connect()
+    assert rig.state == Rig.CONNECTED
+    recorder = rig.start_recording(str(tmp_path))
+    wait_for(lambda: rig.poll() >= 0 and rig.samples > 100)
+    assert len(rig.buffers['time']) == rig.samples
+    assert set(PLOT_CHANNELS) <= set(rig.last)
+    assert rig.stats.query('thrust')['count'] == rig.samples
+    rig.close()
+    assert rig.state == Rig.DISCONNECTED
+    assert len(Session(recorder.path)) > 0
+
+
+def test_failed_connect_is_reported_on_the_rig():
+    rig = Rig('bad', "/dev/does-not-exist")
+    with pytest.raises(Exception):
+        rig.connect()
+    assert rig.state == Rig.FAILED
+    assert rig.error is not None
+    assert rig.poll() == 0
+
+
+def test_manager_connects_and_polls_in_the_background():
+    manager = RigManager()
+    manager.add(Rig('a', "sim://?rate=200"))
+    manager.add(Rig('b', "sim://?rate=200"))
+    with pytest.raises(ValueError):
+        manager.add(Rig('a', "sim://?rate=200"))
+    manager.connect('a')
+    manager.connect('b')
+    totals = {'a': 0, 'b': 0}
+
+    def received():
+        for name, count in manager.poll().items():
+            totals[name] += count
+        return min(totals.values()) > 20
+
+    wait_for(received)
+    assert manager.rigs['a'].state == Rig.CONNECTED
+    manager.close()
+    assert not manager.rigs
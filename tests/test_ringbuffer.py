@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from tbcore.ringbuffer import RingBuffer, open_channels, window_start
+
+
+def test_keeps_the_newest_samples_in_order():
+    buffer = RingBuffer(5)
+    buffer.extend(np.arange(3.0))
+    assert list(buffer.view()) == [0.0, 1.0, 2.0]
+    buffer.extend(np.arange(3.0, 12.0))
+    buffer.append(12.0)
+    assert len(buffer) == 5
+    assert list(buffer.view()) == [8.0, 9.0, 10.0, 11.0, 12.0]
+    assert list(buffer.view(2)) == [11.0, 12.0]
+    assert buffer.last() == 12.0
+
+
+def test_view_is_read_only():
+    buffer = RingBuffer(4)
+    buffer.extend([1.0, 2.0])
+    with pytest.raises(ValueError):
+        buffer.view()[0] = 5.0
+
+
+def test_empty_buffer():
+    with pytest.raises(ValueError):
+        RingBuffer(0)
+    with pytest.raises(IndexError):
+        RingBuffer(3).last()
+
+
+def test_spilled_history_is_complete(tmp_path):
+    buffers = open_channels(['time'], 7, str(tmp_path))
+    values = np.arange(100.0)
+    for chunk in np.array_split(values, 13):
+        buffers['time'].extend(chunk)
+    assert np.array_equal(buffers['time'].history(), values)
+    buffers['time'].close()
+    assert np.array_equal(np.fromfile(tmp_path / "time.f8"), values)
+
+
+def test_window_start():
+    times = np.arange(0.0, 20.0, 0.5)
+    assert times[window_start(times, 5.0)] == pytest.approx(14.5)
+    assert window_start(np.empty(0), 5.0) == 0
@@ -0,0 +1,47 @@
+import time
+
+import numpy as np
+
+from tbcore.recorder import Session, SessionRecorder
+
+
+def _record(path, rows, chunk_size=1000):
+    recorder = SessionRecorder(path, channels=('time', 'thrust'), lod=False, chunk_size=chunk_size)
+    times = np.arange(rows) * 0.01
+    for lo in range(0, rows, 250):
+        recorder.write({'time': times[lo:lo + 250], 'thrust': times[lo:lo + 250] * 2})
+    recorder.close(wait=True)
+
+
+def test_session_time_index(tmp_path):
+    path = str(tmp_path)
+    _record(path, 10000)
+    session = Session(path)
+    times = np.asarray(session.columns['time'])
+    for t in (0.0, 12.345, 50.0, 99.99, 120.0):
+        for side in ('left', 'right'):
+            assert session.offset_at(t, side) == np.searchsorted(times, t, side)
+    window = session.window(10.0, 10.5)
+    assert window['time'][0] >= 10.0 - 1e-9 and window['time'][-1] <= 10.5
+    assert session.duration == times[-1] - times[0]
+
+
+def test_refresh_picks_up_chunks_committed_while_open(tmp_path):
+    path = str(tmp_path)
+    recorder = SessionRecorder(path, channels=('time', 'thrust'), lod=False, chunk_size=100)
+    recorder.write({'time': np.arange(100) * 0.01, 'thrust': np.zeros(100)})
+    _wait_for(lambda: recorder.rows == 100)
+    session = Session(path)
+    assert len(session) == 100
+    recorder.write({'time': 1.0 + np.arange(100) * 0.01, 'thrust': np.ones(100)})
+    recorder.close(wait=True)
+    assert len(session) == 100  # only what was committed when opened
+    session.refresh()
+    assert len(session) == 200
+    assert session.slice(99, 101)['thrust'].tolist() == [0.0, 1.0]
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
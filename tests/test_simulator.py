@@ -0,0 +1,80 @@
+import os
+import re
+
+import pytest
+
+from tbcore.protocol import BinaryDecoder, TextDecoder
+from tbcore.simulator import SPEED_OPTIONS, BenchSimulator
+
+
+FIRMWARE = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                        "thrustbench", "thrustbench.ino")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.parametrize('command, target', [
+    ("0", SPEED_OPTIONS[0]),
+    ("7", SPEED_OPTIONS[7]),
+    ("25%", 25),
+    ("100%", 100),
+    ("250%", 100),
+    ("-5%", 0),
+    ("abc%", 0),
+])
+def test_throttle_commands_follow_the_firmware(command, target):
+    sim = BenchSimulator(clock=FakeClock())
+    sim.target_speed = 50
+    sim.write(command.encode() + b"\n")
+    assert sim.target_speed == target
+
+
+def test_stop_and_invalid_commands_reply_like_the_firmware():
+    with open(FIRMWARE) as f:
+        firmware = f.read()
+    replies = [re.search(r'Serial\.println\("(%s[^"]*)"\)' % text, firmware).group(1)
+               for text in ("Stopping", "Invalid command")]
+    sim = BenchSimulator(clock=FakeClock())
+    sim.write(b"40%\nS\nX\n")
+    assert sim.target_speed == 0
+    output = sim.read_available().decode()
+    assert output.endswith("".join(f"{reply}\r\n" for reply in replies))
+
+
+def test_text_telemetry_at_the_sample_rate():
+    clock = FakeClock()
+    sim = BenchSimulator(rate_hz=200.0, clock=clock)
+    clock.now = 1.0
+    columns = TextDecoder(clock=clock).feed(sim.read_available())
+    assert len(columns['thrust']) == 200
+
+
+def test_binary_frames_decode_without_loss():
+    clock = FakeClock()
+    sim = BenchSimulator(rate_hz=1000.0, clock=clock)
+    sim.write(b"B\n80%\n")
+    sim.read_available()  # banner
+    decoder = BinaryDecoder(clock=clock)
+    total = 0
+    for _ in range(20):
+        clock.now += 0.05
+        total += len(decoder.feed(sim.read_available()).get('seq', ()))
+    assert total == sim.samples
+    assert decoder.lost_frames == 0 and decoder.skipped_bytes == 0
+
+
+def test_dropout_shows_up_as_lost_frames():
+    clock = FakeClock()
+    sim = BenchSimulator(rate_hz=1000.0, dropout=0.05, seed=3, clock=clock)
+    sim.write(b"B\n")
+    sim.read_available()
+    decoder = BinaryDecoder(clock=clock)
+    clock.now = 2.0
+    decoder.feed(sim.read_available())
+    assert decoder.lost_frames == sim.dropped > 0
@@ -0,0 +1,9 @@
+import subprocess
+import sys
+
+
+def test_dashboard_import_leaves_pyserial_for_later():
+    code = ("import sys, tbh.thrust; "
+            "print(sorted(m for m in ('serial', 'pyqtgraph', 'tbcore.acquisition') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,64 @@
+import math
+
+import numpy as np
+import pytest
+
+from tbcore.stats import QuantileSketch, RunningStats, SlidingStats, StatsEngine
+
+
+def test_running_stats_merges_batches_like_one_pass():
+    values = np.random.default_rng(1).normal(5.0, 2.0, 1000)
+    stats = RunningStats()
+    for batch in np.array_split(values, 7):
+        stats.add(batch)
+    assert stats.count == 1000
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.variance == pytest.approx(values.var(ddof=1))
+    assert (stats.min, stats.max) == (values.min(), values.max())
+
+
+def test_running_stats_ignores_nan():
+    stats = RunningStats()
+    stats.add([1.0, math.nan, 3.0])
+    assert stats.count == 2
+    assert stats.mean == 2.0
+
+
+def test_quantile_sketch_relative_accuracy():
+    values = np.random.default_rng(2).uniform(-50.0, 500.0, 20000)
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    sketch.add(values)
+    for p in (0.05, 0.5, 0.95):
+        exact = np.quantile(values, p)
+        assert sketch.quantile(p) == pytest.approx(exact, rel=0.02, abs=1.0)
+
+
+def test_sliding_stats_drops_old_blocks():
+    window = SlidingStats(('thrust',), window_s=10.0, blocks=10)
+    window.add({'time': np.arange(0.0, 10.0, 0.1), 'thrust': np.full(100, 1.0)})
+    window.add({'time': np.arange(20.0, 30.0, 0.1), 'thrust': np.full(100, 3.0)})
+    assert window.summary('thrust')['mean'] == pytest.approx(3.0)
+
+
+def test_engine_step_scope():
+    engine = StatsEngine(('thrust',))
+    engine.set_step(20)
+    engine.add({'time': np.arange(3.0), 'thrust': np.array([1.0, 2.0, 3.0])})
+    engine.set_step(40)
+    engine.add({'time': np.arange(3.0, 5.0), 'thrust': np.array([10.0, 10.0])})
+    assert engine.query('thrust', 'step', step=20)['mean'] == pytest.approx(2.0)
+    assert engine.query('thrust', 'step')['mean'] == pytest.approx(10.0)
+    assert engine.query('thrust')['count'] == 5
+
+
+def test_engine_step_scope_without_a_step_has_every_key():
+    engine = StatsEngine(('thrust',))
+    summary = engine.query('thrust', 'step')
+    assert set(summary) == set(engine.query('thrust', 'session'))
+    assert summary['count'] == 0
+    assert math.isnan(summary['p50']) and math.isnan(summary['p95'])
+
+
+def test_engine_unknown_scope():
+    with pytest.raises(ValueError):
+        StatsEngine(('thrust',)).query('thrust', 'forever')
@@ -0,0 +1,50 @@
+import asyncio
+import os
+
+import pytest
+import serial
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from stepper.stepper import StatorWinderDashboard  # noqa: E402
+from tbcore.winder import CommandFailed  # noqa: E402
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def window():
+    qapp = QApplication.instance() or QApplication([])
+    dashboard = StatorWinderDashboard()
+    yield dashboard
+    dashboard.close()
+    qapp.processEvents()
+
+
+@pytest.mark.parametrize('error, shown', [
+    (CommandFailed("Emergency stop"), "Winding: Emergency stop"),
+    (serial.SerialException("device disconnected"), "Winding: SerialException: device disconnected"),
+    (OSError(5, "I/O error"), "Winding: OSError: [Errno 5] I/O error"),
+])
+def test_a_failed_job_is_reported_and_the_controls_reset(window, loop, error, shown):
+    job = window.job = loop.create_future()
+    window.progress_label.setText("Waiting for the controller")
+    job.set_exception(error)
+    window.commandFinished(job, 'Winding')
+    assert window.statusBar().currentMessage() == shown
+    assert window.progress_label.text() == "Job stopped: " + shown.split(": ", 1)[1]
+    assert window.job is None
+
+
+def test_a_finished_command_is_reported(window, loop):
+    future = loop.create_future()
+    future.set_result(["DONE", "H"])
+    window.commandFinished(future, 'Homing')
+    assert window.statusBar().currentMessage() == "Homing: done"
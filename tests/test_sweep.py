@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from tbcore.parser import parse_lines
+from tbcore.simulator import BenchSimulator
+from tbcore.sweep import SteadyStateDetector, SweepEngine, parse_profile
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_parse_profile():
+    assert parse_profile("10:50:10") == [10, 20, 30, 40, 50]
+    assert parse_profile("50:10:-20") == [50, 30, 10]
+    assert parse_profile("20,35,50") == [20, 35, 50]
+    with pytest.raises(ValueError):
+        parse_profile("0:120:20")
+    with pytest.raises(ValueError):
+        parse_profile("10:50:0")
+
+
+def test_detector_settles_only_on_a_full_quiet_window():
+    detector = SteadyStateDetector(window_s=1.0)
+    times = np.arange(0.0, 0.5, 0.01)
+    flat = {'time': times, 'thrust': np.full(len(times), 500.0),
+            'rpm': np.full(len(times), 6000.0), 'current': np.full(len(times), 5.0)}
+    detector.add(flat)
+    assert not detector.settled()  # window not full yet
+    later = dict(flat, time=times + 0.5)
+    detector.add(later)
+    assert detector.settled()
+    ramp = dict(flat, time=times + 1.0, thrust=np.linspace(500.0, 900.0, len(times)))
+    detector.add(ramp)
+    assert not detector.settled()
+
+
+def test_sweep_commands_the_profile_throttle_on_the_bench():
+    clock = FakeClock()
+    sim = BenchSimulator(rate_hz=100.0, clock=clock)
+    engine = SweepEngine([25, 50, 100], sim.write, window_s=0.5, max_dwell_s=20.0, clock=clock)
+    engine.start()
+    while engine.running:
+        clock.now += 0.1
+        columns = parse_lines(sim.read_available()).columns
+        columns['time'] = np.linspace(clock.now - 0.1, clock.now, len(columns['thrust']))
+        point = engine.update(columns)
+        if point is not None:
+            assert point['settled']
+            assert point['throttle'] == pytest.approx(point['target'], abs=1.0)
+    assert [p['target'] for p in engine.points] == [25, 50, 100]
+    assert sim.target_speed == 0  # stopped at the end
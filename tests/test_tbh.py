@@ -0,0 +1,33 @@
+import csv
+import os
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+import tbh.thrust  # noqa: E402
+
+
+@pytest.fixture
+def gui(tmp_path, monkeypatch):
+    monkeypatch.setattr(tbh.thrust, 'SESSION_ROOT', str(tmp_path))
+    qapp = QApplication.instance() or QApplication([])
+    window = tbh.thrust.ThrustbenchGUI()
+    yield window
+    window.close()
+    qapp.processEvents()
+
+
+def test_bins_button_saves_the_throttle_bin_table(gui, tmp_path):
+    assert gui.save_bins() is None  # nothing binned yet
+    gui.throttle_bins.add({'throttle': np.array([20.0, 20.0, 40.0]),
+                           'thrust': np.array([100.0, 300.0, 500.0])})
+    gui.bins_button.click()
+    (name,) = os.listdir(tmp_path)
+    assert name.startswith("bins-") and name.endswith(".csv")
+    with open(tmp_path / name, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [(row['throttle'], row['thrust']) for row in rows] == [("20.0", "200.0"), ("40.0", "500.0")]
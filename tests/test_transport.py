@@ -0,0 +1,40 @@
+import asyncio
+
+from tbcore.transport import SerialTransport
+
+
+async def _round_trip():
+    transport = SerialTransport("loop://")
+    await transport.open()
+    transport.send(b"ACK,P\nPROGRESS,1")
+    transport.send(b",2\n")
+    first = await asyncio.wait_for(transport.readline(), 2.0)
+    second = await asyncio.wait_for(transport.readline(), 2.0)
+    port = transport.serial
+    transport.close_now()
+    rest = [line async for line in transport.lines()]
+    return first, second, rest, port.is_open, transport.state
+
+
+def test_lines_round_trip_and_synchronous_close():
+    first, second, rest, is_open, state = asyncio.run(_round_trip())
+    assert (first, second) == ("ACK,P", "PROGRESS,1,2")
+    assert rest == []  # lines() ends once closed
+    assert not is_open
+    assert state == SerialTransport.CLOSED
+
+
+async def _urgent_first():
+    transport = SerialTransport("loop://", settle_s=0.2)
+    await transport.open()
+    transport.send(b"queued\n")
+    await asyncio.sleep(0.3)
+    transport.send(b"later\n")
+    transport.send(b"E\n", urgent=True)
+    lines = [await asyncio.wait_for(transport.readline(), 2.0) for _ in range(3)]
+    await transport.close()
+    return lines
+
+
+def test_urgent_data_skips_the_queue():
+    assert asyncio.run(_urgent_first()) == ["queued", "E", "later"]
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from tbcore.winder import CommandFailed, JobRunner
+
+
+class FakeController:
+    """Transport whose controller answers each line with `replies(line)`."""
+
+    def __init__(self, replies=lambda line: [f"ACK,{line[:1]}"]):
+        self.replies = replies
+        self.written = []
+        self._lines = asyncio.Queue()
+
+    def feed(self, *lines):
+        for line in lines:
+            self._lines.put_nowait(line)
+
+    def send(self, data, urgent=False):
+        line = data.decode().strip()
+        self.written.append(line)
+        self.feed(*self.replies(line))
+
+    async def write(self, data):
+        self.send(data)
+
+    async def lines(self):
+        while True:
+            yield await self._lines.get()
+
+
+def run(test):
+    async def main():
+        controller = FakeController()
+        runner = JobRunner(controller, ack_timeout=0.05)
+        runner.start()
+        try:
+            return await test(controller, runner)
+        finally:
+            runner.close()
+    return asyncio.run(main())
+
+
+def test_commands_are_acknowledged_in_order():
+    async def test(controller, runner):
+        first, second = runner.submit("P,1,2"), runner.submit("H")
+        assert await first == ["ACK", "P"]
+        assert await second == ["ACK", "H"]
+        assert controller.written == ["P,1,2", "H"]
+        await asyncio.sleep(0)
+        assert runner.state == JobRunner.IDLE
+    run(test)
+
+
+def test_an_error_fails_the_command_and_everything_behind_it():
+    async def test(controller, runner):
+        controller.replies = lambda line: ["ERR,P,bad slot"] if line.startswith("P") else [f"ACK,{line[:1]}"]
+        first, second = runner.submit("P,99"), runner.submit("H")
+        with pytest.raises(CommandFailed, match="bad slot"):
+            await first
+        with pytest.raises(CommandFailed, match="P,99 failed"):
+            await second
+        assert controller.written == ["P,99"]
+    run(test)
+
+
+def test_unacknowledged_commands_are_retried_then_fail():
+    async def test(controller, runner):
+        controller.replies = lambda line: []
+        with pytest.raises(CommandFailed, match="no acknowledgement"):
+            await runner.submit("H", retries=2)
+        assert controller.written == ["H"] * 3
+    run(test)
+
+
+def test_long_commands_report_progress_until_done():
+    progress = []
+
+    async def test(controller, runner):
+        runner.on_progress = progress.append
+        controller.replies = lambda line: ["ACK,S", "PROGRESS,2,3,4,10,55.5", "DONE,S"]
+        assert await runner.submit("S", wait_done=True) == ["DONE", "S"]
+    run(test)
+    assert len(progress) == 1
+    assert progress[0].slot == 3 and progress[0].rate == 55.5
+    assert progress[0].coils_done == 24
+    assert progress[0].fraction == pytest.approx(24 / 120)
+
+
+def test_estop_drops_the_queue_but_not_later_commands():
+    states = []
+
+    async def test(controller, runner):
+        runner.on_state = states.append
+        controller.replies = lambda line: ["ESTOP"] if line == "E" else [f"ACK,{line[:1]}"]
+        winding = runner.submit("S", wait_done=True)  # acknowledged, never DONE
+        queued = runner.submit("H")
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(runner.estop(), 1.0)
+        for future in (winding, queued):
+            with pytest.raises(CommandFailed, match="Emergency stop"):
+                await future
+        assert runner.state == JobRunner.STOPPED
+        assert await runner.submit("P,1") == ["ACK", "P"]
+        assert controller.written == ["S", "E", "P,1"]
+    run(test)
+    assert states[:2] == [JobRunner.BUSY, JobRunner.STOPPED]
+
+
+def test_free_reports_update_the_block_count():
+    executed = []
+
+    async def test(controller, runner):
+        runner.on_blocks = executed.append
+        controller.feed("FREE,10,5", "FREE,oops")
+        await asyncio.sleep(0.01)
+        return runner.free, runner.executed
+    assert run(test) == (10, 5)
+    assert executed == [5]
@@ -6,6 +6,19 @@ from PyQt5.QtGui import QPixmap, QFontDatabase, QFont
 from PyQt5.QtCore import Qt, QTimer
 import pyqtgraph as pg
 import time
+import os
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from tbcore.acquisition import open_reader
+from tbcore.render import RenderScheduler, minmax_decimate
+from tbcore.ringbuffer import open_channels, window_start
+
+FRAME_INTERVAL_MS = 33  # Poll the reader thread every frame
+RENDER_FPS = 30  # Upper bound on plot redraws per second
+PLOT_WINDOW_S = 10  # Seconds shown by the scrolling time plots
+PLOT_CAPACITY = 36000  # Samples per channel kept in RAM (1 h at 10 Hz)
 
 class ThrustbenchGUI(QMainWindow):
     def __init__(self):
@@ -28,14 +41,20 @@ class ThrustbenchGUI(QMainWindow):
         self.showMaximized()
 
         self.serial_port = None
+        self.reader = None
+        self.render_scheduler = RenderScheduler(RENDER_FPS)
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
         self.layout = QVBoxLayout(self.central_widget)
 
-        # Data storage for the temperature vs. time graph
-        self.time_data = []  # No fixed limit
-        self.temp_data = []
+        # Data storage for the plots: fixed-size buffers in RAM, the full
+        # history spills to a temporary directory that goes away on close
         self.start_time = time.time()
+        self.history_dir = tempfile.mkdtemp(prefix="thrustbench-")
+        self.buffers = open_channels(['time', 'temp', 'current'], PLOT_CAPACITY, self.history_dir)
+        self.time_data = self.buffers['time']
+        self.temp_data = self.buffers['temp']
+        self.current_data = self.buffers['current']
 
         # COM port selection
         self.port_layout = QHBoxLayout()
@@ -153,6 +172,9 @@ class ThrustbenchGUI(QMainWindow):
 
         self.plot_layout.addWidget(self.temp_plot)
         self.plot_layout.addWidget(self.current_plot)
+
+        # Both time plots scroll together, so one setXRange moves both
+        self.current_plot.setXLink(self.temp_plot)
         self.layout.addLayout(self.plot_layout)
 
         # Motor speed control
@@ -187,7 +209,7 @@ class ThrustbenchGUI(QMainWindow):
 
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_data)
-        self.timer.start(100)  # Update every 100ms
+        self.timer.start(FRAME_INTERVAL_MS)
 
     def refresh_ports(self):
         self.port_combo.clear()
@@ -196,14 +218,16 @@ class ThrustbenchGUI(QMainWindow):
 
     def connect_serial(self):
         if self.serial_port:
-            self.serial_port.close()
+            self.reader.close()
+            self.reader = None
             self.serial_port = None
             self.connect_button.setText("Connect")
             self.port_combo.setEnabled(True)
         else:
             try:
                 port = self.port_combo.currentText()
-                self.serial_port = serial.Serial(port, 57600, timeout=1)
+                self.reader = open_reader(port)
+                self.serial_port = self.reader.serial_port
                 self.connect_button.setText("Disconnect")
                 self.port_combo.setEnabled(False)
                 print(f"Connected to {port}")
@@ -213,63 +237,73 @@ class ThrustbenchGUI(QMainWindow):
     def set_motor_speed(self, value):
         if self.serial_port:
             command = f"{value}\n"
-            self.serial_port.write(command.encode())
+            self.reader.write(command.encode())
             self.speed_label.setText(f"Motor Speed: {(value+1)*10}%")
 
     def stop_motor(self):
         if self.serial_port:
             command = "S\n"
-            self.serial_port.write(command.encode())
+            self.reader.write(command.encode())
             self.speed_label.setText("Motor Speed: 0%")
 
     def update_data(self):
-        if self.serial_port and self.serial_port.in_waiting:
-            try:
-                line = self.serial_port.readline().decode('utf-8', errors='replace').strip()
-                self.parse_data(line)
-            except Exception as e:
-                print(f"Error reading serial data: {e}")
-
-    def parse_data(self, data):
-        try:
-            if data.startswith("Throttle"):
-                parts = data.split(",")
-                if len(parts) >= 7:
-                    throttle = float(parts[0].split("Throttle")[1].strip())
-                    rpm = int(parts[1].split(":")[1].strip())
-                    pulse_count = int(parts[2].split(":")[1].strip())
-                    thrust = float(parts[3].split(":")[1].strip())
-                    current = float(parts[4].split(":")[1].strip())
-                    ambient_temp = float(parts[5].split(":")[1].strip())
-                    object_temp = float(parts[6].split(":")[1].strip())
-                    
-                    self.throttle_display.setText(str(throttle))
-                    self.rpm_display.setText(str(rpm))
-                    self.thrust_display.setText(str(thrust))
-                    self.current_display.setText(str(current))
-                    self.temp_display.setText(str(object_temp))
-
-                    # Calculate elapsed time
-                    current_time = time.time() - self.start_time
-                    self.time_data.append(current_time)
-
-                    # Append data for both temperature and current
-                    self.temp_data.append(object_temp)
-                    self.current_data.append(current)
-
-                    # Update the temperature vs time graph
-                    self.temp_curve.setData(self.time_data, self.temp_data)
-
-                    # Update the current vs time graph
-                    self.current_curve.setData(self.time_data, self.current_data)
-
-                    # Dynamically adjust X-axis to scroll with time
-                    if len(self.time_data) > 1:
-                        self.temp_plot.setXRange(self.time_data[-1] - 10, self.time_data[-1], padding=0)
-                        self.current_plot.setXRange(self.time_data[-1] - 10, self.time_data[-1], padding=0)
-
-        except Exception as e:
-            print(f"Error parsing data: {e}")
+        if not self.reader:
+            return
+        batches = self.reader.drain()
+        for batch in batches:
+            self.add_samples(batch)
+        if batches:
+            self.render_scheduler.request()
+        if self.render_scheduler.due(self.plots_visible()):
+            self.refresh_plots()
+
+    def plots_visible(self):
+        # Nothing to redraw behind a hidden or minimized window
+        return self.isVisible() and not self.isMinimized()
+
+    def add_samples(self, samples):
+        # Columns from tbcore.protocol, one array per telemetry field
+        self.throttle_display.setText(str(samples['throttle'][-1]))
+        self.rpm_display.setText(f"{samples['rpm'][-1]:.0f}")
+        self.thrust_display.setText(str(samples['thrust'][-1]))
+        self.current_display.setText(str(samples['current'][-1]))
+        self.temp_display.setText(str(samples['object_temp'][-1]))
+
+        # Append data for both temperature and current
+        self.time_data.extend(samples['time'] - self.start_time)
+        self.temp_data.extend(samples['object_temp'])
+        self.current_data.extend(samples['current'])
+
+    def refresh_plots(self):
+        # Only hand pyqtgraph the samples inside the scrolling window,
+        # decimated to about two points per horizontal pixel
+        times = self.time_data.view()
+        start = window_start(times, PLOT_WINDOW_S)
+        max_points = 2 * max(self.temp_plot.width(), 100)
+
+        # Update the temperature vs time graph
+        self.temp_curve.setData(
+            *minmax_decimate(times[start:], self.temp_data.view()[start:], max_points)
+        )
+
+        # Update the current vs time graph
+        self.current_curve.setData(
+            *minmax_decimate(times[start:], self.current_data.view()[start:], max_points)
+        )
+
+        # Dynamically adjust X-axis to scroll with time
+        if len(times) > 1:
+            self.temp_plot.setXRange(times[-1] - PLOT_WINDOW_S, times[-1], padding=0)
+
+    def closeEvent(self, event):
+        if self.reader:
+            self.reader.stop()
+        if self.serial_port:
+            self.reader.serial_port.close()
+        for buffer in self.buffers.values():
+            buffer.close()
+        shutil.rmtree(self.history_dir, ignore_errors=True)
+        event.accept()
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
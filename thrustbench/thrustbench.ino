@@ -4,6 +4,12 @@
 #include <Wire.h>
 #include <Adafruit_MLX90614.h>
 
+// 1: report uncalibrated readings (load cell counts after tare, current at
+// the sensor's nominal sensitivity) and leave zero, gain and offset to the
+// host's calibration profile (tbcore/calibration.py). Recalibrating is then
+// a few seconds in the dashboard instead of a reflash and restart.
+// 0: the built-in scale factor and startup current calibration below.
+#define HOST_CALIBRATION 0
 
 // Motor control
 const int ESC_PIN = 9;  // PWM pin for ESC control
@@ -52,6 +58,27 @@ unsigned int rpm = 0;
 
 float currentOffset = 0.0;
 
+// Telemetry output format. Text is the default; "B" switches to compact
+// binary frames, "A" back to ASCII lines. Must match tbcore/protocol.py.
+const uint8_t FRAME_SYNC_0 = 0xA5;
+const uint8_t FRAME_SYNC_1 = 0x5A;
+bool binaryTelemetry = false;
+uint16_t frameSeq = 0;
+
+struct __attribute__((packed)) TelemetryFrame {
+  uint8_t sync[2];
+  uint16_t seq;
+  uint32_t timeUs;
+  float throttle;
+  uint32_t rpm;
+  uint32_t pulseCount;
+  float thrust;
+  float current;
+  float ambientTemp;
+  float objectTemp;
+  uint16_t crc;
+};
+
 void setup() {
   Serial.begin(57600);
   while (!Serial) {
@@ -67,7 +94,11 @@ void setup() {
   Serial.println("Initializing the scale");
   scale.begin(LOADCELL_DOUT_PIN, LOADCELL_SCK_PIN);
   Serial.println("Scale begin complete");
+#if HOST_CALIBRATION
+  scale.set_scale(1.0);  // Raw counts; the host applies the gain
+#else
   scale.set_scale(-112.756);  // This value is obtained by calibrating the scale with known weights
+#endif
   Serial.println("Scale factor set");
 
   scale.tare();               // Reset the scale to 0
@@ -89,12 +120,14 @@ void setup() {
   Serial.println("0-9: Set motor speed (10% to 100%)");
   Serial.println("R: Read current motor speed");
   Serial.println("S: Stop motor");
+  Serial.println("B: Binary telemetry frames, A: ASCII telemetry lines");
 
   // Set up IR proximity sensor for RPM measurement
   pinMode(IR_SENSOR_PIN, INPUT_PULLUP);
 
   Serial.println("IR Sensor Test: Reading sensor state...");
 
+#if !HOST_CALIBRATION
   // Uncomment or add this line
   calibrateSensor();
   
@@ -102,6 +135,7 @@ void setup() {
   currentOffset = readCurrent();
   Serial.print("Current offset: ");
   Serial.println(currentOffset, 3);
+#endif
 }
 
 void calibrateSensor() {
@@ -155,9 +189,11 @@ void loop() {
     
     // Read current from Hall effect sensor and apply offset
     float current = readCurrent() - currentOffset;
+#if !HOST_CALIBRATION
     if (abs(current) < 0.1) {  // Adjust this threshold as needed
         current = 0;
     }
+#endif
     
     // Read temperatures from MLXC90214 sensor
     float ambientTemp = mlx.readAmbientTempC();
@@ -166,22 +202,26 @@ void loop() {
     float throttle = calculateThrottle(esc.readMicroseconds());
 
 
-    Serial.print("Throttle");
-    Serial.print(throttle);
-    // Print RPM, thrust, current, and temperatures
-    Serial.print(",RPM:");
-    Serial.print(rpm);
-    Serial.print(",PulseCount:");
-    Serial.print(pulseCount);
-    Serial.print(",Thrust:");
-    Serial.print(thrust, 1);  // Remove the "g" unit here
-    Serial.print(",Current:");
-    Serial.print(current, 2);
-    Serial.print(",AmbientTemp:");
-    Serial.print(ambientTemp, 1);
-    Serial.print(",ObjectTemp:");
-    Serial.print(objectTemp, 1);
-    Serial.println();  // Add a newline at the end
+    if (binaryTelemetry) {
+      sendTelemetryFrame(throttle, thrust, current, ambientTemp, objectTemp);
+    } else {
+      Serial.print("Throttle");
+      Serial.print(throttle);
+      // Print RPM, thrust, current, and temperatures
+      Serial.print(",RPM:");
+      Serial.print(rpm);
+      Serial.print(",PulseCount:");
+      Serial.print(pulseCount);
+      Serial.print(",Thrust:");
+      Serial.print(thrust, 1);  // Remove the "g" unit here
+      Serial.print(",Current:");
+      Serial.print(current, 2);
+      Serial.print(",AmbientTemp:");
+      Serial.print(ambientTemp, 1);
+      Serial.print(",ObjectTemp:");
+      Serial.print(objectTemp, 1);
+      Serial.println();  // Add a newline at the end
+    }
 
     // Reset pulse count and update last RPM time
     pulseCount = 0;
@@ -212,6 +252,37 @@ void loop() {
   }
 }
 
+// CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF)
+uint16_t crc16(const uint8_t *data, size_t length) {
+  uint16_t crc = 0xFFFF;
+  while (length--) {
+    crc ^= (uint16_t)(*data++) << 8;
+    for (uint8_t i = 0; i < 8; i++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+void sendTelemetryFrame(float throttle, float thrust, float current,
+                        float ambientTemp, float objectTemp) {
+  TelemetryFrame frame;
+  frame.sync[0] = FRAME_SYNC_0;
+  frame.sync[1] = FRAME_SYNC_1;
+  frame.seq = frameSeq++;
+  frame.timeUs = micros();
+  frame.throttle = throttle;
+  frame.rpm = rpm;
+  frame.pulseCount = pulseCount;
+  frame.thrust = thrust;
+  frame.current = current;
+  frame.ambientTemp = ambientTemp;
+  frame.objectTemp = objectTemp;
+  // CRC covers everything between the sync word and the CRC field
+  frame.crc = crc16((const uint8_t *)&frame + 2, sizeof(frame) - 4);
+  Serial.write((const uint8_t *)&frame, sizeof(frame));
+}
+
 float calculateThrottle(int pwmValue) {
   float throttle = map(pwmValue, PWM_MIN, PWM_MAX, 0, 100);
   return throttle;
@@ -230,7 +301,15 @@ unsigned int calculateRPM() {
 
 void processCommand(String command) {
   command.trim();
-  if (command.length() > 0) {
+  if (command.endsWith("%")) {
+    // "N%" sets the target speed directly (the dashboards and sweeps use
+    // this); a bare digit still picks from SPEED_OPTIONS
+    command.remove(command.length() - 1);
+    targetSpeed = constrain(command.toInt(), 0, 100);
+    Serial.print("Target speed: ");
+    Serial.print(targetSpeed);
+    Serial.println("%");
+  } else if (command.length() > 0) {
     char cmd = command.charAt(0);
     if (cmd >= '0' && cmd <= '9') {
       int index = cmd - '0';
@@ -246,8 +325,12 @@ void processCommand(String command) {
       Serial.println("%");
     } else if (cmd == 'S' || cmd == 's') {
       stopMotor();
+    } else if (cmd == 'B' || cmd == 'b') {
+      binaryTelemetry = true;
+    } else if (cmd == 'A' || cmd == 'a') {
+      binaryTelemetry = false;
     } else {
-      Serial.println("Invalid command. Use 0-9 to set speed, R to read current speed, or S to stop motor.");
+      Serial.println("Invalid command. Use 0-9 or N% to set speed, R to read current speed, S to stop motor, B/A for binary/ASCII telemetry.");
     }
   }
 }
@@ -9,7 +9,18 @@ from PyQt5.QtCore import Qt, QTimer
 import pyqtgraph as pg
 import time
 import os
-import requests
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from tbcore.acquisition import open_reader
+from tbcore.render import RenderScheduler, minmax_decimate
+from tbcore.ringbuffer import open_channels, window_start
+
+FRAME_INTERVAL_MS = 33  # Poll the reader thread every frame
+RENDER_FPS = 30  # Upper bound on plot redraws per second
+PLOT_WINDOW_S = 10  # Seconds shown by the scrolling time plots
+PLOT_CAPACITY = 36000  # Samples per channel kept in RAM (1 h at 10 Hz)
 
 
 class LoginDialog(QDialog):
@@ -40,6 +51,7 @@ class LoginDialog(QDialog):
         email = self.email_input.text()
         password = self.password_input.text()
 
+        import requests  # only the login needs it, so it isn't imported at startup
         response = requests.post("http://127.0.0.1:8000/api/login/", data={"email": email, "password": password})
 
         if response.status_code == 200:
@@ -74,6 +86,8 @@ class ThrustbenchGUI(QMainWindow):
         custom_font = QFont(font_family, 16)  # Set font size to 18
 
         self.serial_port = None
+        self.reader = None
+        self.render_scheduler = RenderScheduler(RENDER_FPS)
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
         self.layout = QHBoxLayout(self.central_widget)
@@ -82,13 +96,18 @@ class ThrustbenchGUI(QMainWindow):
         self.layout.setStretch(0, 3)
         self.layout.setStretch(1, 7)
 
-        # Data storage for the temperature vs. time graph
-        self.time_data = []  # No fixed limit
-        self.temp_data = []
-        self.current_data = []
-        self.thrust_data = []
-        self.throttle_data = []
-        self.start_time = time.time()
+        # Data storage for the plots: fixed-size buffers in RAM, the full
+        # history spills to a temporary directory that goes away on close
+        self.session_start = time.time()
+        self.history_dir = tempfile.mkdtemp(prefix="thrustbench-")
+        self.buffers = open_channels(
+            ['time', 'temp', 'current', 'thrust', 'throttle'], PLOT_CAPACITY, self.history_dir
+        )
+        self.time_data = self.buffers['time']
+        self.temp_data = self.buffers['temp']
+        self.current_data = self.buffers['current']
+        self.thrust_data = self.buffers['thrust']
+        self.throttle_data = self.buffers['throttle']
 
         # variables
         left_panel_bg = "#ffd000"
@@ -165,10 +184,10 @@ class ThrustbenchGUI(QMainWindow):
         self.elapsed_time = 0  # To track frozen time when the motor stops
         self.is_motor_running = False  # Flag to track motor state
 
-        # Timer to update the motor data
+        # Timer to pull samples from the reader thread and repaint
         self.data_timer = QTimer(self)
         self.data_timer.timeout.connect(self.update_data)
-        self.data_timer.start(100)  # Update motor data every 100ms
+        self.data_timer.start(FRAME_INTERVAL_MS)
 
         # Timer to update the timer label
         self.display_timer = QTimer(self)
@@ -329,6 +348,9 @@ class ThrustbenchGUI(QMainWindow):
 
         self.plot_layout.addWidget(self.temp_plot)
         self.plot_layout.addWidget(self.current_plot)
+
+        # Both time plots scroll together, so one setXRange moves both
+        self.current_plot.setXLink(self.temp_plot)
         self.plot_layout.addWidget(self.thrust_plot)
         self.main_layout.addLayout(self.plot_layout)
 
@@ -336,10 +358,6 @@ class ThrustbenchGUI(QMainWindow):
 
         self.showMaximized()
 
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_data)
-        self.timer.start(100)  # Update every 100ms
-
     def refresh_ports(self):
         self.port_combo.clear()
         ports = [port.device for port in serial.tools.list_ports.comports()]
@@ -365,7 +383,8 @@ class ThrustbenchGUI(QMainWindow):
 
     def connect_serial(self):
         if self.serial_port:
-            self.serial_port.close()
+            self.reader.close()
+            self.reader = None
             self.serial_port = None
             self.connect_button.setText("Connect")
             self.connect_button.setStyleSheet("background-color: green;")
@@ -373,7 +392,8 @@ class ThrustbenchGUI(QMainWindow):
         else:
             try:
                 port = self.port_combo.currentText()
-                self.serial_port = serial.Serial(port, 57600, timeout=1)
+                self.reader = open_reader(port)
+                self.serial_port = self.reader.serial_port
                 self.connect_button.setText("Disconnect")
                 self.connect_button.setStyleSheet("background-color: red;")
                 self.port_combo.setEnabled(False)
@@ -384,7 +404,7 @@ class ThrustbenchGUI(QMainWindow):
     def set_motor_speed(self, value):
         if self.serial_port:
             command = f"{value}%\n"
-            self.serial_port.write(command.encode())
+            self.reader.write(command.encode())
             self.speed_display.setText(f"{(value)}%")
 
 
@@ -392,7 +412,7 @@ class ThrustbenchGUI(QMainWindow):
     def stop_motor(self):
         if self.serial_port:
             command = "S\n"
-            self.serial_port.write(command.encode())
+            self.reader.write(command.encode())
             self.speed_display.setText("0%")
             # Freeze the timer when the motor stops
             if self.is_motor_running:
@@ -400,17 +420,64 @@ class ThrustbenchGUI(QMainWindow):
                 self.is_motor_running = False
 
     def update_data(self):
-        if self.serial_port and self.serial_port.in_waiting:
-            try:
-                line = self.serial_port.readline().decode('utf-8', errors='replace').strip()
-                # print("line is read")
-                self.parse_data(line)
-                # print("parsing done")
-
+        if not self.reader:
+            return
+        batches = self.reader.drain()
+        for batch in batches:
+            self.add_samples(batch)
+        if batches:
+            self.render_scheduler.request()
+        if self.render_scheduler.due(self.plots_visible()):
+            self.refresh_plots()
+
+    def plots_visible(self):
+        # Nothing to redraw behind a hidden or minimized window
+        return self.isVisible() and not self.isMinimized()
+
+    def add_samples(self, samples):
+        # Columns from tbcore.protocol, one array per telemetry field
+        self.time_data.extend(samples['time'] - self.session_start)
+        self.temp_data.extend(samples['object_temp'])
+        self.current_data.extend(samples['current'])
+        self.throttle_data.extend(samples['throttle'])
+        self.thrust_data.extend(samples['thrust'])
+
+        # Update displays with matching precision to Arduino output
+        self.throttle_display.setText(f"{samples['throttle'][-1]:.1f}")  # 1 decimal place
+        self.thrust_display.setText(f"{samples['thrust'][-1]:.1f}")      # 1 decimal place
+        self.current_display.setText(f"{samples['current'][-1]:.2f}")    # 2 decimal places
+        self.temp_display.setText(f"{samples['object_temp'][-1]:.1f}")   # 1 decimal place
+
+    def refresh_plots(self):
+        # Only hand pyqtgraph the samples inside the scrolling window,
+        # decimated to about two points per horizontal pixel
+        times = self.time_data.view()
+        start = window_start(times, PLOT_WINDOW_S)
+        max_points = 2 * max(self.temp_plot.width(), 100)
+        self.temp_curve.setData(
+            *minmax_decimate(times[start:], self.temp_data.view()[start:], max_points)
+        )
+        self.current_curve.setData(
+            *minmax_decimate(times[start:], self.current_data.view()[start:], max_points)
+        )
+        self.thrust_curve.setData(*minmax_decimate(
+            self.throttle_data.view(), self.thrust_data.view(), 2 * max(self.thrust_plot.width(), 100)
+        ))
+
+        # Dynamically adjust X-axis to scroll with time
+        if len(times) > 1:
+            self.temp_plot.setXRange(times[-1] - PLOT_WINDOW_S, times[-1], padding=0)
+
+    def closeEvent(self, event):
+        if self.reader:
+            self.reader.stop()
+        if self.serial_port:
+            self.reader.serial_port.close()
+        for buffer in self.buffers.values():
+            buffer.close()
+        shutil.rmtree(self.history_dir, ignore_errors=True)
+        event.accept()
 
-            except Exception as e:
-                print(f"Error reading data: {e}")
-    
     def update_timer_display(self):
         # Only update the timer if the motor has been started
         if self.is_motor_running and self.start_time is not None:
@@ -426,50 +493,6 @@ class ThrustbenchGUI(QMainWindow):
         self.timer_label.setText(f"{int(hours):02}:{int(minutes):02}:{int(seconds):02}")
 
 
-    def parse_data(self, data):
-        try:
-            if data.startswith("Throttle:"):  # Note the colon here
-                parts = data.split(",")
-                if len(parts) >= 6:
-                    # Parse each part using exact Arduino format
-                    throttle = float(parts[0].split("Throttle:")[1].strip())
-                    thrust = float(parts[1].split("Thrust:")[1].strip())
-                    rpm = int(parts[2].split("RPM:")[1].strip())
-                    current = float(parts[3].split("Current:")[1].strip())
-                    ambient_temp = float(parts[4].split("AmbientTemp:")[1].strip())
-                    object_temp = float(parts[5].split("ObjectTemp:")[1].strip())
-                    
-                    # Update displays with matching precision to Arduino output
-                    self.throttle_display.setText(f"{throttle:.1f}")  # 1 decimal place
-                    self.thrust_display.setText(f"{thrust:.1f}")      # 1 decimal place
-                    self.current_display.setText(f"{current:.2f}")    # 2 decimal places
-                    self.temp_display.setText(f"{object_temp:.1f}")   # 1 decimal place
-
-                    # Calculate elapsed time
-                    current_time = time.time() - self.start_time
-                    self.time_data.append(current_time)
-
-                    # Append data for plots (already converted to float above)
-                    self.temp_data.append(object_temp)
-                    self.current_data.append(current)
-                    self.throttle_data.append(throttle)
-                    self.thrust_data.append(thrust)
-
-                    # Update plots
-                    self.temp_curve.setData(self.time_data, self.temp_data)
-                    self.current_curve.setData(self.time_data, self.current_data)
-                    self.thrust_curve.setData(self.throttle_data, self.thrust_data)
-
-                    # Dynamically adjust X-axis to scroll with time
-                    if len(self.time_data) > 1:
-                        self.temp_plot.setXRange(self.time_data[-1] - 10, self.time_data[-1], padding=0)
-                        self.current_plot.setXRange(self.time_data[-1] - 10, self.time_data[-1], padding=0)
-
-        except Exception as e:
-            print(f"Error parsing data: {e}")
-            # Optionally print the raw data for debugging
-            # print(f"Raw data: {data}")
-
 def main():
     app = QApplication(sys.argv)
 
@@ -3,7 +3,7 @@
 
 a = Analysis(
     ['thrust.py'],
-    pathex=[],
+    pathex=['..'],
     binaries=[],
     datas=[('logo.png', '.'), ('Orbitron-Regular.ttf', '.')],
     hiddenimports=[],
@@ -16,19 +16,19 @@ a = Analysis(
 )
 pyz = PYZ(a.pure)
 
+# One-folder build: the one-file exe unpacked every module and Qt plugin
+# to a temp directory on each launch, which dominated startup. Ship the
+# dist/thrust folder instead; nothing is extracted at run time.
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='thrust',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -36,3 +36,12 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='thrust',
+)
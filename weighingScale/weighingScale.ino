@@ -4,9 +4,20 @@
 #define LOADCELL_DOUT_PIN  4
 #define LOADCELL_SCK_PIN   5
 
+// 1: stream every raw HX711 conversion at 115200 baud, as fast as the
+// HX711 converts (10 or 80 samples/s depending on its RATE pin). Tare,
+// calibration and filtering happen on the host (load/load.py, "High rate"
+// mode), so changing the calibration factor needs no reflash.
+// 0: the original averaged, calibrated reading once a second at 9600 baud.
+#define HIGH_RATE 1
+
 HX711 scale;
 
 void setup() {
+#if HIGH_RATE
+    Serial.begin(115200);
+    scale.begin(LOADCELL_DOUT_PIN, LOADCELL_SCK_PIN);
+#else
     Serial.begin(9600);
     scale.begin(LOADCELL_DOUT_PIN, LOADCELL_SCK_PIN);
     
@@ -14,9 +25,16 @@ void setup() {
     scale.tare();
     Serial.println("Taring complete. Place a known weight on the scale.");
     delay(2000); // Wait for 2 seconds before reading
+#endif
 }
 
 void loop() {
+#if HIGH_RATE
+    // One line per conversion: the raw 24-bit count
+    if (scale.is_ready()) {
+        Serial.println(scale.read());
+    }
+#else
     // Get raw reading
     long rawReading = scale.get_units(10); // Average of 10 readings
     Serial.print("Raw reading: ");
@@ -31,4 +49,5 @@ void loop() {
     Serial.println(" g");
     
     delay(1000); // Read every second
+#endif
 }